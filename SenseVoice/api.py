@@ -11,6 +11,7 @@ import torch
 from model import SenseVoiceSmall
 from funasr.utils.postprocess_utils import rich_transcription_postprocess
 from io import BytesIO
+from utils.audio_io import map_audio, int16_to_tensor, resolve_media, is_within
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +26,14 @@ except RuntimeError as e:
 
 TARGET_FS = 16000
 
+# 服务端音频目录：文件ID 解析为 <目录>/<ID>.pcm（默认为后端转码生成的 PCM 旁路文件目录）
+MEDIA_DIRS = os.getenv(
+    "SENSEVOICE_MEDIA_DIRS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python_api", "media_cache", "pcm"),
+).split(os.pathsep)
+# 允许按本地路径识别的根目录（默认同 MEDIA_DIRS）
+LOCAL_ROOTS = os.getenv("SENSEVOICE_LOCAL_ROOTS", os.pathsep.join(MEDIA_DIRS)).split(os.pathsep)
+
 class Language(str, Enum):
     auto = "auto"
     zh = "zh"
@@ -87,22 +96,72 @@ async def turn_audio_to_text(
             logger.error(f"Error processing file {file.filename}: {e}", exc_info=True)
             raise HTTPException(status_code=400, detail=f"无法读取音频文件 {file.filename}: {e}")
 
-        # transform to target sample frequency
-        if audio_fs != TARGET_FS:
-            resampler = torchaudio.transforms.Resample(orig_freq=audio_fs, new_freq=TARGET_FS)
-            data_or_path_or_list = resampler(data_or_path_or_list)
-
-        # convert to mono
-        if data_or_path_or_list.shape[0] > 1:
-            data_or_path_or_list = data_or_path_or_list.mean(0, keepdim=True)
-        
-        audios.append(data_or_path_or_list[0])
+        audios.append(to_mono_16k(data_or_path_or_list, audio_fs))
 
     if not keys:
         key = [f.filename for f in files]
     else:
         key = keys.split(",")
 
+    return recognize(audios, key, lang)
+
+
+@app.post("/api/v1/asr/local")
+async def turn_local_audio_to_text(
+    file_ids: Annotated[str, Form(description="服务端音频文件ID（PCM 旁路文件），用逗号分隔")] = None,
+    paths: Annotated[str, Form(description="服务端本地音频路径，用逗号分隔")] = None,
+    keys: Annotated[str, Form(description="音频标识，用逗号分隔")] = None,
+    lang: Annotated[Language, Form(description="语音内容语言")] = "auto",
+):
+    """
+    识别服务端已有的音频，不经上传：16kHz 单声道 16 位的 PCM / WAV 直接内存映射，
+    其余格式按路径解码
+    """
+    sources = []
+    for file_id in (file_ids.split(",") if file_ids else []):
+        path = resolve_media(file_id.strip(), MEDIA_DIRS)
+        if path is None:
+            raise HTTPException(status_code=404, detail=f"音频文件不存在: {file_id}")
+        sources.append((file_id.strip(), path))
+    for path in (paths.split(",") if paths else []):
+        path = path.strip()
+        if not is_within(path, LOCAL_ROOTS) or not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail=f"音频文件不存在: {path}")
+        sources.append((os.path.basename(path), path))
+    if not sources:
+        raise HTTPException(status_code=400, detail="请提供 file_ids 或 paths")
+
+    audios = []
+    for name, path in sources:
+        try:
+            samples = map_audio(path)
+            if samples is not None:
+                audios.append(int16_to_tensor(samples))
+            else:
+                waveform, audio_fs = torchaudio.load(path)
+                audios.append(to_mono_16k(waveform, audio_fs))
+        except Exception as e:
+            logger.error(f"Error processing file {path}: {e}", exc_info=True)
+            raise HTTPException(status_code=400, detail=f"无法读取音频文件 {name}: {e}")
+
+    key = keys.split(",") if keys else [name for name, _ in sources]
+    return recognize(audios, key, lang)
+
+
+def to_mono_16k(waveform: torch.Tensor, audio_fs: int) -> torch.Tensor:
+    """解码结果 (通道, 采样点) 转为 16kHz 单声道一维张量"""
+    # transform to target sample frequency
+    if audio_fs != TARGET_FS:
+        resampler = torchaudio.transforms.Resample(orig_freq=audio_fs, new_freq=TARGET_FS)
+        waveform = resampler(waveform)
+
+    # convert to mono
+    if waveform.shape[0] > 1:
+        return waveform.mean(0)
+    return waveform[0]
+
+
+def recognize(audios: List[torch.Tensor], key: List[str], lang: Language) -> dict:
     res = m.inference(
         data_in=audios,
         language=lang,
@@ -0,0 +1,87 @@
+"""Memory-mapped server-side audio: PCM/WAV mapping, decode fallback, file id and directory checks."""
+import importlib.util
+import os
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+
+# The service runs from the SenseVoice directory (``import utils.audio_io``). When collected
+# together with the backend tests, a top-level ``utils`` may resolve to python_api/utils,
+# so load the module by path.
+_spec = importlib.util.spec_from_file_location(
+    "sensevoice_audio_io",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utils", "audio_io.py"),
+)
+audio_io = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(audio_io)
+
+SAMPLES = np.array([0, 1, -1, 32767, -32768, 1000], dtype="<i2")
+
+
+def _write_wav(path, samples, rate=16000, channels=1):
+    with wave.open(str(path), "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(samples.tobytes())
+
+
+def test_map_pcm(tmp_path):
+    path = tmp_path / "a.pcm"
+    path.write_bytes(SAMPLES.tobytes() + b"\x01")  # a trailing partial sample is ignored
+    mapped = audio_io.map_pcm(str(path))
+    assert np.array_equal(mapped, SAMPLES)
+    assert np.array_equal(audio_io.map_pcm(str(path), offset=4, num_samples=2), SAMPLES[2:4])
+
+    # copy-on-write: writes to the mapping never reach the file
+    mapped[0] = 5
+    assert np.array_equal(np.fromfile(str(path), dtype="<i2", count=len(SAMPLES)), SAMPLES)
+
+    empty = tmp_path / "empty.pcm"
+    empty.write_bytes(b"")
+    assert audio_io.map_pcm(str(empty)).size == 0
+
+
+def test_map_wav_only_for_16k_mono(tmp_path):
+    good = tmp_path / "good.wav"
+    _write_wav(good, SAMPLES)
+    assert np.array_equal(audio_io.map_wav(str(good)), SAMPLES)
+    assert np.array_equal(audio_io.map_audio(str(good)), SAMPLES)
+
+    resampled = tmp_path / "44k.wav"
+    _write_wav(resampled, SAMPLES, rate=44100)
+    assert audio_io.map_wav(str(resampled)) is None
+    stereo = tmp_path / "stereo.wav"
+    _write_wav(stereo, SAMPLES, channels=2)
+    assert audio_io.map_wav(str(stereo)) is None
+
+    broken = tmp_path / "broken.wav"
+    broken.write_bytes(b"not a wav file")
+    assert audio_io.map_wav(str(broken)) is None
+    assert audio_io.map_audio(str(tmp_path / "a.mp3")) is None
+
+
+def test_int16_to_float():
+    out = audio_io.int16_to_float(SAMPLES)
+    assert out.dtype == np.float32
+    assert out[3] == pytest.approx(32767 * audio_io.INT16_SCALE)
+    assert out[4] == -1.0
+
+
+def test_resolve_media_and_is_within(tmp_path):
+    media = tmp_path / "pcm"
+    media.mkdir()
+    (media / "abc_1.pcm").write_bytes(b"")
+    assert audio_io.resolve_media("abc_1", [str(tmp_path / "missing"), str(media)]) == str(media / "abc_1.pcm")
+    assert audio_io.resolve_media("../pcm/abc_1", [str(media)]) is None
+    assert audio_io.resolve_media("", [str(media)]) is None
+
+    outside = tmp_path / "outside.pcm"
+    outside.write_bytes(b"")
+    link = media / "link.pcm"
+    os.symlink(outside, link)
+    assert audio_io.is_within(str(media / "abc_1.pcm"), [str(media)])
+    assert not audio_io.is_within(str(link), [str(media)])
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# Memory-mapped audio input for files that already live on the server.
+#
+# Raw 16 kHz mono s16le PCM (the ``.pcm`` sidecars written by the backend's
+# transcode pipeline) and 16 kHz mono 16-bit WAV files are mapped with
+# ``np.memmap`` instead of being read, decoded and resampled. Pages are
+# faulted in lazily, so the only per-request allocation is the float32
+# waveform the frontend needs.
+
+import os
+import wave
+from typing import Optional, Sequence
+
+import numpy as np
+import torch
+
+TARGET_FS = 16000
+PCM_DTYPE = np.dtype("<i2")
+INT16_SCALE = 1.0 / (1 << 15)
+
+
+def map_pcm(path: str, offset: int = 0, num_samples: Optional[int] = None) -> np.ndarray:
+    """Map raw mono s16le samples starting at ``offset`` bytes (copy-on-write, file is never modified)."""
+    if num_samples is None:
+        num_samples = (os.path.getsize(path) - offset) // PCM_DTYPE.itemsize
+    if num_samples <= 0:
+        return np.zeros(0, dtype=PCM_DTYPE)
+    return np.memmap(path, dtype=PCM_DTYPE, mode="c", offset=offset, shape=(num_samples,))
+
+
+def map_wav(path: str) -> Optional[np.ndarray]:
+    """Map the data chunk of a 16 kHz mono 16-bit PCM WAV file, or return None if it needs decoding."""
+    try:
+        with open(path, "rb") as f:
+            reader = wave.open(f)
+            # wave stops right after the data chunk header, so this is where the samples start
+            offset = f.tell()
+            if (
+                reader.getnchannels() != 1
+                or reader.getsampwidth() != PCM_DTYPE.itemsize
+                or reader.getframerate() != TARGET_FS
+            ):
+                return None
+            num_samples = reader.getnframes()
+    except (wave.Error, EOFError):
+        return None
+    num_samples = min(num_samples, (os.path.getsize(path) - offset) // PCM_DTYPE.itemsize)
+    return map_pcm(path, offset, num_samples)
+
+
+def map_audio(path: str) -> Optional[np.ndarray]:
+    """Map ``.pcm`` / ``.wav`` files that are already 16 kHz mono int16; None for anything else."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pcm":
+        return map_pcm(path)
+    if ext == ".wav":
+        return map_wav(path)
+    return None
+
+
+def int16_to_float(samples: np.ndarray) -> np.ndarray:
+    """Scale int16 samples to float32 in [-1, 1) with a single allocation."""
+    out = samples.astype(np.float32)
+    out *= INT16_SCALE
+    return out
+
+
+def int16_to_tensor(samples: np.ndarray) -> torch.Tensor:
+    """Same as :func:`int16_to_float` but returns a torch tensor sharing that buffer."""
+    return torch.from_numpy(int16_to_float(samples))
+
+
+def resolve_media(file_id: str, media_dirs: Sequence[str]) -> Optional[str]:
+    """Resolve a server-side file id to ``<dir>/<id>.pcm`` (first match), rejecting anything path-like."""
+    if not file_id or not all(c.isalnum() or c in "-_" for c in file_id):
+        return None
+    for directory in media_dirs:
+        path = os.path.join(directory, f"{file_id}.pcm")
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def is_within(path: str, roots: Sequence[str]) -> bool:
+    """True if ``path`` (after resolving symlinks) is inside one of ``roots``."""
+    real = os.path.realpath(path)
+    for root in roots:
+        root = os.path.realpath(root)
+        if os.path.commonpath([real, root]) == root:
+            return True
+    return False
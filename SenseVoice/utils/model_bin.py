@@ -20,6 +20,7 @@ from utils.infer_utils import (
     read_yaml,
 )
 from utils.frontend import WavFrontend
+from utils.audio_io import TARGET_FS, map_audio, int16_to_float
 from utils.infer_utils import pad_list
 
 logging = get_logger()
@@ -100,10 +101,17 @@ class SenseVoiceSmallONNX:
 
     def load_data(self, wav_content: Union[str, np.ndarray, List[str]], fs: int = None) -> List:
         def load_wav(path: str) -> np.ndarray:
+            # 16 kHz mono int16 PCM/WAV is memory-mapped instead of decoded and resampled
+            if fs == TARGET_FS:
+                samples = map_audio(path)
+                if samples is not None:
+                    return int16_to_float(samples)
             waveform, _ = librosa.load(path, sr=fs)
             return waveform
 
         if isinstance(wav_content, np.ndarray):
+            if wav_content.dtype == np.int16:
+                return [int16_to_float(wav_content)]
             return [wav_content]
 
         if isinstance(wav_content, str):
@@ -18,6 +18,7 @@ class Config:
     
     # ASR 服务配置
     PYTHON_ASR_URL: str = "http://127.0.0.1:50000/api/v1/asr"
+    PYTHON_ASR_LOCAL_URL: str = "http://127.0.0.1:50000/api/v1/asr/local"  # 识别服务端已有音频（按文件ID 内存映射 PCM）
     
     # CORS 配置
     CORS_ORIGINS: list = ["*"]
@@ -35,6 +36,67 @@ class Config:
     # JWT 配置
     JWT_SECRET: str = "dialect-master-secret-key-change-in-production"
     JWT_EXPIRE_HOURS: int = 24 * 7  # Token 有效期（小时）
+    AUTH_CACHE_TTL: float = 30.0  # 用户存在性 / token 版本缓存有效期（秒）
+    AUTH_CACHE_SIZE: int = 10000  # 用户状态缓存最大条目数
+    TOKEN_CACHE_SIZE: int = 10000  # 已验证 token 缓存最大条目数
+    
+    # 密码哈希配置
+    PASSWORD_HASH_ITERATIONS: int = 120000  # PBKDF2 迭代次数（修改后用户登录时自动重新哈希）
+    PASSWORD_HASH_WORKERS: int = 4  # 哈希线程池大小
+    PASSWORD_HASH_QUEUE_SIZE: int = 64  # 排队上限，超出时拒绝请求
+    
+    # 计数缓冲配置
+    VIEW_FLUSH_INTERVAL: float = 5.0  # 浏览量写回数据库的间隔（秒）
+    COUNTER_FLUSH_INTERVAL: float = 2.0  # 点赞/评论/粉丝计数写回数据库的间隔（秒）
+    COUNTER_RECONCILE_INTERVAL: float = 3600.0  # 按明细表重算计数的间隔（秒）
+    
+    # 事务发件箱（通知、积分、邮件）配置
+    OUTBOX_POLL_INTERVAL: float = 0.5  # 后台拉取待处理事件的间隔（秒）
+    OUTBOX_BATCH_SIZE: int = 200  # 每批处理的事件数
+    OUTBOX_MAX_BATCHES: int = 10  # 每轮最多处理的批数
+    OUTBOX_MAX_ATTEMPTS: int = 8  # 最大重试次数，超过后标记为 dead
+    OUTBOX_RETENTION_DAYS: int = 7  # 已完成事件的保留天数
+    OUTBOX_SEND_LEASE: int = 300  # 邮件等外部事件的发送租约（秒），进程崩溃后租约到期重新发送
+    
+    # 通知实时推送配置
+    NOTIFICATION_STREAM_HEARTBEAT: float = 15.0  # SSE 心跳间隔（秒），防止代理断开空闲连接
+    NOTIFICATION_COALESCE_WINDOW: int = 86400  # 同类通知合并的时间窗口（秒）
+    NOTIFICATION_ACTOR_SAMPLE: int = 3  # 合并通知保留的触发者样本数
+    
+    # 用户资料缓存配置
+    PROFILE_CACHE_TTL: float = 60.0  # 资料缓存有效期（秒），即其他进程变更的最长可见延迟
+    PROFILE_CACHE_SIZE: int = 50000  # 资料缓存最大条目数
+    
+    # 方言标签统计配置
+    DIALECT_STATS_RECONCILE_INTERVAL: float = 3600.0  # 按 posts 重算标签帖子数的间隔（秒）
+    
+    # 音频转码配置
+    FFMPEG_PATH: str = "ffmpeg"  # ffmpeg 可执行文件
+    AUDIO_TRANSCODE_WORKERS: int = 2  # 转码线程数，0 为不转码
+    AUDIO_TRANSCODE_TIMEOUT: float = 120.0  # 单个文件转码超时（秒）
+    AUDIO_PIPELINE_POLL_INTERVAL: float = 10.0  # 扫描待转码帖子的间隔（秒）
+    AUDIO_OPUS_BITRATE: str = "32k"  # 播放用 Opus 的码率
+    AUDIO_PCM_DIR: str = os.path.join(os.path.dirname(__file__), "media_cache", "pcm")  # 识别用 PCM 旁路文件目录
+    
+    # 媒体文件服务配置
+    MEDIA_CACHE_MAX_AGE: int = 31536000  # 内容哈希命名的上传文件的缓存时长（秒）
+    MEDIA_SENDFILE: bool = True  # ASGI 服务器支持 zerocopysend 扩展时用 sendfile 发送文件
+    MEDIA_ACCEL_REDIRECT: str = ""  # nginx 内部 location 前缀（如 /_uploads/），非空时由 nginx 发送文件
+    
+    # 头像缩略图配置
+    AVATAR_VARIANT_SIZES: str = "48,96,256"  # 缩略图边长（像素，逗号分隔）
+    AVATAR_VARIANT_FORMAT: str = "webp"  # webp / jpeg（Pillow 不支持 WebP 时使用 jpeg）
+    AVATAR_VARIANT_QUALITY: int = 80  # 压缩质量
+    AVATAR_VARIANT_WORKERS: int = 1  # 生成线程数，0 为不生成
+    AVATAR_VARIANT_POLL_INTERVAL: float = 60.0  # 扫描缺少缩略图的头像的间隔（秒）
+    
+    # 匿名响应缓存配置
+    RESPONSE_CACHE_FEED_TTL: float = 5.0  # 帖子流 / 方言帖子 / 方言统计的缓存有效期（秒），0 为关闭
+    RESPONSE_CACHE_LEADERBOARD_TTL: float = 30.0  # 排行榜的缓存有效期（秒），0 为关闭
+    RESPONSE_CACHE_SIZE: int = 2000  # 缓存的响应最大条数
+    
+    # 排行榜配置
+    LEADERBOARD_REBUILD_INTERVAL: float = 600.0  # 内存排行榜按数据库全量重建的间隔（秒）
     
     @classmethod
     def load_from_env(cls):
@@ -47,6 +109,7 @@ class Config:
         cls.DB_USER = os.getenv("DB_USER")
         cls.DB_PASSWORD = os.getenv("DB_PASSWORD", cls.DB_PASSWORD)
         cls.PYTHON_ASR_URL = os.getenv("PYTHON_ASR_URL", cls.PYTHON_ASR_URL)
+        cls.PYTHON_ASR_LOCAL_URL = os.getenv("PYTHON_ASR_LOCAL_URL", cls.PYTHON_ASR_LOCAL_URL)
         
         # SMTP 配置
         cls.SMTP_HOST = os.getenv("SMTP_HOST", cls.SMTP_HOST)
@@ -55,6 +118,69 @@ class Config:
         cls.SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
         cls.SMTP_FROM_NAME = os.getenv("SMTP_FROM_NAME", cls.SMTP_FROM_NAME)
         cls.CODE_EXPIRE_MINUTES = int(os.getenv("CODE_EXPIRE_MINUTES", str(cls.CODE_EXPIRE_MINUTES)))
+        
+        # 认证缓存配置
+        cls.AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", str(cls.AUTH_CACHE_TTL)))
+        cls.AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", str(cls.AUTH_CACHE_SIZE)))
+        cls.TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", str(cls.TOKEN_CACHE_SIZE)))
+        
+        # 密码哈希配置
+        cls.PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", str(cls.PASSWORD_HASH_ITERATIONS)))
+        cls.PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(cls.PASSWORD_HASH_WORKERS)))
+        cls.PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", str(cls.PASSWORD_HASH_QUEUE_SIZE)))
+        
+        # 计数缓冲配置
+        cls.VIEW_FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_INTERVAL", str(cls.VIEW_FLUSH_INTERVAL)))
+        cls.COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", str(cls.COUNTER_FLUSH_INTERVAL)))
+        cls.COUNTER_RECONCILE_INTERVAL = float(os.getenv("COUNTER_RECONCILE_INTERVAL", str(cls.COUNTER_RECONCILE_INTERVAL)))
+        
+        # 事务发件箱配置
+        cls.OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", str(cls.OUTBOX_POLL_INTERVAL)))
+        cls.OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", str(cls.OUTBOX_BATCH_SIZE)))
+        cls.OUTBOX_MAX_BATCHES = int(os.getenv("OUTBOX_MAX_BATCHES", str(cls.OUTBOX_MAX_BATCHES)))
+        cls.OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", str(cls.OUTBOX_MAX_ATTEMPTS)))
+        cls.OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", str(cls.OUTBOX_RETENTION_DAYS)))
+        cls.OUTBOX_SEND_LEASE = int(os.getenv("OUTBOX_SEND_LEASE", str(cls.OUTBOX_SEND_LEASE)))
+        
+        # 通知实时推送配置
+        cls.NOTIFICATION_STREAM_HEARTBEAT = float(os.getenv("NOTIFICATION_STREAM_HEARTBEAT", str(cls.NOTIFICATION_STREAM_HEARTBEAT)))
+        cls.NOTIFICATION_COALESCE_WINDOW = int(os.getenv("NOTIFICATION_COALESCE_WINDOW", str(cls.NOTIFICATION_COALESCE_WINDOW)))
+        cls.NOTIFICATION_ACTOR_SAMPLE = int(os.getenv("NOTIFICATION_ACTOR_SAMPLE", str(cls.NOTIFICATION_ACTOR_SAMPLE)))
+        
+        # 用户资料缓存配置
+        cls.PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", str(cls.PROFILE_CACHE_TTL)))
+        cls.PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", str(cls.PROFILE_CACHE_SIZE)))
+        
+        # 方言标签统计配置
+        cls.DIALECT_STATS_RECONCILE_INTERVAL = float(os.getenv("DIALECT_STATS_RECONCILE_INTERVAL", str(cls.DIALECT_STATS_RECONCILE_INTERVAL)))
+        
+        # 音频转码配置
+        cls.FFMPEG_PATH = os.getenv("FFMPEG_PATH", cls.FFMPEG_PATH)
+        cls.AUDIO_TRANSCODE_WORKERS = int(os.getenv("AUDIO_TRANSCODE_WORKERS", str(cls.AUDIO_TRANSCODE_WORKERS)))
+        cls.AUDIO_TRANSCODE_TIMEOUT = float(os.getenv("AUDIO_TRANSCODE_TIMEOUT", str(cls.AUDIO_TRANSCODE_TIMEOUT)))
+        cls.AUDIO_PIPELINE_POLL_INTERVAL = float(os.getenv("AUDIO_PIPELINE_POLL_INTERVAL", str(cls.AUDIO_PIPELINE_POLL_INTERVAL)))
+        cls.AUDIO_OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", cls.AUDIO_OPUS_BITRATE)
+        cls.AUDIO_PCM_DIR = os.getenv("AUDIO_PCM_DIR", cls.AUDIO_PCM_DIR)
+        
+        # 媒体文件服务配置
+        cls.MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", str(cls.MEDIA_CACHE_MAX_AGE)))
+        cls.MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", str(cls.MEDIA_SENDFILE)).lower() in ("1", "true", "yes")
+        cls.MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT", cls.MEDIA_ACCEL_REDIRECT)
+        
+        # 头像缩略图配置
+        cls.AVATAR_VARIANT_SIZES = os.getenv("AVATAR_VARIANT_SIZES", cls.AVATAR_VARIANT_SIZES)
+        cls.AVATAR_VARIANT_FORMAT = os.getenv("AVATAR_VARIANT_FORMAT", cls.AVATAR_VARIANT_FORMAT)
+        cls.AVATAR_VARIANT_QUALITY = int(os.getenv("AVATAR_VARIANT_QUALITY", str(cls.AVATAR_VARIANT_QUALITY)))
+        cls.AVATAR_VARIANT_WORKERS = int(os.getenv("AVATAR_VARIANT_WORKERS", str(cls.AVATAR_VARIANT_WORKERS)))
+        cls.AVATAR_VARIANT_POLL_INTERVAL = float(os.getenv("AVATAR_VARIANT_POLL_INTERVAL", str(cls.AVATAR_VARIANT_POLL_INTERVAL)))
+        
+        # 匿名响应缓存配置
+        cls.RESPONSE_CACHE_FEED_TTL = float(os.getenv("RESPONSE_CACHE_FEED_TTL", str(cls.RESPONSE_CACHE_FEED_TTL)))
+        cls.RESPONSE_CACHE_LEADERBOARD_TTL = float(os.getenv("RESPONSE_CACHE_LEADERBOARD_TTL", str(cls.RESPONSE_CACHE_LEADERBOARD_TTL)))
+        cls.RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", str(cls.RESPONSE_CACHE_SIZE)))
+        
+        # 排行榜配置
+        cls.LEADERBOARD_REBUILD_INTERVAL = float(os.getenv("LEADERBOARD_REBUILD_INTERVAL", str(cls.LEADERBOARD_REBUILD_INTERVAL)))
     
     @staticmethod
     def _load_env_file():
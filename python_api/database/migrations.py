@@ -4,6 +4,7 @@
 """
 import psycopg
 from .connection import get_db_connection
+from ..utils.text_search import POST_VECTOR_SQL, to_document
 
 
 def run_migrations():
@@ -19,6 +20,16 @@ def run_migrations():
         migrate_create_follows_table(conn)
         migrate_create_notifications_table(conn)
         migrate_create_gamification_tables(conn)
+        migrate_comment_thread_indexes(conn)
+        migrate_create_outbox_table(conn)
+        migrate_notification_read_state(conn)
+        migrate_notification_groups(conn)
+        migrate_create_points_daily_table(conn)
+        migrate_points_daily_grant(conn)
+        migrate_search_indexes(conn)
+        migrate_create_dialect_tag_counts_table(conn)
+        migrate_post_audio_status(conn)
+        migrate_user_avatar_variants(conn)
         print("[完成] 所有数据库迁移完成")
     finally:
         conn.close()
@@ -106,6 +117,14 @@ def migrate_users_profile(conn):
                 ALTER TABLE users ADD COLUMN following_count INT DEFAULT 0;
             END IF;
             
+            -- token 版本（递增即吊销已签发的 token）
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns 
+                WHERE table_name = 'users' AND column_name = 'token_version'
+            ) THEN
+                ALTER TABLE users ADD COLUMN token_version INT DEFAULT 0;
+            END IF;
+            
             -- 更新时间
             IF NOT EXISTS (
                 SELECT 1 FROM information_schema.columns 
@@ -337,5 +356,389 @@ def migrate_create_gamification_tables(conn):
         print("[完成] 积分系统表创建完成")
 
 
+def migrate_comment_thread_indexes(conn):
+    """
+    Phase 7: 评论楼层查询索引
+    支撑 get_comments 的窗口函数取回复（按 parent_id 分区、created_at 排序）
+    """
+    with conn.cursor() as cur:
+        # 顶级评论分页：post_id + created_at DESC，仅未删除的顶级评论
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_comments_post_top_created
+            ON comments(post_id, created_at DESC)
+            WHERE parent_id IS NULL AND is_deleted = FALSE;
+        """)
+        
+        # 回复查询与回复计数：parent_id + created_at，仅未删除的评论
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_comments_parent_created
+            ON comments(parent_id, created_at)
+            WHERE is_deleted = FALSE;
+        """)
+        
+        conn.commit()
+        print("[完成] 评论索引创建完成")
+
+
+def migrate_create_outbox_table(conn):
+    """
+    Phase 8: 事务发件箱
+    通知、积分、邮件等副作用与主操作同事务写入，由后台线程处理
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS outbox_events (
+                id BIGSERIAL PRIMARY KEY,
+                event_type TEXT NOT NULL,
+                payload JSONB NOT NULL,
+                dedup_key TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INT NOT NULL DEFAULT 0,
+                last_error TEXT,
+                available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                processed_at TIMESTAMPTZ,
+                created_at TIMESTAMPTZ DEFAULT NOW()
+            )
+        """)
+        
+        # 去重键唯一
+        cur.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_outbox_dedup_key
+            ON outbox_events(dedup_key) WHERE dedup_key IS NOT NULL;
+        """)
+        
+        # 待处理事件拉取
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_outbox_pending
+            ON outbox_events(available_at, id) WHERE status = 'pending';
+        """)
+        
+        conn.commit()
+        print("[完成] 发件箱表创建完成")
+
+
+def migrate_notification_read_state(conn):
+    """
+    Phase 9: 通知未读计数与已读水位
+    users.unread_notifications 与通知写入 / 标记已读同事务维护；
+    id 不大于 users.notifications_read_id 的通知视为已读，全部已读只需移动水位
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+        DO $$
+        BEGIN
+            -- 已读水位（最后一次"全部已读"时的最大通知ID）
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns 
+                WHERE table_name = 'users' AND column_name = 'notifications_read_id'
+            ) THEN
+                ALTER TABLE users ADD COLUMN notifications_read_id INT NOT NULL DEFAULT 0;
+            END IF;
+            
+            -- 未读通知数（新增字段时按现有数据回填）
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns 
+                WHERE table_name = 'users' AND column_name = 'unread_notifications'
+            ) THEN
+                ALTER TABLE users ADD COLUMN unread_notifications INT NOT NULL DEFAULT 0;
+                UPDATE users u SET unread_notifications = c.unread
+                FROM (
+                    SELECT user_id, COUNT(*) AS unread
+                    FROM notifications
+                    WHERE is_read = FALSE
+                    GROUP BY user_id
+                ) c
+                WHERE u.id = c.user_id;
+            END IF;
+        END $$;
+        """)
+        
+        # 通知列表与"全部已读"取最大ID
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_notifications_user_id_desc
+            ON notifications(user_id, id DESC);
+        """)
+        
+        conn.commit()
+        print("[完成] 通知未读计数迁移完成")
+
+
+def migrate_notification_groups(conn):
+    """
+    Phase 10: 通知合并
+    同一接收者、同类型、同帖子在时间窗口内的通知合并为一行（group_key 唯一），
+    保留触发者样本与合并条数
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+        DO $$
+        BEGIN
+            -- 合并键（类型:帖子:时间窗口），已读后置空，不再合并
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns 
+                WHERE table_name = 'notifications' AND column_name = 'group_key'
+            ) THEN
+                ALTER TABLE notifications ADD COLUMN group_key TEXT;
+            END IF;
+            
+            -- 最近的触发者样本
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns 
+                WHERE table_name = 'notifications' AND column_name = 'actor_ids'
+            ) THEN
+                ALTER TABLE notifications ADD COLUMN actor_ids INT[];
+                UPDATE notifications SET actor_ids = ARRAY[actor_id] WHERE actor_id IS NOT NULL;
+            END IF;
+            
+            -- 合并的通知条数
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns 
+                WHERE table_name = 'notifications' AND column_name = 'group_count'
+            ) THEN
+                ALTER TABLE notifications ADD COLUMN group_count INT NOT NULL DEFAULT 1;
+            END IF;
+            
+            -- 最近一次合并的时间（列表按此排序）
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns 
+                WHERE table_name = 'notifications' AND column_name = 'updated_at'
+            ) THEN
+                ALTER TABLE notifications ADD COLUMN updated_at TIMESTAMPTZ;
+                UPDATE notifications SET updated_at = created_at;
+                ALTER TABLE notifications ALTER COLUMN updated_at SET DEFAULT NOW();
+            END IF;
+        END $$;
+        """)
+        
+        cur.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_notifications_group
+            ON notifications(user_id, group_key) WHERE group_key IS NOT NULL;
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_notifications_user_updated
+            ON notifications(user_id, updated_at DESC);
+        """)
+        
+        conn.commit()
+        print("[完成] 通知合并迁移完成")
+
+
+def migrate_create_points_daily_table(conn):
+    """
+    Phase 11: 每日积分汇总表
+    按 (用户, 日期, 原因) 累计积分，周榜 / 月榜按天汇总而不扫描积分流水
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('points_daily') IS NULL")
+        is_new = cur.fetchone()[0]
+        
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS points_daily (
+                user_id INT REFERENCES users(id) ON DELETE CASCADE,
+                day DATE NOT NULL,
+                reason TEXT NOT NULL DEFAULT '',
+                points INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day, reason)
+            )
+        """)
+        
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_points_daily_day
+            ON points_daily(day);
+        """)
+        
+        # 首次创建时按已有流水回填
+        if is_new:
+            cur.execute("""
+                INSERT INTO points_daily (user_id, day, reason, points)
+                SELECT user_id, created_at::date, COALESCE(reason, ''), SUM(points)
+                FROM points_history
+                WHERE user_id IS NOT NULL
+                GROUP BY user_id, created_at::date, COALESCE(reason, '')
+            """)
+        
+        conn.commit()
+        print("[完成] 每日积分汇总表创建完成")
+
+
+def migrate_points_daily_grant(conn):
+    """
+    Phase 12: 每日积分上限
+    last_granted 记录最近一次 upsert 实际发放的积分，
+    上限检查与累计由一条 INSERT ... ON CONFLICT DO UPDATE ... RETURNING 完成
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns 
+                WHERE table_name = 'points_daily' AND column_name = 'last_granted'
+            ) THEN
+                ALTER TABLE points_daily ADD COLUMN last_granted INT NOT NULL DEFAULT 0;
+            END IF;
+        END $$;
+        """)
+        
+        conn.commit()
+        print("[完成] 每日积分上限迁移完成")
+
+
+def migrate_search_indexes(conn):
+    """
+    Phase 13: 搜索
+    用户名 / 昵称的 pg_trgm GIN 索引；帖子的分词 tsvector 列与 GIN 索引
+    """
+    # 1. 三元组索引（需要创建扩展的权限；不可用时用户搜索不走索引）
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_users_username_trgm
+                ON users USING GIN (username gin_trgm_ops);
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_users_nickname_trgm
+                ON users USING GIN (nickname gin_trgm_ops);
+            """)
+        conn.commit()
+    except psycopg.Error as e:
+        conn.rollback()
+        print(f"[警告] pg_trgm 不可用，用户搜索将不使用三元组索引: {e}")
+    
+    # 2. 帖子全文检索列（分词在应用层完成，写帖子时同步计算）
+    with conn.cursor() as cur:
+        cur.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns 
+                WHERE table_name = 'posts' AND column_name = 'search_vector'
+            ) THEN
+                ALTER TABLE posts ADD COLUMN search_vector TSVECTOR;
+            END IF;
+        END $$;
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_posts_search
+            ON posts USING GIN (search_vector);
+        """)
+    conn.commit()
+    
+    # 3. 回填已有帖子（分批，每批一条多行 UPDATE）
+    filled = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT id, content, dialect_tag FROM posts
+                WHERE search_vector IS NULL
+                ORDER BY id
+                LIMIT 500
+            """)
+            rows = cur.fetchall()
+            if not rows:
+                break
+            vector = POST_VECTOR_SQL.replace("%s", "v.doc", 1).replace("%s", "v.tag", 1)
+            cur.execute(f"""
+                UPDATE posts p
+                SET search_vector = {vector}
+                FROM (VALUES {", ".join(["(%s::int, %s::text, %s::text)"] * len(rows))}) AS v(id, doc, tag)
+                WHERE p.id = v.id
+            """, [value for post_id, content, tag in rows
+                  for value in (post_id, to_document(content), to_document(tag or ""))])
+        conn.commit()
+        filled += len(rows)
+    
+    print(f"[完成] 搜索索引迁移完成（回填 {filled} 条帖子）")
+
+
+def migrate_create_dialect_tag_counts_table(conn):
+    """
+    Phase 14: 方言标签统计表
+    按标签保存未删除帖子数，替代每次请求对 posts 的 GROUP BY
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('dialect_tag_counts') IS NULL")
+        is_new = cur.fetchone()[0]
+        
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS dialect_tag_counts (
+                tag TEXT PRIMARY KEY,
+                post_count INT NOT NULL DEFAULT 0
+            )
+        """)
+        
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_dialect_tag_counts_count
+            ON dialect_tag_counts(post_count DESC, tag);
+        """)
+        
+        # 首次创建时按已有帖子回填
+        if is_new:
+            cur.execute("""
+                INSERT INTO dialect_tag_counts (tag, post_count)
+                SELECT dialect_tag, COUNT(*)
+                FROM posts
+                WHERE is_deleted = FALSE AND dialect_tag IS NOT NULL
+                GROUP BY dialect_tag
+            """)
+        
+        conn.commit()
+        print("[完成] 方言标签统计表创建完成")
+
+
+def migrate_post_audio_status(conn):
+    """
+    Phase 15: 帖子音频转码状态
+    audio_status: none / pending / processing / ready / failed，
+    audio_playback_url 为转码后的 Opus 地址；已有的帖子音频排队转码
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns 
+                WHERE table_name = 'posts' AND column_name = 'audio_status'
+            ) THEN
+                ALTER TABLE posts ADD COLUMN audio_status TEXT NOT NULL DEFAULT 'none';
+                ALTER TABLE posts ADD COLUMN audio_playback_url TEXT;
+                ALTER TABLE posts ADD COLUMN audio_claimed_at TIMESTAMPTZ;
+                UPDATE posts SET audio_status = 'pending'
+                WHERE audio_url IS NOT NULL AND is_deleted = FALSE;
+            END IF;
+        END $$;
+        """)
+        
+        # 待转码任务拉取
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_posts_audio_pending
+            ON posts(id) WHERE audio_status IN ('pending', 'processing');
+        """)
+        
+        conn.commit()
+        print("[完成] 帖子音频转码状态迁移完成")
+
+
+def migrate_user_avatar_variants(conn):
+    """
+    Phase 16: 头像缩略图
+    avatar_variants 保存 {"边长": 缩略图地址}，NULL 为尚未生成（已有头像由后台扫描回填）
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS avatar_variants JSONB;
+        """)
+        
+        # 待生成任务拉取
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_users_avatar_variants_pending
+            ON users(id) WHERE avatar_url IS NOT NULL AND avatar_variants IS NULL;
+        """)
+        
+        conn.commit()
+        print("[完成] 头像缩略图迁移完成")
+
+
 if __name__ == "__main__":
     run_migrations()
@@ -4,11 +4,22 @@
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
 from .config import Config
-from .routes import health_router, auth_router, asr_router, users_router, posts_router, comments_router, follows_router, notifications_router, points_router
+from .routes import health_router, auth_router, asr_router, users_router, posts_router, comments_router, follows_router, notifications_router, points_router, search_router
 from .database.migrations import run_migrations
+from .routes import posts as post_routes, comments as comment_routes, users as user_routes
+from .utils.response_cache import ResponseCacheMiddleware
+from .utils.uploads import UploadLimitMiddleware
+from .utils.media import MediaFiles
+from .services.view_counter import ViewCounter
+from .services.counter_service import CounterService
+from .services.outbox_service import OutboxService
+from .services.notification_bus import NotificationBus
+from .services.leaderboard_service import LeaderboardService
+from .services.dialect_stats_service import DialectStatsService
+from .services.audio_pipeline import AudioPipeline
+from .services.avatar_variants import AvatarVariants
 
 # 创建 FastAPI 应用实例
 app = FastAPI(
@@ -17,6 +28,16 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# 上传接口的请求体大小限制（超限时在读取请求体的过程中中止）
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/api/posts/upload-audio": post_routes.MAX_AUDIO_SIZE,
+    "/api/comments/upload-audio": comment_routes.MAX_AUDIO_SIZE,
+    "/api/users/me/avatar": user_routes.MAX_FILE_SIZE,
+})
+
+# 匿名请求的响应缓存（注册在 CORS 之前，位于其内层）
+app.add_middleware(ResponseCacheMiddleware)
+
 # 配置 CORS 中间件
 app.add_middleware(
     CORSMiddleware,
@@ -26,10 +47,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 配置静态文件服务（用于头像和音频文件）
+# 配置静态文件服务（用于头像和音频文件，支持 Range 与长期缓存）
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+app.mount("/uploads", MediaFiles(directory=UPLOAD_DIR), name="uploads")
 
 # 注册路由
 app.include_router(health_router)
@@ -41,6 +62,7 @@ app.include_router(comments_router)
 app.include_router(follows_router)
 app.include_router(notifications_router)
 app.include_router(points_router)
+app.include_router(search_router)
 
 
 @app.on_event("startup")
@@ -55,10 +77,39 @@ async def startup_event():
         run_migrations()
     except Exception as e:
         print(f"[警告] 数据库迁移: {e}")
+    
+    # 启动浏览量与冗余计数的批量写回
+    ViewCounter.start()
+    CounterService.start()
+    
+    # 启动发件箱后台处理（通知、积分、邮件）
+    OutboxService.start()
+    
+    # 监听通知推送（LISTEN/NOTIFY，多进程间分发）
+    NotificationBus.start()
+    
+    # 排行榜定期全量重建
+    LeaderboardService.start()
+    
+    # 方言标签统计定期对账
+    DialectStatsService.start()
+    
+    # 帖子音频后台转码
+    AudioPipeline.start()
+    AvatarVariants.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时的清理操作"""
+    # 处理剩余发件箱事件，写回缓冲中的浏览量与冗余计数
+    OutboxService.stop()
+    NotificationBus.stop()
+    LeaderboardService.stop()
+    DialectStatsService.stop()
+    AudioPipeline.stop()
+    AvatarVariants.stop()
+    ViewCounter.stop()
+    CounterService.stop()
     print("[关闭] 方言宝 API 服务已关闭")
 
@@ -3,7 +3,7 @@
 包含评论相关的 Pydantic 模型
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 
@@ -20,6 +20,7 @@ class CommentAuthor(BaseModel):
     username: str
     nickname: Optional[str] = None
     avatar_url: Optional[str] = None
+    avatar_variants: Optional[Dict[str, str]] = None  # {"边长": 缩略图地址}，尚未生成时为空
     level: int = 1
     level_name: str = "方言新手"
 
@@ -2,7 +2,7 @@
 通知数据模型
 """
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from .user import UserPublicProfile
 
@@ -20,6 +20,11 @@ class Notification(BaseModel):
     
     # 扩展字段：触发者的用户信息
     actor: Optional[UserPublicProfile] = None
+    
+    # 合并通知（"A、B 等 N 人赞了你的帖子"）
+    actors: List[UserPublicProfile] = []  # 最近的触发者样本
+    group_count: int = 1  # 合并的通知条数
+    updated_at: Optional[datetime] = None  # 最近一次合并的时间
 
     class Config:
         from_attributes = True
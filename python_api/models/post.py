@@ -3,7 +3,7 @@
 包含帖子相关的 Pydantic 模型
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 
@@ -26,6 +26,7 @@ class PostAuthor(BaseModel):
     username: str
     nickname: Optional[str] = None
     avatar_url: Optional[str] = None
+    avatar_variants: Optional[Dict[str, str]] = None  # {"边长": 缩略图地址}，尚未生成时为空
     level: int = 1
     level_name: str = "方言新手"
 
@@ -39,6 +40,8 @@ class PostResponse(BaseModel):
     likes_count: int = 0
     comments_count: int = 0
     views_count: int = 0
+    audio_status: str = "none"  # 音频转码状态：none / pending / processing / ready / failed
+    audio_playback_url: Optional[str] = None  # 转码后的 16 kHz 单声道 Opus（ready 时），播放优先使用
     is_liked: bool = False  # 当前用户是否点赞
     author: PostAuthor
     created_at: datetime
@@ -0,0 +1,92 @@
+"""
+热点查询的行对象
+帖子 / 评论 / 通知列表由 psycopg 的 row_factory 按列名直接构造为 __slots__ dataclass，
+字段即响应字段，由 FastJSONResponse（orjson）原样序列化，不再逐行组装 dict
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from psycopg.rows import kwargs_row
+from .user import UserPublicProfile
+
+
+@dataclass(slots=True)
+class AuthorRow:
+    """帖子 / 评论的作者信息（对应 PostAuthor / CommentAuthor）"""
+    id: int
+    username: str
+    nickname: Optional[str] = None
+    avatar_url: Optional[str] = None
+    avatar_variants: Optional[Dict[str, str]] = None
+    level: int = 1
+    level_name: str = "方言新手"
+
+
+@dataclass(slots=True)
+class PostRow:
+    """帖子（对应 PostResponse）"""
+    id: int
+    content: str
+    audio_url: Optional[str]
+    dialect_tag: Optional[str]
+    likes_count: int
+    comments_count: int
+    views_count: int
+    created_at: datetime
+    updated_at: Optional[datetime]
+    audio_status: str = "none"
+    audio_playback_url: Optional[str] = None
+    is_liked: bool = False
+    author: Optional[AuthorRow] = None
+
+
+@dataclass(slots=True)
+class CommentRow:
+    """评论（对应 CommentResponse）"""
+    id: int
+    post_id: int
+    user_id: int
+    parent_id: Optional[int]
+    content: str
+    audio_url: Optional[str]
+    likes_count: int
+    is_deleted: bool
+    created_at: datetime
+    reply_count: int = 0
+    is_liked: bool = False
+    author: Optional[AuthorRow] = None
+    replies: List["CommentRow"] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class NotificationRow:
+    """通知（对应 Notification）"""
+    id: int
+    user_id: int
+    type: str
+    actor_id: Optional[int]
+    post_id: Optional[int]
+    comment_id: Optional[int]
+    content: Optional[str]
+    is_read: bool
+    created_at: datetime
+    group_count: int = 1
+    updated_at: Optional[datetime] = None
+    actor: Optional[UserPublicProfile] = None
+    actors: List[UserPublicProfile] = field(default_factory=list)
+
+
+def row_with(cls: Callable[..., Any], *extras: str):
+    """
+    psycopg row_factory：按列名构造 cls；extras 列不属于响应字段（如作者ID、排序得分），
+    每行返回 (对象, extras 列的值...)
+
+    Args:
+        cls: 行对象类型，除 extras 外的列名须与其字段同名
+        extras: 额外列名
+    """
+    def build(**columns):
+        values = tuple(columns.pop(name) for name in extras)
+        return (cls(**columns),) + values
+
+    return kwargs_row(build)
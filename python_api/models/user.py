@@ -3,7 +3,7 @@
 包含用户资料相关的 Pydantic 模型
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 
 
@@ -48,6 +48,7 @@ class UserPublicProfile(BaseModel):
     username: str
     nickname: Optional[str] = None
     avatar_url: Optional[str] = None
+    avatar_variants: Optional[Dict[str, str]] = None  # {"边长": 缩略图地址}，尚未生成时为空
     bio: Optional[str] = None
     hometown: Optional[str] = None
     dialect: Optional[str] = None
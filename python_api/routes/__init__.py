@@ -9,5 +9,6 @@ from .comments import router as comments_router
 
 from .notifications import router as notifications_router
 from .points import router as points_router
+from .search import router as search_router
 
-__all__ = ["health_router", "auth_router", "asr_router", "users_router", "posts_router", "comments_router", "follows_router", "notifications_router", "points_router"]
+__all__ = ["health_router", "auth_router", "asr_router", "users_router", "posts_router", "comments_router", "follows_router", "notifications_router", "points_router", "search_router"]
@@ -3,8 +3,10 @@ ASR 路由
 处理语音识别相关请求
 """
 from typing import Optional
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from ..services import ASRService
+from ..services.audio_pipeline import media_id_from_url
+from ..services.post_service import PostService
 
 router = APIRouter(tags=["语音识别"])
 
@@ -35,3 +37,32 @@ async def sensevoice(
         lang=lang,
         keys=keys
     )
+
+
+@router.post("/sensevoice/posts/{post_id}")
+async def sensevoice_post(
+    post_id: int,
+    lang: str = Form("auto"),
+    keys: Optional[str] = Form(None)
+):
+    """
+    识别帖子音频（使用转码生成的 16kHz PCM，识别服务直接内存映射读取）
+    
+    Args:
+        post_id: 帖子ID
+        lang: 语言代码（默认: auto）
+        keys: 可选的关键词
+        
+    Returns:
+        语音识别结果
+    """
+    audio = PostService.get_post_audio(post_id)
+    if audio is None or not audio[0]:
+        raise HTTPException(status_code=404, detail="帖子不存在或没有音频")
+    
+    audio_url, audio_status = audio
+    media_id = media_id_from_url(audio_url)
+    if media_id is None or audio_status != "ready":
+        raise HTTPException(status_code=409, detail="帖子音频尚未转码完成")
+    
+    return await ASRService.process_media(media_id=media_id, lang=lang, keys=keys)
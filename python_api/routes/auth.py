@@ -39,7 +39,8 @@ def login(body: AuthBody):
     
     # 如果登录成功，生成 JWT token
     if result.get("ok") and result.get("userId"):
-        token = create_access_token(result["userId"], body.username)
+        token_version = result.pop("tokenVersion", 0)
+        token = create_access_token(result["userId"], body.username, token_version)
         result["token"] = token
     
     return result
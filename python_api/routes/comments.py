@@ -3,7 +3,6 @@
 处理评论相关的 API 端点
 """
 import os
-import uuid
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
 from typing import Optional
 
@@ -12,6 +11,8 @@ from ..models.comment import (
 )
 from ..services.comment_service import CommentService
 from ..utils import get_current_user, get_current_user_optional
+from ..utils.fast_json import FastJSONResponse
+from ..utils.uploads import UploadTooLargeError, save_upload
 
 router = APIRouter(prefix="/api", tags=["comments"])
 
@@ -42,7 +43,7 @@ async def get_post_comments(
         page_size=page_size,
         viewer_id=viewer_id
     )
-    return result
+    return FastJSONResponse(result)
 
 
 @router.post("/posts/{post_id}/comments", response_model=CommentResponse)
@@ -91,34 +92,19 @@ async def upload_comment_audio(
             detail=f"不支持的音频格式。允许的格式: {', '.join(ALLOWED_AUDIO_EXTENSIONS)}"
         )
     
-    # 读取文件内容
-    content = await file.read()
+    # 分块写入临时文件并校验大小，按内容哈希命名（相同内容只保存一份）
+    try:
+        saved = await save_upload(file, AUDIO_UPLOAD_DIR, ext, MAX_AUDIO_SIZE)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # 验证文件大小
-    if len(content) > MAX_AUDIO_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"文件大小超过限制 ({MAX_AUDIO_SIZE // 1024 // 1024}MB)"
-        )
-    
-    # 确保上传目录存在
-    os.makedirs(AUDIO_UPLOAD_DIR, exist_ok=True)
-    
-    # 生成唯一文件名
-    filename = f"comment_{current_user['id']}_{uuid.uuid4().hex[:12]}{ext}"
-    filepath = os.path.join(AUDIO_UPLOAD_DIR, filename)
-    
-    # 保存文件
-    with open(filepath, "wb") as f:
-        f.write(content)
-    
-    audio_url = f"/uploads/audio/{filename}"
+    audio_url = f"/uploads/audio/{saved.filename}"
     
     return {
         "success": True,
         "audio_url": audio_url,
-        "filename": filename,
-        "size": len(content),
+        "filename": saved.filename,
+        "size": saved.size,
         "message": "语音上传成功"
     }
 
@@ -186,4 +172,4 @@ async def get_comment_replies(
         page_size=page_size,
         viewer_id=viewer_id
     )
-    return result
+    return FastJSONResponse(result)
@@ -8,6 +8,7 @@ from typing import Optional
 from ..services.follow_service import FollowService
 from ..models.follow import FollowResponse, FollowerListResponse, FollowingListResponse
 from ..utils.jwt_auth import get_current_user, get_current_user_optional
+from ..utils.fast_json import FastJSONResponse
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -58,7 +59,7 @@ async def get_followers(
     获取粉丝列表
     """
     viewer_id = current_user["id"] if current_user else None
-    return FollowService.get_followers(user_id, page, size, viewer_id)
+    return FastJSONResponse(FollowService.get_followers(user_id, page, size, viewer_id))
 
 @router.get("/{user_id}/following", response_model=FollowingListResponse)
 async def get_following(
@@ -71,4 +72,4 @@ async def get_following(
     获取关注列表
     """
     viewer_id = current_user["id"] if current_user else None
-    return FollowService.get_following(user_id, page, size, viewer_id)
+    return FastJSONResponse(FollowService.get_following(user_id, page, size, viewer_id))
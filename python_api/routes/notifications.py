@@ -1,10 +1,17 @@
 """
 通知路由模块
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
+import asyncio
+import json
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional
+from ..config import Config
 from ..services.notification_service import NotificationService
-from ..utils.jwt_auth import get_current_user
+from ..services.notification_bus import NotificationBus
+from ..utils.jwt_auth import get_current_user, get_current_user_stream
+from ..utils.fast_json import FastJSONResponse
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 
@@ -17,7 +24,7 @@ async def get_notifications(
     """
     获取通知列表
     """
-    return NotificationService.get_notifications(current_user["id"], page, size)
+    return FastJSONResponse(NotificationService.get_notifications(current_user["id"], page, size))
 
 @router.get("/unread-count", response_model=Dict[str, int])
 async def get_unread_count(
@@ -29,6 +36,46 @@ async def get_unread_count(
     count = NotificationService.get_unread_count(current_user["id"])
     return {"count": count}
 
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    current_user: dict = Depends(get_current_user_stream)
+):
+    """
+    实时通知推送 (Server-Sent Events)
+    
+    连接后先推送一次 unread 事件，之后有新通知时推送 notification 事件，
+    未读数变化（标记已读）时推送 unread 事件；
+    事件中 unread 为该事件提交后的未读数
+    """
+    user_id = current_user["id"]
+    queue = NotificationBus.subscribe(user_id)
+
+    async def event_stream():
+        try:
+            unread = await run_in_threadpool(NotificationBus.unread_count, user_id)
+            yield _sse("unread", {"unread": unread})
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=Config.NOTIFICATION_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                # 同一条消息会投递给该用户的多个连接，不能原地修改
+                data = {k: v for k, v in message.items() if k not in ("event", "user_id")}
+                yield _sse(message.get("event", "notification"), data)
+        finally:
+            NotificationBus.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/{notification_id}/read")
 async def mark_as_read(
     notification_id: int,
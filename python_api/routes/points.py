@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from ..services.points_service import PointsService
 from ..utils import get_current_user
+from ..utils.fast_json import FastJSONResponse
 
 router = APIRouter(prefix="/api/points", tags=["points"])
 
@@ -26,4 +27,14 @@ async def get_leaderboard(
     """
     获取排行榜
     """
-    return PointsService.get_leaderboard(type, limit)
+    return FastJSONResponse(PointsService.get_leaderboard(type, limit))
+
+@router.get("/rank")
+async def get_my_rank(
+    type: str = Query("total", regex="^(total|weekly|monthly)$", description="total:总榜, weekly:周榜, monthly:月榜"),
+    user: dict = Depends(get_current_user)
+):
+    """
+    获取当前用户在排行榜中的名次（未上榜时 rank 为 null）
+    """
+    return PointsService.get_rank(user["id"], type)
@@ -3,7 +3,6 @@
 处理帖子相关的 API 端点
 """
 import os
-import uuid
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
 from typing import Optional
 
@@ -13,6 +12,8 @@ from ..models.post import (
 )
 from ..services.post_service import PostService
 from ..utils import get_current_user, get_current_user_optional
+from ..utils.fast_json import FastJSONResponse
+from ..utils.uploads import UploadTooLargeError, save_upload
 
 router = APIRouter(prefix="/api/posts", tags=["posts"])
 
@@ -49,7 +50,7 @@ async def get_posts(
         viewer_id=viewer_id,
         following_only=following
     )
-    return result
+    return FastJSONResponse(result)
 
 
 @router.post("", response_model=PostResponse)
@@ -95,34 +96,19 @@ async def upload_audio(
             detail=f"不支持的音频格式。允许的格式: {', '.join(ALLOWED_AUDIO_EXTENSIONS)}"
         )
     
-    # 读取文件内容
-    content = await file.read()
+    # 分块写入临时文件并校验大小，按内容哈希命名（相同内容只保存一份）
+    try:
+        saved = await save_upload(file, AUDIO_UPLOAD_DIR, ext, MAX_AUDIO_SIZE)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # 验证文件大小
-    if len(content) > MAX_AUDIO_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"文件大小超过限制 ({MAX_AUDIO_SIZE // 1024 // 1024}MB)"
-        )
-    
-    # 确保上传目录存在
-    os.makedirs(AUDIO_UPLOAD_DIR, exist_ok=True)
-    
-    # 生成唯一文件名
-    filename = f"{current_user['id']}_{uuid.uuid4().hex[:12]}{ext}"
-    filepath = os.path.join(AUDIO_UPLOAD_DIR, filename)
-    
-    # 保存文件
-    with open(filepath, "wb") as f:
-        f.write(content)
-    
-    audio_url = f"/uploads/audio/{filename}"
+    audio_url = f"/uploads/audio/{saved.filename}"
     
     return {
         "success": True,
         "audio_url": audio_url,
-        "filename": filename,
-        "size": len(content),
+        "filename": saved.filename,
+        "size": saved.size,
         "message": "音频上传成功"
     }
 
@@ -201,7 +187,7 @@ async def get_user_posts(
         user_id=user_id,
         viewer_id=viewer_id
     )
-    return result
+    return FastJSONResponse(result)
 
 
 @router.get("/dialect/{dialect_tag}", response_model=PostListResponse)
@@ -221,7 +207,7 @@ async def get_posts_by_dialect(
         dialect_tag=dialect_tag,
         viewer_id=viewer_id
     )
-    return result
+    return FastJSONResponse(result)
 
 
 @router.post("/{post_id}/like")
@@ -246,3 +232,44 @@ async def toggle_like_post(
         "message": "点赞成功" if result["is_liked"] else "已取消点赞"
     }
 
+
+@router.put("/{post_id}/like")
+async def like_post(
+    post_id: int,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    点赞帖子（幂等）
+    """
+    result = PostService.like_post(post_id, current_user["id"])
+    
+    if result is None:
+        raise HTTPException(status_code=404, detail="帖子不存在")
+    
+    return {
+        "success": True,
+        "is_liked": result["is_liked"],
+        "likes_count": result["likes_count"],
+        "message": "点赞成功"
+    }
+
+
+@router.delete("/{post_id}/like")
+async def unlike_post(
+    post_id: int,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    取消点赞帖子（幂等）
+    """
+    result = PostService.unlike_post(post_id, current_user["id"])
+    
+    if result is None:
+        raise HTTPException(status_code=404, detail="帖子不存在")
+    
+    return {
+        "success": True,
+        "is_liked": result["is_liked"],
+        "likes_count": result["likes_count"],
+        "message": "已取消点赞"
+    }
@@ -0,0 +1,34 @@
+"""
+搜索路由模块
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+
+from ..services.search_service import SearchService, InvalidCursorError
+from ..utils import get_current_user_optional
+from ..utils.fast_json import FastJSONResponse
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+
+@router.get("")
+async def search(
+    q: str = Query(..., min_length=1, max_length=100, description="搜索关键词"),
+    type: str = Query("posts", regex="^(posts|users)$", description="posts:帖子, users:用户"),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """
+    搜索帖子或用户（按相关度排序，游标分页）
+    """
+    try:
+        if type == "users":
+            result = SearchService.search_users(q, limit, cursor)
+        else:
+            viewer_id = current_user["id"] if current_user else None
+            result = SearchService.search_posts(q, limit, cursor, viewer_id)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return FastJSONResponse({**result, "query": q, "type": type})
@@ -3,7 +3,6 @@
 处理用户资料相关的 API 端点
 """
 import os
-import uuid
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
 from typing import Optional
@@ -11,6 +10,7 @@ from typing import Optional
 from ..models.user import UserProfileUpdate, UserPublicProfile, UserProfile
 from ..services.user_service import UserService
 from ..utils import get_current_user, get_current_user_optional
+from ..utils.uploads import UploadTooLargeError, save_upload
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -61,34 +61,20 @@ async def upload_avatar(
             detail=f"不支持的文件格式。允许的格式: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # 读取文件内容
-    content = await file.read()
-    
-    # 验证文件大小
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"文件大小超过限制 ({MAX_FILE_SIZE // 1024 // 1024}MB)"
-        )
-    
-    # 确保上传目录存在
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    
-    # 生成唯一文件名
-    filename = f"{current_user['id']}_{uuid.uuid4().hex[:8]}{ext}"
-    filepath = os.path.join(UPLOAD_DIR, filename)
-    
-    # 保存文件
-    with open(filepath, "wb") as f:
-        f.write(content)
+    # 分块写入临时文件并校验大小，按内容哈希命名（相同内容只保存一份）
+    try:
+        saved = await save_upload(file, UPLOAD_DIR, ext, MAX_FILE_SIZE)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # 更新数据库中的头像URL
-    avatar_url = f"/uploads/avatars/{filename}"
+    avatar_url = f"/uploads/avatars/{saved.filename}"
     success = UserService.update_avatar(current_user["id"], avatar_url)
     
     if not success:
-        # 删除已上传的文件
-        os.remove(filepath)
+        # 删除本次新增的文件（已存在的同内容文件可能被其他用户引用）
+        if not saved.existed:
+            os.remove(saved.path)
         raise HTTPException(status_code=500, detail="更新头像失败")
     
     return {
@@ -58,3 +58,39 @@ class ASRService:
                 "error": "无法连接上游ASR服务",
                 "details": str(e)
             }
+
+    @staticmethod
+    async def process_media(
+        media_id: str,
+        lang: str = "auto",
+        keys: Optional[str] = None
+    ) -> dict:
+        """
+        识别服务端已转码的音频（识别服务按文件ID 内存映射 PCM 旁路文件，不再上传音频内容）
+        
+        Args:
+            media_id: 媒体ID（见 audio_pipeline.media_id_from_url）
+            lang: 语言代码（默认: auto）
+            keys: 可选的关键词
+            
+        Returns:
+            包含识别结果的字典
+        """
+        data = {"file_ids": media_id, "lang": lang}
+        if keys:
+            data["keys"] = keys
+        
+        try:
+            response = requests.post(Config.PYTHON_ASR_LOCAL_URL, data=data, timeout=30)
+            try:
+                return response.json()
+            except Exception:
+                return {
+                    "error": "上游ASR返回无效JSON",
+                    "raw": response.text
+                }
+        except requests.RequestException as e:
+            return {
+                "error": "无法连接上游ASR服务",
+                "details": str(e)
+            }
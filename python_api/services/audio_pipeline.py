@@ -0,0 +1,248 @@
+"""
+音频规范化服务模块
+帖子音频上传后由后台线程池调用 ffmpeg 一次性转码：
+- 16 kHz 单声道 Opus（uploads/audio/<id>.opus），体积小，用于播放
+- 16 kHz 单声道 16 位小端裸 PCM（AUDIO_PCM_DIR/<id>.pcm），识别时可直接内存映射，无需解码重采样
+posts.audio_status 即任务队列：pending → processing → ready / failed，
+发帖后立即提交，定期扫描补漏（多进程以 SKIP LOCKED 分摊，进程崩溃遗留的任务超时后重新领取）；
+未安装 ffmpeg 的进程不领取任务，已排队的帖子保持 pending，由安装了 ffmpeg 的进程接手；
+该进程中新发的帖子直接标记为 failed，客户端播放原始音频
+"""
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from ..config import Config
+from ..database.connection import get_db_connection
+from ..utils.periodic import PeriodicTask
+
+# 与 main.py 挂载的静态目录一致
+UPLOAD_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
+AUDIO_DIR = os.path.join(UPLOAD_ROOT, "audio")
+
+# 上传接口生成的音频地址：/uploads/audio/<媒体ID>.<扩展名>
+_AUDIO_URL = re.compile(r"^/uploads/audio/([0-9A-Za-z_-]+)\.[0-9A-Za-z]+$")
+_MEDIA_ID = re.compile(r"^[0-9A-Za-z_-]+$")
+
+# PCM 旁路文件格式（识别端按此解释内存映射的数据）
+PCM_SAMPLE_RATE = 16000
+PCM_DTYPE = "int16"
+
+
+def media_id_from_url(audio_url: Optional[str]) -> Optional[str]:
+    """从本站音频地址取媒体ID（外部地址返回 None）"""
+    match = _AUDIO_URL.match(audio_url or "")
+    return match.group(1) if match else None
+
+
+def pcm_path(media_id: str) -> Optional[str]:
+    """媒体ID 对应的 PCM 旁路文件路径（ID 非法时返回 None）"""
+    if not _MEDIA_ID.match(media_id or ""):
+        return None
+    return os.path.join(Config.AUDIO_PCM_DIR, f"{media_id}.pcm")
+
+
+class AudioPipeline:
+    """音频转码服务"""
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _task = None
+    _unavailable = False  # 启动时未找到 ffmpeg
+
+    @staticmethod
+    def ffmpeg() -> Optional[str]:
+        """ffmpeg 可执行文件路径（未安装时为 None）"""
+        return shutil.which(Config.FFMPEG_PATH)
+
+    @classmethod
+    def submit(cls, post_id: int):
+        """发帖提交后立即排队转码（未启动时由定期扫描处理，本进程缺少 ffmpeg 时标记为 failed）"""
+        if cls._executor is not None:
+            cls._executor.submit(cls._run, [post_id])
+        elif cls._unavailable:
+            cls._fail_pending([post_id])
+
+    @classmethod
+    def sweep(cls) -> int:
+        """
+        领取待转码的帖子并在线程池中处理
+
+        Returns:
+            本轮领取的任务数
+        """
+        claimed = cls._claim(None, Config.AUDIO_TRANSCODE_WORKERS * 4)
+        if claimed and cls._executor is not None:
+            futures = [cls._executor.submit(cls._process, post_id, audio_url) for post_id, audio_url in claimed]
+            for future in futures:
+                future.result()
+        return len(claimed)
+
+    @staticmethod
+    def _claim(post_ids: Optional[List[int]], limit: int) -> List[Tuple[int, str]]:
+        """把 pending（或处理超时）的帖子标记为 processing 并返回 (帖子ID, 音频地址)"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE posts p
+                    SET audio_status = 'processing', audio_claimed_at = NOW()
+                    WHERE p.id IN (
+                        SELECT id FROM posts
+                        WHERE (audio_status = 'pending'
+                               OR (audio_status = 'processing'
+                                   AND audio_claimed_at < NOW() - make_interval(secs => %s)))
+                          AND (%s::int[] IS NULL OR id = ANY(%s::int[]))
+                        ORDER BY id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING p.id, p.audio_url
+                """, (Config.AUDIO_TRANSCODE_TIMEOUT * 2, post_ids, post_ids, limit))
+                claimed = cur.fetchall()
+            conn.commit()
+            return claimed
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _fail_pending(post_ids: List[int]) -> int:
+        """无法转码时把指定的 pending 帖子标记为 failed"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE posts SET audio_status = 'failed'
+                    WHERE audio_status = 'pending' AND id = ANY(%s::int[])
+                """, (post_ids,))
+                count = cur.rowcount
+            conn.commit()
+            return count
+        except Exception as e:
+            conn.rollback()
+            print(f"[音频转码] 标记转码失败出错: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    @classmethod
+    def _run(cls, post_ids: List[int]):
+        try:
+            for post_id, audio_url in cls._claim(post_ids, len(post_ids)):
+                cls._process(post_id, audio_url)
+        except Exception as e:
+            print(f"[音频转码] 领取任务失败: {e}")
+
+    @classmethod
+    def _process(cls, post_id: int, audio_url: str):
+        """转码一个帖子的音频并写回状态"""
+        playback_url = None
+        try:
+            playback_url = cls.transcode(audio_url)
+        except Exception as e:
+            print(f"[音频转码] 帖子 {post_id} 转码失败: {e}")
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE posts
+                    SET audio_status = %s, audio_playback_url = %s
+                    WHERE id = %s AND audio_status = 'processing'
+                """, ("ready" if playback_url else "failed", playback_url, post_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    @classmethod
+    def transcode(cls, audio_url: str) -> str:
+        """
+        转码为 Opus 与 PCM（相同内容的上传共用同一媒体ID，已转码过的直接复用）
+
+        Args:
+            audio_url: 上传接口返回的音频地址
+
+        Returns:
+            Opus 文件的访问地址
+
+        Raises:
+            ValueError: 不是本站上传的音频
+            RuntimeError: ffmpeg 不可用或转码失败
+        """
+        media_id = media_id_from_url(audio_url)
+        if media_id is None:
+            raise ValueError(f"不是本站上传的音频: {audio_url}")
+        source = os.path.join(UPLOAD_ROOT, audio_url[len("/uploads/"):])
+        opus = os.path.join(AUDIO_DIR, f"{media_id}.opus")
+        pcm = pcm_path(media_id)
+        playback_url = f"/uploads/audio/{media_id}.opus"
+        if os.path.exists(opus) and os.path.exists(pcm):
+            return playback_url
+
+        ffmpeg = cls.ffmpeg()
+        if ffmpeg is None:
+            raise RuntimeError("未找到 ffmpeg")
+        os.makedirs(os.path.dirname(pcm), exist_ok=True)
+
+        # 一次解码同时输出两路，写临时文件后原子改名
+        # （内容相同的上传共用媒体ID，同一媒体可能被多个线程 / 进程同时转码，临时文件各自独立）
+        opus_tmp = pcm_tmp = None
+        try:
+            fd, opus_tmp = tempfile.mkstemp(dir=AUDIO_DIR, prefix=".transcode-", suffix=".opus")
+            os.close(fd)
+            fd, pcm_tmp = tempfile.mkstemp(dir=os.path.dirname(pcm), prefix=".transcode-", suffix=".pcm")
+            os.close(fd)
+            result = subprocess.run([
+                ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+                "-i", source, "-vn",
+                "-ac", "1", "-ar", str(PCM_SAMPLE_RATE),
+                "-c:a", "libopus", "-b:a", Config.AUDIO_OPUS_BITRATE, "-f", "ogg", opus_tmp,
+                "-ac", "1", "-ar", str(PCM_SAMPLE_RATE), "-f", "s16le", pcm_tmp,
+            ], capture_output=True, timeout=Config.AUDIO_TRANSCODE_TIMEOUT)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.decode("utf-8", "replace").strip()[-500:])
+            os.chmod(opus_tmp, 0o644)
+            os.replace(pcm_tmp, pcm)
+            os.replace(opus_tmp, opus)
+        finally:
+            for path in (opus_tmp, pcm_tmp):
+                if path and os.path.exists(path):
+                    os.remove(path)
+        return playback_url
+
+    @classmethod
+    def start(cls):
+        """
+        启动转码线程池与定期扫描
+
+        未安装 ffmpeg 时不启动：已排队的帖子保持 pending 留给其他进程，
+        之后在本进程发的帖子由 submit 直接标记为 failed
+        """
+        if Config.AUDIO_TRANSCODE_WORKERS <= 0:
+            return
+        if cls.ffmpeg() is None:
+            cls._unavailable = True
+            print("[警告] 未找到 ffmpeg，本进程不转码帖子音频，新发帖子的音频标记为 failed")
+            return
+        cls._unavailable = False
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=Config.AUDIO_TRANSCODE_WORKERS, thread_name_prefix="audio-transcode"
+            )
+            cls._task = PeriodicTask("audio-pipeline", Config.AUDIO_PIPELINE_POLL_INTERVAL, cls.sweep)
+        cls._task.start()
+
+    @classmethod
+    def stop(cls):
+        """停止定期扫描并等待进行中的转码结束"""
+        if cls._task is not None:
+            cls._task.stop(run_final=False)
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=True)
+            cls._executor = None
+            cls._task = None
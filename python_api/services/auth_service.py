@@ -3,7 +3,10 @@
 处理用户注册和登录的业务逻辑
 """
 from ..database import get_db_connection, ensure_users_table
-from ..utils import hash_password, verify_password
+from ..utils import (
+    hash_password, verify_password, needs_rehash, HashingBusyError,
+    revoke_user_tokens, invalidate_user
+)
 from .email_service import EmailService
 
 
@@ -24,19 +27,22 @@ class AuthService:
         Returns:
             包含注册结果的字典
         """
+        if email and not code:
+            return {"error": "请输入邮箱验证码"}
+        
+        # 先计算哈希再核销验证码，哈希线程池繁忙时验证码仍可重试
+        try:
+            password_hash = hash_password(password)
+        except HashingBusyError:
+            return {"error": "服务繁忙，请稍后重试"}
+        
         # 如果提供了邮箱，需要验证验证码
-        if email:
-            if not code:
-                return {"error": "请输入邮箱验证码"}
-            
-            if not EmailService.verify_code(email, code, "register"):
-                return {"error": "验证码无效或已过期"}
+        if email and not EmailService.verify_code(email, code, "register"):
+            return {"error": "验证码无效或已过期"}
         
         conn = get_db_connection()
         ensure_users_table(conn)
         
-        password_hash = hash_password(password)
-        
         try:
             with conn.cursor() as cur:
                 # 检查邮箱是否已被使用
@@ -92,7 +98,7 @@ class AuthService:
         try:
             with conn.cursor() as cur:
                 cur.execute(
-                    "SELECT id, password_hash FROM users WHERE username = %s",
+                    "SELECT id, password_hash, token_version FROM users WHERE username = %s",
                     (username.strip(),)
                 )
                 row = cur.fetchone()
@@ -100,12 +106,29 @@ class AuthService:
             if not row:
                 return {"error": "用户不存在"}
             
-            user_id, password_hash = row
+            user_id, password_hash, token_version = row
             
-            if not verify_password(password, password_hash):
-                return {"error": "密码错误"}
+            try:
+                if not verify_password(password, password_hash):
+                    return {"error": "密码错误"}
+                
+                # 迭代次数调整或旧格式哈希：按当前参数重新哈希
+                if needs_rehash(password_hash):
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            "UPDATE users SET password_hash = %s WHERE id = %s",
+                            (hash_password(password), user_id)
+                        )
+                    conn.commit()
+            except HashingBusyError:
+                return {"error": "服务繁忙，请稍后重试"}
             
-            return {"ok": True, "message": "登录成功", "userId": user_id}
+            return {
+                "ok": True,
+                "message": "登录成功",
+                "userId": user_id,
+                "tokenVersion": token_version or 0
+            }
         finally:
             conn.close()
     
@@ -122,6 +145,12 @@ class AuthService:
         Returns:
             包含操作结果的字典
         """
+        # 先计算哈希再核销验证码，哈希线程池繁忙时验证码仍可重试
+        try:
+            password_hash = hash_password(new_password)
+        except HashingBusyError:
+            return {"error": "服务繁忙，请稍后重试"}
+        
         # 验证验证码
         if not EmailService.verify_code(email, code, "reset_password"):
             return {"error": "验证码无效或已过期"}
@@ -141,13 +170,14 @@ class AuthService:
                 if not row:
                     return {"error": "该邮箱未注册"}
                 
-                # 更新密码
-                password_hash = hash_password(new_password)
+                # 更新密码，并吊销该用户已签发的 token
                 cur.execute(
                     "UPDATE users SET password_hash = %s WHERE email = %s",
                     (password_hash, email)
                 )
+                revoke_user_tokens(row[0], cursor=cur)
                 conn.commit()
+            invalidate_user(row[0])
             
             return {"ok": True, "message": "密码重置成功，请使用新密码登录"}
         except Exception as e:
@@ -0,0 +1,221 @@
+"""
+头像缩略图服务模块
+上传头像后由后台线程生成固定边长的方形缩略图（默认 48/96/256 像素 WebP），
+与原图存放在同一目录：<原图文件名>_<边长>.webp，原图以内容哈希命名，缩略图地址同样不会变化。
+users.avatar_variants 保存 {"边长": 地址}，NULL 表示尚未生成（定期扫描补漏、回填旧头像、
+重试暂时失败的头像），{} 表示无法生成（外部地址、原图不存在或无法解码），两者客户端均回退到 avatar_url。
+生成结果确定且写临时文件后原子改名，多进程重复处理同一用户无副作用
+"""
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from psycopg.types.json import Jsonb
+from ..config import Config
+from ..database.connection import get_db_connection
+from ..utils.periodic import PeriodicTask
+from .profile_cache import ProfileCache
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError, features
+except ImportError:
+    Image = None
+
+# 与 routes/users.py 的头像上传目录一致
+AVATAR_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads", "avatars")
+
+# 上传接口生成的头像地址：/uploads/avatars/<文件名>.<扩展名>
+_AVATAR_URL = re.compile(r"^/uploads/avatars/([0-9A-Za-z_-]+)\.[0-9A-Za-z]+$")
+
+
+class AvatarVariants:
+    """头像缩略图服务"""
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _task = None
+    # 上一轮扫描到的用户ID：生成失败的用户保持 NULL，轮转扫描避免它们占满每一轮的名额
+    _sweep_after = 0
+
+    @staticmethod
+    def sizes() -> List[int]:
+        """缩略图边长列表（从大到小）"""
+        return sorted({int(size) for size in Config.AVATAR_VARIANT_SIZES.split(",") if size.strip()}, reverse=True)
+
+    @staticmethod
+    def image_format() -> str:
+        """输出格式：配置为 webp 但 Pillow 不支持时退化为 jpeg"""
+        if Config.AVATAR_VARIANT_FORMAT.lower() == "webp" and features.check("webp"):
+            return "webp"
+        return "jpeg"
+
+    @classmethod
+    def submit(cls, user_id: int):
+        """头像变更提交后立即排队生成（未启动时由定期扫描处理）"""
+        if cls._executor is not None:
+            cls._executor.submit(cls._run, user_id)
+
+    @classmethod
+    def sweep(cls) -> int:
+        """
+        为缺少缩略图的用户生成缩略图
+
+        Returns:
+            本轮处理的用户数
+        """
+        limit = Config.AVATAR_VARIANT_WORKERS * 8
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT id, avatar_url FROM users
+                    WHERE avatar_url IS NOT NULL AND avatar_variants IS NULL AND id > %s
+                    ORDER BY id
+                    LIMIT %s
+                """, (cls._sweep_after, limit))
+                pending = cur.fetchall()
+        finally:
+            conn.close()
+        cls._sweep_after = pending[-1][0] if len(pending) == limit else 0
+
+        if pending and cls._executor is not None:
+            futures = [cls._executor.submit(cls._process, user_id, avatar_url) for user_id, avatar_url in pending]
+            for future in futures:
+                future.result()
+        return len(pending)
+
+    @classmethod
+    def _run(cls, user_id: int):
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT avatar_url FROM users
+                    WHERE id = %s AND avatar_url IS NOT NULL AND avatar_variants IS NULL
+                """, (user_id,))
+                row = cur.fetchone()
+        except Exception as e:
+            print(f"[头像缩略图] 读取用户 {user_id} 失败: {e}")
+            return
+        finally:
+            conn.close()
+        if row:
+            cls._process(user_id, row[0])
+
+    @classmethod
+    def _process(cls, user_id: int, avatar_url: str):
+        """
+        生成一个用户的缩略图并写回（头像已再次变更时不覆盖）
+
+        无法生成（外部地址、原图不存在或无法解码）记为 {}；
+        其他失败（未安装 Pillow、文件暂不可读、磁盘写满等）不写回，保持 NULL 由定期扫描重试
+        """
+        try:
+            variants: Dict[str, str] = cls.generate(avatar_url)
+        except ValueError:
+            variants = {}
+        except Exception as e:
+            print(f"[头像缩略图] 用户 {user_id} 生成失败: {e}")
+            return
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE users SET avatar_variants = %s
+                    WHERE id = %s AND avatar_url = %s
+                """, (Jsonb(variants), user_id, avatar_url))
+            conn.commit()
+        finally:
+            conn.close()
+        ProfileCache.invalidate(user_id)
+
+    @classmethod
+    def generate(cls, avatar_url: str) -> Dict[str, str]:
+        """
+        生成方形缩略图（居中裁剪，不放大；已生成过的直接复用）
+
+        Args:
+            avatar_url: 上传接口返回的头像地址
+
+        Returns:
+            {"边长": 缩略图地址}
+
+        Raises:
+            ValueError: 不是本站上传的头像，或原图不存在 / 无法识别
+            RuntimeError: 未安装 Pillow
+            OSError: 读取或写入文件失败
+        """
+        match = _AVATAR_URL.match(avatar_url or "")
+        if match is None:
+            raise ValueError(f"不是本站上传的头像: {avatar_url}")
+        if Image is None:
+            raise RuntimeError("未安装 Pillow")
+
+        stem = match.group(1)
+        image_format = cls.image_format()
+        ext = ".webp" if image_format == "webp" else ".jpg"
+        sizes = cls.sizes()
+        targets = {size: os.path.join(AVATAR_DIR, f"{stem}_{size}{ext}") for size in sizes}
+        variants = {str(size): f"/uploads/avatars/{stem}_{size}{ext}" for size in reversed(sizes)}
+        if all(os.path.exists(path) for path in targets.values()):
+            return variants
+
+        try:
+            image = Image.open(os.path.join(AVATAR_DIR, os.path.basename(avatar_url)))
+        except (FileNotFoundError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+            raise ValueError(f"原图不存在或无法识别: {avatar_url}") from e
+        with image:
+            # JPEG 按缩小的比例直接解码，大图无需完整解码
+            image.draft("RGB", (sizes[0], sizes[0]))
+            image = ImageOps.exif_transpose(image)
+            has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+            image = image.convert("RGBA" if has_alpha else "RGB")
+
+        if has_alpha and image_format == "jpeg":
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+
+        side = min(image.size)
+        left, top = (image.width - side) // 2, (image.height - side) // 2
+        square = image.crop((left, top, left + side, top + side))
+
+        for size, path in targets.items():
+            edge = min(size, side)
+            thumbnail = square.resize((edge, edge), Image.LANCZOS, reducing_gap=3.0)
+            fd, tmp_path = tempfile.mkstemp(dir=AVATAR_DIR, prefix=".variant-", suffix=ext)
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    thumbnail.save(out, format=image_format, quality=Config.AVATAR_VARIANT_QUALITY)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        return variants
+
+    @classmethod
+    def start(cls):
+        """启动生成线程池与定期扫描（未安装 Pillow 时不启动，头像保持原图）"""
+        if Config.AVATAR_VARIANT_WORKERS <= 0:
+            return
+        if Image is None:
+            print("[警告] 未安装 Pillow，不生成头像缩略图")
+            return
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=Config.AVATAR_VARIANT_WORKERS, thread_name_prefix="avatar-variants"
+            )
+            cls._task = PeriodicTask("avatar-variants", Config.AVATAR_VARIANT_POLL_INTERVAL, cls.sweep)
+        cls._task.start()
+
+    @classmethod
+    def stop(cls):
+        """停止定期扫描并等待进行中的任务结束"""
+        if cls._task is not None:
+            cls._task.stop(run_final=False)
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=True)
+            cls._executor = None
+            cls._task = None
@@ -4,8 +4,12 @@
 """
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+from psycopg.rows import class_row
 from ..database.connection import get_db_connection
-from ..models.user import get_level_name
+from ..models.rows import AuthorRow, CommentRow
+from .counter_service import CounterService
+from .outbox_service import OutboxService
+from .profile_cache import ProfileCache
 
 
 class CommentService:
@@ -64,50 +68,38 @@ class CommentService:
                 comment_id = result[0]
                 created_at = result[1]
                 
-                # 更新帖子评论数
-                cur.execute("""
-                    UPDATE posts 
-                    SET comments_count = comments_count + 1,
-                        updated_at = NOW()
-                    WHERE id = %s
-                """, (post_id,))
+                # 增加用户积分（发表评论 +5），与评论同事务写入发件箱
+                OutboxService.add_points(cur, user_id, 5, "发表评论")
                 
-                # 增加用户积分（发表评论 +5）
-                CommentService._add_user_points(cur, user_id, 5, "发表评论")
+                # 回复通知 / 评论帖子通知
+                if parent_id:
+                    OutboxService.notify(
+                        cur,
+                        user_id=parent_author_id,
+                        type="reply",
+                        actor_id=user_id,
+                        post_id=post_id,
+                        comment_id=comment_id,
+                        content="回复了你的评论"
+                    )
+                else:
+                    OutboxService.notify(
+                        cur,
+                        user_id=post_author_id,
+                        type="comment",
+                        actor_id=user_id,
+                        post_id=post_id,
+                        comment_id=comment_id,
+                        content="评论了你的帖子"
+                    )
                 
                 # 获取作者信息
                 author_info = CommentService._get_author_info(cur, user_id)
                 
                 conn.commit()
                 
-                # 发送通知
-                try:
-                    from .notification_service import NotificationService
-                    if parent_id:
-                        # 回复通知
-                        # parent_author_id captured above
-                        if parent_author_id != user_id:
-                            NotificationService.create_notification(
-                                user_id=parent_author_id,
-                                type="reply",
-                                actor_id=user_id,
-                                post_id=post_id,
-                                comment_id=comment_id,
-                                content="回复了你的评论"
-                            )
-                    else:
-                        # 评论帖子通知
-                        if post_author_id != user_id:
-                            NotificationService.create_notification(
-                                user_id=post_author_id,
-                                type="comment",
-                                actor_id=user_id,
-                                post_id=post_id,
-                                comment_id=comment_id,
-                                content="评论了你的帖子"
-                            )
-                except Exception as e:
-                    print(f"Notification error: {e}")
+                # 更新帖子评论数（异步合并写回）
+                CounterService.incr("posts", "comments_count", post_id, 1)
                 
                 return {
                     "id": comment_id,
@@ -152,116 +144,87 @@ class CommentService:
             with conn.cursor() as cur:
                 offset = (page - 1) * page_size
                 
-                # 获取顶级评论（parent_id IS NULL）
-                cur.execute("""
-                    SELECT c.id, c.post_id, c.user_id, c.parent_id, c.content, 
-                           c.audio_url, c.likes_count, c.is_deleted, c.created_at,
-                           u.username, u.nickname, u.avatar_url, u.level,
-                           (SELECT COUNT(*) FROM comments WHERE parent_id = c.id AND is_deleted = FALSE) as reply_count
-                    FROM comments c
-                    JOIN users u ON c.user_id = u.id
-                    WHERE c.post_id = %s AND c.parent_id IS NULL AND c.is_deleted = FALSE
-                    ORDER BY c.created_at DESC
-                    LIMIT %s OFFSET %s
-                """, (post_id, page_size, offset))
-                
-                rows = cur.fetchall()
-                
-                # 获取总评论数（包括回复）
+                # 一次查询取回：当前页顶级评论 + 每条评论的前3条回复 + 回复数 + 查看者点赞状态
+                with conn.cursor(row_factory=class_row(CommentRow)) as rows_cur:
+                    rows_cur.execute("""
+                        WITH page AS (
+                            SELECT c.id, c.post_id, c.user_id, c.parent_id, c.content,
+                                   c.audio_url, c.likes_count, c.is_deleted, c.created_at
+                            FROM comments c
+                            WHERE c.post_id = %(post_id)s AND c.parent_id IS NULL AND c.is_deleted = FALSE
+                            ORDER BY c.created_at DESC
+                            LIMIT %(limit)s OFFSET %(offset)s
+                        ),
+                        replies AS (
+                            SELECT r.id, r.post_id, r.user_id, r.parent_id, r.content,
+                                   r.audio_url, r.likes_count, r.is_deleted, r.created_at,
+                                   ROW_NUMBER() OVER (
+                                       PARTITION BY r.parent_id ORDER BY r.created_at ASC, r.id ASC
+                                   ) AS rn
+                            FROM comments r
+                            WHERE r.parent_id IN (SELECT id FROM page) AND r.is_deleted = FALSE
+                        ),
+                        reply_counts AS (
+                            SELECT parent_id, COUNT(*) AS reply_count
+                            FROM replies
+                            GROUP BY parent_id
+                        ),
+                        combined AS (
+                            SELECT p.id, p.post_id, p.user_id, p.parent_id, p.content,
+                                   p.audio_url, p.likes_count, p.is_deleted, p.created_at,
+                                   COALESCE(rc.reply_count, 0) AS reply_count, 0 AS rn
+                            FROM page p
+                            LEFT JOIN reply_counts rc ON rc.parent_id = p.id
+                            UNION ALL
+                            SELECT id, post_id, user_id, parent_id, content,
+                                   audio_url, likes_count, is_deleted, created_at,
+                                   0 AS reply_count, rn
+                            FROM replies
+                            WHERE rn <= 3
+                        ),
+                        liked AS (
+                            SELECT comment_id FROM likes
+                            WHERE user_id = %(viewer_id)s
+                              AND comment_id IN (SELECT id FROM combined)
+                        )
+                        SELECT c.id, c.post_id, c.user_id, c.parent_id, c.content,
+                               c.audio_url, c.likes_count, c.is_deleted, c.created_at,
+                               c.reply_count,
+                               (l.comment_id IS NOT NULL) AS is_liked
+                        FROM combined c
+                        LEFT JOIN liked l ON l.comment_id = c.id
+                        ORDER BY c.rn, c.created_at DESC, c.id DESC
+                    """, {
+                        "post_id": post_id,
+                        "limit": page_size,
+                        "offset": offset,
+                        "viewer_id": viewer_id
+                    })
+                    rows = rows_cur.fetchall()
+                
+                # 总评论数（包括回复）与顶级评论数，一次扫描
                 cur.execute("""
-                    SELECT COUNT(*) FROM comments 
+                    SELECT COUNT(*),
+                           COUNT(*) FILTER (WHERE parent_id IS NULL)
+                    FROM comments 
                     WHERE post_id = %s AND is_deleted = FALSE
                 """, (post_id,))
-                total = cur.fetchone()[0]
+                total, top_level_total = cur.fetchone()
                 
-                # 获取顶级评论总数
-                cur.execute("""
-                    SELECT COUNT(*) FROM comments 
-                    WHERE post_id = %s AND parent_id IS NULL AND is_deleted = FALSE
-                """, (post_id,))
-                top_level_total = cur.fetchone()[0]
+                # 作者信息经由用户资料缓存，最多一次 users 查询
+                CommentService._fill(cur, rows)
                 
+                # 顶级评论按 created_at DESC 在前（rn = 0），回复按 rn 升序在后
                 comments = []
-                for row in rows:
-                    comment_id = row[0]
-                    
-                    # 检查是否点赞
-                    is_liked = False
-                    if viewer_id:
-                        cur.execute("""
-                            SELECT 1 FROM likes 
-                            WHERE user_id = %s AND comment_id = %s
-                        """, (viewer_id, comment_id))
-                        is_liked = cur.fetchone() is not None
-                    
-                    # 获取最近的回复（最多3条）
-                    cur.execute("""
-                        SELECT c.id, c.post_id, c.user_id, c.parent_id, c.content, 
-                               c.audio_url, c.likes_count, c.is_deleted, c.created_at,
-                               u.username, u.nickname, u.avatar_url, u.level
-                        FROM comments c
-                        JOIN users u ON c.user_id = u.id
-                        WHERE c.parent_id = %s AND c.is_deleted = FALSE
-                        ORDER BY c.created_at ASC
-                        LIMIT 3
-                    """, (comment_id,))
-                    reply_rows = cur.fetchall()
-                    
-                    replies = []
-                    for reply_row in reply_rows:
-                        reply_is_liked = False
-                        if viewer_id:
-                            cur.execute("""
-                                SELECT 1 FROM likes 
-                                WHERE user_id = %s AND comment_id = %s
-                            """, (viewer_id, reply_row[0]))
-                            reply_is_liked = cur.fetchone() is not None
-                        
-                        replies.append({
-                            "id": reply_row[0],
-                            "post_id": reply_row[1],
-                            "user_id": reply_row[2],
-                            "parent_id": reply_row[3],
-                            "content": reply_row[4],
-                            "audio_url": reply_row[5],
-                            "likes_count": reply_row[6],
-                            "is_liked": reply_is_liked,
-                            "is_deleted": reply_row[7],
-                            "author": {
-                                "id": reply_row[2],
-                                "username": reply_row[9],
-                                "nickname": reply_row[10],
-                                "avatar_url": reply_row[11],
-                                "level": reply_row[12],
-                                "level_name": get_level_name(reply_row[12])
-                            },
-                            "created_at": reply_row[8],
-                            "replies": [],
-                            "reply_count": 0
-                        })
-                    
-                    comments.append({
-                        "id": comment_id,
-                        "post_id": row[1],
-                        "user_id": row[2],
-                        "parent_id": row[3],
-                        "content": row[4],
-                        "audio_url": row[5],
-                        "likes_count": row[6],
-                        "is_liked": is_liked,
-                        "is_deleted": row[7],
-                        "author": {
-                            "id": row[2],
-                            "username": row[9],
-                            "nickname": row[10],
-                            "avatar_url": row[11],
-                            "level": row[12],
-                            "level_name": get_level_name(row[12])
-                        },
-                        "created_at": row[8],
-                        "replies": replies,
-                        "reply_count": row[13]
-                    })
+                by_id = {}
+                for comment in rows:
+                    if comment.parent_id is None:
+                        comments.append(comment)
+                        by_id[comment.id] = comment
+                    else:
+                        parent = by_id.get(comment.parent_id)
+                        if parent is not None:
+                            parent.replies.append(comment)
                 
                 has_more = (page * page_size) < top_level_total
                 
@@ -297,18 +260,16 @@ class CommentService:
                 offset = (page - 1) * page_size
                 
                 # 获取回复
-                cur.execute("""
-                    SELECT c.id, c.post_id, c.user_id, c.parent_id, c.content, 
-                           c.audio_url, c.likes_count, c.is_deleted, c.created_at,
-                           u.username, u.nickname, u.avatar_url, u.level
-                    FROM comments c
-                    JOIN users u ON c.user_id = u.id
-                    WHERE c.parent_id = %s AND c.is_deleted = FALSE
-                    ORDER BY c.created_at ASC
-                    LIMIT %s OFFSET %s
-                """, (comment_id, page_size, offset))
-                
-                rows = cur.fetchall()
+                with conn.cursor(row_factory=class_row(CommentRow)) as rows_cur:
+                    rows_cur.execute("""
+                        SELECT c.id, c.post_id, c.user_id, c.parent_id, c.content, 
+                               c.audio_url, c.likes_count, c.is_deleted, c.created_at
+                        FROM comments c
+                        WHERE c.parent_id = %s AND c.is_deleted = FALSE
+                        ORDER BY c.created_at ASC
+                        LIMIT %s OFFSET %s
+                    """, (comment_id, page_size, offset))
+                    replies = rows_cur.fetchall()
                 
                 # 获取总回复数
                 cur.execute("""
@@ -317,38 +278,17 @@ class CommentService:
                 """, (comment_id,))
                 total = cur.fetchone()[0]
                 
-                replies = []
-                for row in rows:
-                    is_liked = False
-                    if viewer_id:
-                        cur.execute("""
-                            SELECT 1 FROM likes 
-                            WHERE user_id = %s AND comment_id = %s
-                        """, (viewer_id, row[0]))
-                        is_liked = cur.fetchone() is not None
-                    
-                    replies.append({
-                        "id": row[0],
-                        "post_id": row[1],
-                        "user_id": row[2],
-                        "parent_id": row[3],
-                        "content": row[4],
-                        "audio_url": row[5],
-                        "likes_count": row[6],
-                        "is_liked": is_liked,
-                        "is_deleted": row[7],
-                        "author": {
-                            "id": row[2],
-                            "username": row[9],
-                            "nickname": row[10],
-                            "avatar_url": row[11],
-                            "level": row[12],
-                            "level_name": get_level_name(row[12])
-                        },
-                        "created_at": row[8],
-                        "replies": [],
-                        "reply_count": 0
-                    })
+                # 一次查询取回本页所有回复的点赞状态
+                if viewer_id and replies:
+                    cur.execute("""
+                        SELECT comment_id FROM likes 
+                        WHERE user_id = %s AND comment_id = ANY(%s)
+                    """, (viewer_id, [reply.id for reply in replies]))
+                    liked_ids = {r[0] for r in cur.fetchall()}
+                    for reply in replies:
+                        reply.is_liked = reply.id in liked_ids
+                
+                CommentService._fill(cur, replies)
                 
                 has_more = (page * page_size) < total
                 
@@ -397,15 +337,10 @@ class CommentService:
                     WHERE id = %s
                 """, (comment_id,))
                 
-                # 更新帖子评论数
-                cur.execute("""
-                    UPDATE posts 
-                    SET comments_count = GREATEST(0, comments_count - 1),
-                        updated_at = NOW()
-                    WHERE id = %s
-                """, (post_id,))
-                
                 conn.commit()
+                
+                # 更新帖子评论数（异步合并写回）
+                CounterService.incr("posts", "comments_count", post_id, -1)
                 return True
                 
         except Exception as e:
@@ -457,14 +392,7 @@ class CommentService:
                         WHERE user_id = %s AND comment_id = %s
                     """, (user_id, comment_id))
                     
-                    cur.execute("""
-                        UPDATE comments 
-                        SET likes_count = GREATEST(0, likes_count - 1)
-                        WHERE id = %s
-                        RETURNING likes_count
-                    """, (comment_id,))
-                    
-                    new_count = cur.fetchone()[0]
+                    delta = -1
                     is_liked = False
                 else:
                     # 添加点赞
@@ -473,36 +401,31 @@ class CommentService:
                         VALUES (%s, %s, NOW())
                     """, (user_id, comment_id))
                     
-                    cur.execute("""
-                        UPDATE comments 
-                        SET likes_count = likes_count + 1
-                        WHERE id = %s
-                        RETURNING likes_count
-                    """, (comment_id,))
-                    
-                    new_count = cur.fetchone()[0]
+                    delta = 1
                     is_liked = True
                     
-                    # 给评论作者加积分（获得点赞 +2）
+                    # 给评论作者加积分（获得点赞 +2）并通知，按评论+点赞者去重
                     if comment_author_id != user_id:
-                        CommentService._add_user_points(cur, comment_author_id, 2, "评论获得点赞")
-                
-                conn.commit()
-                
-                # 发送通知
-                if is_liked and comment_author_id != user_id:
-                     try:
-                        from .notification_service import NotificationService
-                        NotificationService.create_notification(
+                        OutboxService.add_points(
+                            cur, comment_author_id, 2, "评论获得点赞",
+                            dedup_key=f"points:like_comment:{comment_id}:{user_id}"
+                        )
+                        OutboxService.notify(
+                            cur,
                             user_id=comment_author_id,
                             type="like",
                             actor_id=user_id,
                             post_id=post_id,
                             comment_id=comment_id,
-                            content="点赞了你的评论"
+                            content="点赞了你的评论",
+                            dedup_key=f"notification:like_comment:{comment_id}:{user_id}"
                         )
-                     except Exception as e:
-                        print(f"Notification error: {e}")
+                
+                conn.commit()
+                
+                # 更新评论点赞数（异步合并写回，不在请求内锁评论行）
+                CounterService.incr("comments", "likes_count", comment_id, delta)
+                new_count = CounterService.current("comments", "likes_count", comment_id, result[1])
 
                 return {
                     "is_liked": is_liked,
@@ -517,67 +440,15 @@ class CommentService:
             conn.close()
 
     @staticmethod
-    def _get_author_info(cursor, user_id: int) -> Dict[str, Any]:
-        """获取作者信息"""
-        cursor.execute("""
-            SELECT id, username, nickname, avatar_url, level
-            FROM users WHERE id = %s
-        """, (user_id,))
-        user = cursor.fetchone()
-        
-        if not user:
-            return {
-                "id": user_id,
-                "username": "未知用户",
-                "nickname": None,
-                "avatar_url": None,
-                "level": 1,
-                "level_name": "方言新手"
-            }
-        
-        return {
-            "id": user[0],
-            "username": user[1],
-            "nickname": user[2],
-            "avatar_url": user[3],
-            "level": user[4] or 1,
-            "level_name": get_level_name(user[4] or 1)
-        }
-
-    @staticmethod
-    def _add_user_points(cursor, user_id: int, points: int, reason: str):
-        """增加用户积分"""
-        cursor.execute("""
-            UPDATE users 
-            SET points = COALESCE(points, 0) + %s,
-                updated_at = NOW()
-            WHERE id = %s
-        """, (points, user_id))
-        
-        # 检查是否需要升级
-        cursor.execute("""
-            SELECT points FROM users WHERE id = %s
-        """, (user_id,))
-        result = cursor.fetchone()
-        if result:
-            total_points = result[0] or 0
-            new_level = CommentService._calculate_level(total_points)
-            cursor.execute("""
-                UPDATE users SET level = %s WHERE id = %s
-            """, (new_level, user_id))
+    def _fill(cursor, comments: List[CommentRow]):
+        """补全评论行的作者信息（经由用户资料缓存）与尚未写回的点赞数增量"""
+        profiles = ProfileCache.get_many((comment.user_id for comment in comments), cursor)
+        authors = {user_id: ProfileCache.author(profile, user_id) for user_id, profile in profiles.items()}
+        for comment in comments:
+            comment.likes_count = CounterService.current("comments", "likes_count", comment.id, comment.likes_count)
+            comment.author = authors.get(comment.user_id) or ProfileCache.author(None, comment.user_id)
 
     @staticmethod
-    def _calculate_level(points: int) -> int:
-        """根据积分计算等级"""
-        if points >= 10000:
-            return 6
-        elif points >= 5000:
-            return 5
-        elif points >= 2000:
-            return 4
-        elif points >= 500:
-            return 3
-        elif points >= 100:
-            return 2
-        else:
-            return 1
+    def _get_author_info(cursor, user_id: int) -> AuthorRow:
+        """获取作者信息（经由用户资料缓存）"""
+        return ProfileCache.author(ProfileCache.get(user_id, cursor), user_id)
@@ -0,0 +1,178 @@
+"""
+计数合并服务模块
+点赞数、评论数、粉丝数等冗余计数列的增量先在进程内合并，
+再由后台任务批量写回；定期按明细表重算以修正漂移
+"""
+from typing import Dict, List, Tuple
+from ..config import Config
+from ..database.connection import get_db_connection
+from ..utils.periodic import PeriodicTask
+from ..utils.sharded_counter import ShardedCounter
+from .profile_cache import ProfileCache
+
+
+class CounterService:
+    """冗余计数合并服务"""
+
+    # 允许缓冲的计数列 (表, 列)，SQL 中的表名/列名只从这里取
+    COLUMNS = {
+        ("posts", "likes_count"),
+        ("posts", "comments_count"),
+        ("comments", "likes_count"),
+        ("users", "followers_count"),
+        ("users", "following_count"),
+    }
+
+    # 对账规则：(表, 列, 按 id 聚合真实计数的子查询)
+    RECONCILE_SOURCES = [
+        ("posts", "likes_count",
+         "SELECT post_id AS id, COUNT(*) AS cnt FROM likes WHERE post_id IS NOT NULL GROUP BY post_id"),
+        ("posts", "comments_count",
+         "SELECT post_id AS id, COUNT(*) AS cnt FROM comments WHERE is_deleted = FALSE GROUP BY post_id"),
+        ("comments", "likes_count",
+         "SELECT comment_id AS id, COUNT(*) AS cnt FROM likes WHERE comment_id IS NOT NULL GROUP BY comment_id"),
+        ("users", "followers_count",
+         "SELECT following_id AS id, COUNT(*) AS cnt FROM follows GROUP BY following_id"),
+        ("users", "following_count",
+         "SELECT follower_id AS id, COUNT(*) AS cnt FROM follows GROUP BY follower_id"),
+    ]
+
+    _counter = ShardedCounter()
+    _flush_task = None
+    _reconcile_task = None
+
+    @classmethod
+    def incr(cls, table: str, column: str, row_id: int, delta: int = 1) -> int:
+        """
+        记录计数增量（不访问数据库）
+
+        Args:
+            table: 表名
+            column: 计数列名
+            row_id: 行ID
+            delta: 增量，可为负数
+
+        Returns:
+            该计数尚未写回数据库的增量
+        """
+        if (table, column) not in cls.COLUMNS:
+            raise ValueError(f"不支持的计数列: {table}.{column}")
+        return cls._counter.add((table, column, row_id), delta)
+
+    @classmethod
+    def pending(cls, table: str, column: str, row_id: int) -> int:
+        """获取该计数尚未写回数据库的增量"""
+        return cls._counter.get((table, column, row_id))
+
+    @classmethod
+    def current(cls, table: str, column: str, row_id: int, stored: int) -> int:
+        """数据库中的值加上未写回的增量（不小于 0）"""
+        return max(0, (stored or 0) + cls.pending(table, column, row_id))
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        将缓冲的增量写回数据库，每个 (表, 列) 一条 UPDATE ... FROM (VALUES ...)
+
+        Returns:
+            本次写回的计数个数
+        """
+        if not len(cls._counter):
+            return 0
+
+        # 先取得连接再取出增量：连接失败时增量仍留在缓冲中
+        conn = get_db_connection()
+        pending = cls._counter.drain()
+        try:
+            if not pending:
+                return 0
+            groups: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+            for (table, column, row_id), delta in pending.items():
+                groups.setdefault((table, column), []).append((row_id, delta))
+
+            with conn.cursor() as cur:
+                # 按表、列、id 排序写入，避免多进程同时刷新时互相死锁
+                for (table, column), items in sorted(groups.items()):
+                    items.sort()
+                    placeholders = ", ".join(["(%s::int, %s::int)"] * len(items))
+                    params = [value for item in items for value in item]
+                    cur.execute(f"""
+                        UPDATE {table} t
+                        SET {column} = GREATEST(COALESCE(t.{column}, 0) + v.delta, 0)
+                        FROM (VALUES {placeholders}) AS v(id, delta)
+                        WHERE t.id = v.id
+                    """, params)
+            conn.commit()
+            cls._invalidate_profiles(groups)
+            return len(pending)
+        except Exception:
+            conn.rollback()
+            # 写回失败，放回缓冲等待下一次刷新
+            cls._counter.restore(pending.items())
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _invalidate_profiles(groups: Dict[Tuple[str, str], List[Tuple[int, int]]]):
+        """用户计数写回后使资料缓存失效（缓存中保存的是数据库值）"""
+        for (table, _), items in groups.items():
+            if table == "users":
+                ProfileCache.invalidate_many(row_id for row_id, _ in items)
+
+    @classmethod
+    def reconcile(cls) -> int:
+        """
+        按 likes / comments / follows 明细重算冗余计数，修正漂移
+
+        其他进程尚未写回的增量可能在重算后再被叠加一次，
+        由下一轮对账修正。
+
+        Returns:
+            被修正的行数
+        """
+        cls.flush()
+
+        fixed = 0
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                for table, column, source in cls.RECONCILE_SOURCES:
+                    cur.execute(f"""
+                        UPDATE {table} t
+                        SET {column} = COALESCE(s.cnt, 0)
+                        FROM {table} t2
+                        LEFT JOIN ({source}) s ON s.id = t2.id
+                        WHERE t.id = t2.id
+                          AND t.{column} IS DISTINCT FROM COALESCE(s.cnt, 0)
+                    """)
+                    fixed += cur.rowcount
+                    conn.commit()
+            if fixed:
+                ProfileCache.clear()
+                print(f"[计数对账] 修正了 {fixed} 个计数")
+            return fixed
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @classmethod
+    def start(cls):
+        """启动后台批量写回与定期对账"""
+        if cls._flush_task is None:
+            cls._flush_task = PeriodicTask("counter-flush", Config.COUNTER_FLUSH_INTERVAL, cls.flush)
+            cls._reconcile_task = PeriodicTask("counter-reconcile", Config.COUNTER_RECONCILE_INTERVAL, cls.reconcile)
+        cls._flush_task.start()
+        cls._reconcile_task.start()
+
+    @classmethod
+    def stop(cls):
+        """停止后台任务，并把剩余增量写回数据库"""
+        if cls._reconcile_task is not None:
+            cls._reconcile_task.stop(run_final=False)
+        if cls._flush_task is not None:
+            cls._flush_task.stop(run_final=True)
+        else:
+            cls.flush()
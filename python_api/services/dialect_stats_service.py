@@ -0,0 +1,118 @@
+"""
+方言标签统计服务模块
+dialect_tag_counts 按标签保存未删除帖子数，发帖 / 删帖时在同一事务内增减，
+首页标签云按索引直接取前 N 个；定期按 posts 重算修正漂移
+"""
+from typing import Any, Dict, List, Optional
+from ..config import Config
+from ..database.connection import get_db_connection
+from ..utils.periodic import PeriodicTask
+
+
+class DialectStatsService:
+    """方言标签统计服务"""
+
+    _task = None
+
+    @staticmethod
+    def adjust(cursor, dialect_tag: Optional[str], delta: int):
+        """
+        在调用方事务内增减标签的帖子数
+
+        Args:
+            cursor: 调用方事务的游标
+            dialect_tag: 方言标签（为空时忽略）
+            delta: 增量（发帖 +1，删帖 -1）
+        """
+        if not dialect_tag:
+            return
+        cursor.execute("""
+            INSERT INTO dialect_tag_counts AS c (tag, post_count)
+            VALUES (%s, GREATEST(%s, 0))
+            ON CONFLICT (tag) DO UPDATE
+            SET post_count = GREATEST(c.post_count + %s, 0)
+        """, (dialect_tag, delta, delta))
+
+    @staticmethod
+    def top(limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        获取帖子数最多的标签
+
+        Args:
+            limit: 数量限制
+
+        Returns:
+            [{tag, count}]，按帖子数降序
+        """
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT tag, post_count
+                    FROM dialect_tag_counts
+                    WHERE post_count > 0
+                    ORDER BY post_count DESC, tag
+                    LIMIT %s
+                """, (limit,))
+                return [{"tag": row[0], "count": row[1]} for row in cur.fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def reconcile() -> int:
+        """
+        按 posts 重算各标签的帖子数
+
+        重算期间提交的发帖 / 删帖可能被覆盖，由下一轮对账修正。
+
+        Returns:
+            被修正的标签数
+        """
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    WITH actual AS (
+                        SELECT dialect_tag AS tag, COUNT(*) AS post_count
+                        FROM posts
+                        WHERE is_deleted = FALSE AND dialect_tag IS NOT NULL
+                        GROUP BY dialect_tag
+                    ), upserted AS (
+                        INSERT INTO dialect_tag_counts AS c (tag, post_count)
+                        SELECT tag, post_count FROM actual
+                        ON CONFLICT (tag) DO UPDATE
+                        SET post_count = EXCLUDED.post_count
+                        WHERE c.post_count <> EXCLUDED.post_count
+                        RETURNING 1
+                    ), zeroed AS (
+                        UPDATE dialect_tag_counts c
+                        SET post_count = 0
+                        WHERE c.post_count <> 0
+                          AND NOT EXISTS (SELECT 1 FROM actual a WHERE a.tag = c.tag)
+                        RETURNING 1
+                    )
+                    SELECT (SELECT COUNT(*) FROM upserted) + (SELECT COUNT(*) FROM zeroed)
+                """)
+                fixed = cur.fetchone()[0]
+            conn.commit()
+            if fixed:
+                print(f"[方言统计对账] 修正了 {fixed} 个标签")
+            return fixed
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @classmethod
+    def start(cls):
+        """启动定期对账"""
+        if cls._task is None:
+            cls._task = PeriodicTask("dialect-stats-reconcile", Config.DIALECT_STATS_RECONCILE_INTERVAL, cls.reconcile)
+        cls._task.start()
+
+    @classmethod
+    def stop(cls):
+        """停止定期对账"""
+        if cls._task is not None:
+            cls._task.stop(run_final=False)
@@ -12,6 +12,7 @@ from email.utils import formataddr
 from datetime import datetime, timedelta, timezone
 from ..config import Config
 from ..database import get_db_connection, ensure_verification_codes_table
+from .outbox_service import OutboxService
 
 
 class EmailService:
@@ -87,6 +88,9 @@ class EmailService:
         Returns:
             包含操作结果的字典
         """
+        if not Config.SMTP_USER or not Config.SMTP_PASSWORD:
+            return {"error": "SMTP 配置缺失，请在 .env.local 中配置 SMTP_USER 和 SMTP_PASSWORD"}
+        
         conn = get_db_connection()
         ensure_verification_codes_table(conn)
         
@@ -115,17 +119,6 @@ class EmailService:
             code = cls.generate_code()
             expires_at = datetime.now(timezone.utc) + timedelta(minutes=Config.CODE_EXPIRE_MINUTES)
             
-            # 保存验证码到数据库
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO verification_codes (email, code, purpose, expires_at)
-                    VALUES (%s, %s, %s, %s)
-                    """,
-                    (email, code, purpose, expires_at)
-                )
-                conn.commit()
-            
             # 根据用途生成邮件内容
             if purpose == "register":
                 subject = "【方言宝】注册验证码"
@@ -172,11 +165,19 @@ class EmailService:
             </html>
             """
             
-            # 发送邮件
-            if cls.send_email(email, subject, html_content):
-                return {"ok": True, "message": "验证码已发送，请查收邮件"}
-            else:
-                return {"error": "邮件发送失败，请稍后重试"}
+            # 保存验证码，并在同一事务中写入发件箱，由后台线程发送邮件
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO verification_codes (email, code, purpose, expires_at)
+                    VALUES (%s, %s, %s, %s)
+                    """,
+                    (email, code, purpose, expires_at)
+                )
+                OutboxService.send_email(cur, email, subject, html_content)
+                conn.commit()
+            
+            return {"ok": True, "message": "验证码已发送，请查收邮件"}
                 
         except Exception as e:
             return {"error": f"发送验证码失败: {str(e)}"}
@@ -4,8 +4,11 @@
 """
 from typing import Optional, List, Tuple
 from ..database.connection import get_db_connection
-from ..models.user import UserPublicProfile, get_level_name
+from ..models.user import UserPublicProfile
 from ..models.follow import FollowerListResponse, FollowingListResponse
+from .counter_service import CounterService
+from .outbox_service import OutboxService
+from .profile_cache import ProfileCache
 
 class FollowService:
     """关注服务类"""
@@ -47,33 +50,21 @@ class FollowService:
                         VALUES (%s, %s)
                     """, (follower_id, following_id))
                     
-                    # 更新被关注者的粉丝数
-                    cur.execute("""
-                        UPDATE users 
-                        SET followers_count = followers_count + 1
-                        WHERE id = %s
-                    """, (following_id,))
-                    
-                    # 更新关注者的关注数
-                    cur.execute("""
-                        UPDATE users 
-                        SET following_count = following_count + 1
-                        WHERE id = %s
-                    """, (follower_id,))
+                    # 关注通知与关注记录同事务写入发件箱（反复关注不重复通知）
+                    OutboxService.notify(
+                        cur,
+                        user_id=following_id,
+                        type="follow",
+                        actor_id=follower_id,
+                        content="关注了你",
+                        dedup_key=f"notification:follow:{follower_id}:{following_id}"
+                    )
                     
                     conn.commit()
                     
-                    # 发送通知
-                    try:
-                        from .notification_service import NotificationService
-                        NotificationService.create_notification(
-                            user_id=following_id,
-                            type="follow",
-                            actor_id=follower_id,
-                            content="关注了你"
-                        )
-                    except Exception as e:
-                        print(f"Notification error: {e}")
+                    # 更新粉丝数与关注数（异步合并写回）
+                    CounterService.incr("users", "followers_count", following_id, 1)
+                    CounterService.incr("users", "following_count", follower_id, 1)
 
                     return True
                 except Exception as e:
@@ -116,21 +107,11 @@ class FollowService:
                         WHERE follower_id = %s AND following_id = %s
                     """, (follower_id, following_id))
                     
-                    # 更新被关注者的粉丝数
-                    cur.execute("""
-                        UPDATE users 
-                        SET followers_count = GREATEST(followers_count - 1, 0)
-                        WHERE id = %s
-                    """, (following_id,))
-                    
-                    # 更新关注者的关注数
-                    cur.execute("""
-                        UPDATE users 
-                        SET following_count = GREATEST(following_count - 1, 0)
-                        WHERE id = %s
-                    """, (follower_id,))
-                    
                     conn.commit()
+                    
+                    # 更新粉丝数与关注数（异步合并写回）
+                    CounterService.incr("users", "followers_count", following_id, -1)
+                    CounterService.incr("users", "following_count", follower_id, -1)
                     return True
                 except Exception as e:
                     conn.rollback()
@@ -173,58 +154,15 @@ class FollowService:
                 total = cur.fetchone()[0]
                 
                 # 获取列表
-                # Join users table to get follower details
                 cur.execute("""
-                    SELECT u.id, u.username, u.nickname, u.avatar_url, u.bio,
-                           u.hometown, u.dialect, u.points, u.level,
-                           u.followers_count, u.following_count, u.created_at
+                    SELECT f.follower_id
                     FROM follows f
-                    JOIN users u ON f.follower_id = u.id
                     WHERE f.following_id = %s
                     ORDER BY f.created_at DESC
                     LIMIT %s OFFSET %s
                 """, (user_id, size, offset))
-                
-                items = []
-                for row in cur.fetchall():
-                    current_user_id = row[0]
-                    # Check if viewer follows this user
-                    is_following = False
-                    if viewer_id and viewer_id != current_user_id:
-                        # Optimization: could use a subquery or join above, 
-                        # but separate query is safer for now to avoid complexity
-                        with conn.cursor() as check_cur:
-                            check_cur.execute("""
-                                SELECT 1 FROM follows 
-                                WHERE follower_id = %s AND following_id = %s
-                            """, (viewer_id, current_user_id))
-                            is_following = check_cur.fetchone() is not None
-                    
-                    level = row[8] or 1
-                    items.append(UserPublicProfile(
-                        id=current_user_id,
-                        username=row[1],
-                        nickname=row[2],
-                        avatar_url=row[3],
-                        bio=row[4],
-                        hometown=row[5],
-                        dialect=row[6],
-                        points=row[7] or 0,
-                        level=level,
-                        level_name=get_level_name(level),
-                        followers_count=row[9] or 0,
-                        following_count=row[10] or 0,
-                        is_following=is_following,
-                        created_at=row[11] # Follow created_at, or user created_at? 
-                        # UserPublicProfile expects created_at as user creation time, but row[11] is follow time.
-                        # Ideally should fetch user creation time, but follow time is useful for list sorting.
-                        # Let's fetch user created_at instead to match model semantics.
-                    ))
-                
-                # Re-querying to get user created_at correctly if needed, 
-                # but UserPublicProfile created_at is optional. 
-                # Let's adjust the SQL to fetch u.created_at instead of f.created_at 
-                # but sort by f.created_at.
+                ids = [row[0] for row in cur.fetchall()]
+                items = FollowService._build_profiles(cur, ids, viewer_id)
                 
                 return FollowerListResponse(
                     items=items,
@@ -251,49 +189,15 @@ class FollowService:
                 
                 # 获取列表
                 cur.execute("""
-                    SELECT u.id, u.username, u.nickname, u.avatar_url, u.bio,
-                           u.hometown, u.dialect, u.points, u.level,
-                           u.followers_count, u.following_count, u.created_at
+                    SELECT f.following_id
                     FROM follows f
-                    JOIN users u ON f.following_id = u.id
                     WHERE f.follower_id = %s
                     ORDER BY f.created_at DESC
                     LIMIT %s OFFSET %s
                 """, (user_id, size, offset))
-                
-                items = []
-                for row in cur.fetchall():
-                    current_user_id = row[0]
-                    
-                    is_following = False
-                    if viewer_id:
-                        if viewer_id == user_id:
-                            is_following = True
-                        elif viewer_id != current_user_id:
-                             with conn.cursor() as check_cur:
-                                check_cur.execute("""
-                                    SELECT 1 FROM follows 
-                                    WHERE follower_id = %s AND following_id = %s
-                                """, (viewer_id, current_user_id))
-                                is_following = check_cur.fetchone() is not None
-                    
-                    level = row[8] or 1
-                    items.append(UserPublicProfile(
-                        id=current_user_id,
-                        username=row[1],
-                        nickname=row[2],
-                        avatar_url=row[3],
-                        bio=row[4],
-                        hometown=row[5],
-                        dialect=row[6],
-                        points=row[7] or 0,
-                        level=level,
-                        level_name=get_level_name(level),
-                        followers_count=row[9] or 0,
-                        following_count=row[10] or 0,
-                        is_following=is_following,
-                        created_at=row[11]
-                    ))
+                ids = [row[0] for row in cur.fetchall()]
+                # 查看自己的关注列表时全部为已关注
+                items = FollowService._build_profiles(cur, ids, viewer_id, all_followed=(viewer_id == user_id))
                 
                 return FollowingListResponse(
                     items=items,
@@ -303,3 +207,32 @@ class FollowService:
                 )
         finally:
             conn.close()
+
+    @staticmethod
+    def _build_profiles(cursor, user_ids: List[int], viewer_id: Optional[int] = None,
+                        all_followed: bool = False) -> List[UserPublicProfile]:
+        """
+        按顺序组装用户列表：资料经由用户资料缓存，关注状态一次批量查询
+        
+        Args:
+            cursor: 数据库游标
+            user_ids: 用户ID列表（保持顺序）
+            viewer_id: 查看者ID
+            all_followed: 是否全部视为已关注（查看自己的关注列表）
+        """
+        profiles = ProfileCache.get_many(user_ids, cursor)
+        
+        followed = set()
+        if all_followed:
+            followed = set(user_ids)
+        elif viewer_id and user_ids:
+            cursor.execute("""
+                SELECT following_id FROM follows
+                WHERE follower_id = %s AND following_id = ANY(%s)
+            """, (viewer_id, user_ids))
+            followed = {row[0] for row in cursor.fetchall()}
+        
+        return [
+            ProfileCache.public_profile(profiles[user_id], is_following=user_id in followed)
+            for user_id in user_ids if user_id in profiles
+        ]
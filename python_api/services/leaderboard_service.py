@@ -0,0 +1,142 @@
+"""
+排行榜服务模块
+总榜、周榜、月榜保存在进程内的有序结构中，积分变动时增量更新；
+定期按 users / points_daily 全量重建，修正窗口滑动与多进程间的偏差
+"""
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from ..config import Config
+from ..database.connection import get_db_connection
+from ..models.user import get_level_name
+from ..utils.leaderboard import SortedLeaderboard
+from ..utils.periodic import PeriodicTask
+from .profile_cache import ProfileCache
+
+
+class LeaderboardService:
+    """排行榜服务"""
+
+    # 周榜 / 月榜统计的天数（含今天，周榜为今天及之前 6 天）
+    WINDOWS = {"weekly": 7, "monthly": 30}
+
+    _boards: Dict[str, SortedLeaderboard] = {
+        "total": SortedLeaderboard(),
+        "weekly": SortedLeaderboard(),
+        "monthly": SortedLeaderboard(),
+    }
+    _built = False
+    _build_lock = threading.Lock()
+    _task = None
+
+    @classmethod
+    def rebuild(cls):
+        """从数据库全量重建所有榜单"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, points FROM users WHERE points > 0")
+                totals = cur.fetchall()
+                windows = {}
+                for name, days in cls.WINDOWS.items():
+                    cur.execute("""
+                        SELECT user_id, SUM(points)
+                        FROM points_daily
+                        WHERE day > CURRENT_DATE - %s
+                        GROUP BY user_id
+                    """, (days,))
+                    windows[name] = cur.fetchall()
+        finally:
+            conn.close()
+
+        cls._boards["total"].replace(totals)
+        for name, rows in windows.items():
+            cls._boards[name].replace((user_id, int(points)) for user_id, points in rows)
+        cls._built = True
+
+    @classmethod
+    def _ensure_built(cls):
+        if cls._built:
+            return
+        with cls._build_lock:
+            if not cls._built:
+                cls.rebuild()
+
+    @classmethod
+    def record(cls, awards: Iterable[Tuple[int, int, Optional[int]]]):
+        """
+        积分变动后增量更新榜单（在积分写入成功后调用）
+
+        Args:
+            awards: [(用户ID, 本次积分, 更新后的总积分)]
+        """
+        if not cls._built:
+            return
+        for user_id, points, total in awards:
+            if total is not None:
+                cls._boards["total"].set(user_id, total)
+            for name in cls.WINDOWS:
+                cls._boards[name].add(user_id, points)
+
+    @classmethod
+    def top(cls, type: str = "total", limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        获取排行榜前 limit 名
+
+        Args:
+            type: 类型 (total=总榜, weekly=周榜, monthly=月榜)
+            limit: 数量限制
+        """
+        board = cls._boards.get(type)
+        if board is None:
+            return []
+        cls._ensure_built()
+        entries = board.top(limit)
+        if not entries:
+            return []
+
+        profiles = ProfileCache.get_many(user_id for user_id, _ in entries)
+        result = []
+        for user_id, points in entries:
+            profile = profiles.get(user_id)
+            if profile is None:
+                continue
+            result.append({
+                "id": profile.id,
+                "username": profile.username,
+                "nickname": profile.nickname,
+                "avatar_url": profile.avatar_url,
+                "level": profile.level,
+                "level_name": get_level_name(profile.level),
+                "points": points
+            })
+        return result
+
+    @classmethod
+    def rank(cls, user_id: int, type: str = "total") -> Dict[str, Any]:
+        """
+        查询用户在榜单中的名次
+
+        Returns:
+            {rank, points}，未上榜时 rank 为 None
+        """
+        board = cls._boards.get(type)
+        if board is None:
+            return {"rank": None, "points": 0}
+        cls._ensure_built()
+        entry = board.rank(user_id)
+        if entry is None:
+            return {"rank": None, "points": 0}
+        return {"rank": entry[0], "points": entry[1]}
+
+    @classmethod
+    def start(cls):
+        """启动定期重建"""
+        if cls._task is None:
+            cls._task = PeriodicTask("leaderboard-rebuild", Config.LEADERBOARD_REBUILD_INTERVAL, cls.rebuild)
+        cls._task.start()
+
+    @classmethod
+    def stop(cls):
+        """停止定期重建"""
+        if cls._task is not None:
+            cls._task.stop(run_final=False)
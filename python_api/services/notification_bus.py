@@ -0,0 +1,192 @@
+"""
+通知推送总线模块
+通知写入时在同一事务中 pg_notify，每个进程的监听线程 LISTEN 后
+分发给本进程的 SSE 订阅者，并维护内存中的未读数。
+消息携带提交后的未读数（写入方持有用户行锁时读出），监听线程直接覆盖缓存，
+不在缓存上做增减：缓存未命中时从数据库加载的值可能已包含某条尚未送达的通知
+"""
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List, Optional, Set
+from ..database.connection import get_db_connection
+from ..utils.ttl_cache import TTLCache
+
+
+class NotificationBus:
+    """通知推送总线"""
+
+    CHANNEL = "notifications"
+    SUBSCRIBER_QUEUE_SIZE = 100
+
+    # user_id -> {(事件循环, 队列)}
+    _subscribers: Dict[int, Set[tuple]] = {}
+    # user_id -> 未读数（未缓存时首次读取从数据库加载）
+    _unread = TTLCache(maxsize=100000, ttl=600)
+    _lock = threading.Lock()
+
+    _thread: Optional[threading.Thread] = None
+    _stop_event = threading.Event()
+
+    # ------------------------------------------------------------------
+    # 发布（在写入通知的事务内调用，提交后才会送达）
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def publish(cls, cursor, messages: List[Dict[str, Any]]):
+        """
+        在调用方事务内发布消息（pg_notify，事务提交后送达所有进程）
+
+        Args:
+            cursor: 调用方事务的游标
+            messages: 消息列表，每条需包含 event 与 user_id
+        """
+        if not messages:
+            return
+        payloads = [json.dumps(m, ensure_ascii=False, default=str) for m in messages]
+        cursor.execute(
+            "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+            (cls.CHANNEL, payloads)
+        )
+
+    # ------------------------------------------------------------------
+    # 未读数
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def unread_count(cls, user_id: int) -> int:
+        """获取未读数（内存命中时不访问数据库）"""
+        with cls._lock:
+            count = cls._unread.get(user_id)
+        if count is not None:
+            return count
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT unread_notifications FROM users WHERE id = %s", (user_id,))
+                row = cur.fetchone()
+                count = row[0] if row else 0
+        finally:
+            conn.close()
+
+        with cls._lock:
+            cached = cls._unread.get(user_id)
+            if cached is not None:
+                return cached
+            cls._unread.set(user_id, count)
+        return count
+
+    @classmethod
+    def _set_unread(cls, user_id: int, count: Optional[int]) -> Optional[int]:
+        """用消息中的未读数覆盖缓存（旧格式消息不带未读数时丢弃缓存）"""
+        with cls._lock:
+            if count is None:
+                cls._unread.pop(user_id)
+            else:
+                cls._unread.set(user_id, count)
+        return count
+
+    # ------------------------------------------------------------------
+    # 订阅（在事件循环中调用）
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def subscribe(cls, user_id: int) -> asyncio.Queue:
+        """订阅某用户的推送，返回消息队列"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=cls.SUBSCRIBER_QUEUE_SIZE)
+        with cls._lock:
+            cls._subscribers.setdefault(user_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    @classmethod
+    def unsubscribe(cls, user_id: int, queue: asyncio.Queue):
+        """取消订阅"""
+        with cls._lock:
+            subscribers = cls._subscribers.get(user_id)
+            if not subscribers:
+                return
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                del cls._subscribers[user_id]
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: Dict[str, Any]):
+        """放入订阅队列；消费过慢时丢弃最旧的消息"""
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(message)
+
+    @classmethod
+    def _deliver_local(cls, user_id: int, message: Dict[str, Any]):
+        """线程安全地投递给本进程的订阅者"""
+        with cls._lock:
+            targets = list(cls._subscribers.get(user_id, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(cls._offer, queue, message)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    @classmethod
+    def _dispatch(cls, payload: str):
+        """处理一条 NOTIFY 消息"""
+        try:
+            message = json.loads(payload)
+            user_id = int(message["user_id"])
+        except (ValueError, KeyError, TypeError):
+            return
+
+        event = message.get("event")
+        if event == "notification":
+            cls._set_unread(user_id, message.get("unread"))
+        elif event == "read":
+            count = cls._set_unread(user_id, message.get("unread"))
+            message = {"event": "unread", "user_id": user_id, "unread": count}
+        cls._deliver_local(user_id, message)
+
+    # ------------------------------------------------------------------
+    # 监听线程
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _listen_loop(cls):
+        while not cls._stop_event.is_set():
+            conn = None
+            try:
+                conn = get_db_connection()
+                conn.autocommit = True
+                conn.execute(f"LISTEN {cls.CHANNEL}")
+                # 重新连接期间可能漏掉消息，未读数改为下次读取时重新加载
+                with cls._lock:
+                    cls._unread.clear()
+                while not cls._stop_event.is_set():
+                    for notify in conn.notifies(timeout=1.0):
+                        cls._dispatch(notify.payload)
+            except Exception as e:
+                print(f"[通知推送] 监听连接异常: {e}")
+                cls._stop_event.wait(5)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    @classmethod
+    def start(cls):
+        """启动监听线程"""
+        if cls._thread and cls._thread.is_alive():
+            return
+        cls._stop_event.clear()
+        cls._thread = threading.Thread(target=cls._listen_loop, name="notification-listener", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop(cls):
+        """停止监听线程"""
+        cls._stop_event.set()
+        if cls._thread:
+            cls._thread.join(5)
+            cls._thread = None
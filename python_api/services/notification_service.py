@@ -2,10 +2,17 @@
 通知服务模块
 处理通知相关的业务逻辑
 """
+import time
 from typing import Optional, List, Dict, Any
+from ..config import Config
 from ..database.connection import get_db_connection
-from ..models.notification import Notification
-from ..models.user import UserPublicProfile, get_level_name
+from ..models.rows import NotificationRow, row_with
+from ..models.user import UserPublicProfile
+from .notification_bus import NotificationBus
+from .profile_cache import ProfileCache
+
+# 参与合并的通知类型（system 等通知逐条保留）
+COALESCE_TYPES = ("like", "comment", "reply", "follow")
 
 class NotificationService:
     """通知服务类"""
@@ -37,24 +44,167 @@ class NotificationService:
         conn = get_db_connection()
         try:
             with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO notifications 
-                    (user_id, type, actor_id, post_id, comment_id, content)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                """, (user_id, type, actor_id, post_id, comment_id, content))
-                notification_id = cur.fetchone()[0]
+                ids = NotificationService.insert_many(cur, [{
+                    "user_id": user_id,
+                    "type": type,
+                    "actor_id": actor_id,
+                    "post_id": post_id,
+                    "comment_id": comment_id,
+                    "content": content
+                }])
                 conn.commit()
-                return notification_id
+                return ids[0] if ids else None
         except Exception as e:
             print(f"创建通知失败: {e}")
             return None
         finally:
             conn.close()
 
+    @staticmethod
+    def _group_key(item: Dict[str, Any]) -> Optional[str]:
+        """合并键：同一接收者、同类型、同帖子在同一时间窗口内的通知合并为一行"""
+        if item["type"] not in COALESCE_TYPES:
+            return None
+        bucket = int(time.time() // Config.NOTIFICATION_COALESCE_WINDOW)
+        return f"{item['type']}:{item.get('post_id') or 0}:{bucket}"
+
+    @staticmethod
+    def insert_many(cursor, items: List[Dict[str, Any]]) -> List[int]:
+        """
+        在调用方事务内批量写入通知，同事务累加接收者的未读数，
+        并发布实时推送（事务提交后才会推送给在线用户）
+        
+        点赞、评论、回复、关注按 (user_id, type, post_id, 时间窗口) 合并：
+        命中未读的同组通知时只追加触发者样本与条数，不新增行；
+        同组通知已读后另起一组
+        
+        Args:
+            cursor: 数据库游标
+            items: 通知列表，每项包含 user_id, type, actor_id, post_id, comment_id, content
+            
+        Returns:
+            新增或合并到的通知ID列表
+        """
+        rows = [
+            item for item in items
+            if not (item.get("actor_id") and item["user_id"] == item.get("actor_id"))
+        ]
+        if not rows:
+            return []
+        
+        # 同批次内先按合并键归并（一条 INSERT ... ON CONFLICT 不能两次更新同一行）
+        groups: List[Dict[str, Any]] = []
+        by_key: Dict[tuple, Dict[str, Any]] = {}
+        for item in rows:
+            group_key = NotificationService._group_key(item)
+            group = by_key.get((item["user_id"], group_key)) if group_key else None
+            if group is None:
+                group = {"user_id": item["user_id"], "type": item["type"], "post_id": item.get("post_id"),
+                         "group_key": group_key, "actor_ids": [], "group_count": 0}
+                groups.append(group)
+                if group_key:
+                    by_key[(item["user_id"], group_key)] = group
+            # 最新一条的触发者、评论、内容作为该组的展示内容
+            actor_id = item.get("actor_id")
+            group.update(actor_id=actor_id, comment_id=item.get("comment_id"), content=item.get("content"))
+            if actor_id:
+                if actor_id in group["actor_ids"]:
+                    group["actor_ids"].remove(actor_id)
+                group["actor_ids"].insert(0, actor_id)
+            group["group_count"] += 1
+        sample = Config.NOTIFICATION_ACTOR_SAMPLE
+        
+        # 按用户ID顺序锁定接收者行，与"全部已读"移动水位、单条已读互斥，
+        # 保证水位以下不会再出现计入未读数的通知；
+        # 持锁读到的未读数加上本批新增即为提交后的未读数，随推送下发
+        user_ids = sorted({group["user_id"] for group in groups})
+        cursor.execute("""
+            SELECT id, unread_notifications FROM users WHERE id = ANY(%s) ORDER BY id FOR UPDATE
+        """, (user_ids,))
+        unread_counts = dict(cursor.fetchall())
+        
+        # 已读（含水位以下）的同组通知不再合并：置空合并键，新通知另起一组
+        keyed = [group for group in groups if group["group_key"]]
+        if keyed:
+            cursor.execute("""
+                UPDATE notifications n
+                SET group_key = NULL
+                FROM users u, unnest(%s::int[], %s::text[]) AS k(user_id, group_key)
+                WHERE n.user_id = k.user_id AND n.group_key = k.group_key
+                  AND u.id = n.user_id
+                  AND (n.is_read OR n.id <= u.notifications_read_id)
+            """, ([group["user_id"] for group in keyed], [group["group_key"] for group in keyed]))
+        
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s::int[], %s)"] * len(groups))
+        params = []
+        for group in groups:
+            params.extend([
+                group["user_id"], group["type"], group["actor_id"],
+                group["post_id"], group["comment_id"], group["content"],
+                group["group_key"], group["actor_ids"][:sample], group["group_count"]
+            ])
+        # 新样本在前，与原样本去重后截断
+        cursor.execute(f"""
+            INSERT INTO notifications AS n
+            (user_id, type, actor_id, post_id, comment_id, content, group_key, actor_ids, group_count)
+            VALUES {placeholders}
+            ON CONFLICT (user_id, group_key) WHERE group_key IS NOT NULL DO UPDATE
+            SET actor_id = EXCLUDED.actor_id,
+                comment_id = EXCLUDED.comment_id,
+                content = EXCLUDED.content,
+                actor_ids = ARRAY(
+                    SELECT a
+                    FROM unnest(EXCLUDED.actor_ids || n.actor_ids) WITH ORDINALITY AS t(a, ord)
+                    GROUP BY a
+                    ORDER BY MIN(ord)
+                    LIMIT {int(sample)}
+                ),
+                group_count = n.group_count + EXCLUDED.group_count,
+                updated_at = NOW()
+            RETURNING n.id, n.user_id, n.type, n.actor_id, n.post_id, n.comment_id, n.content,
+                      n.created_at, n.updated_at, n.actor_ids, n.group_count, (n.xmax = 0) AS inserted
+        """, params)
+        written = cursor.fetchall()
+        
+        # 只有新增的行计入未读数（合并到的组本身就是未读）
+        unread: Dict[int, int] = {}
+        for row in written:
+            if row[11]:
+                unread[row[1]] = unread.get(row[1], 0) + 1
+        if unread:
+            counts = sorted(unread.items())
+            cursor.execute(f"""
+                UPDATE users u
+                SET unread_notifications = u.unread_notifications + v.n
+                FROM (VALUES {", ".join(["(%s::int, %s::int)"] * len(counts))}) AS v(id, n)
+                WHERE u.id = v.id
+            """, [value for item in counts for value in item])
+            for user_id, n in counts:
+                unread_counts[user_id] += n
+        
+        NotificationBus.publish(cursor, [{
+            "event": "notification",
+            "user_id": row[1],
+            "merged": not row[11],
+            "unread": unread_counts.get(row[1], 0),
+            "notification": {
+                "id": row[0],
+                "type": row[2],
+                "actor_id": row[3],
+                "post_id": row[4],
+                "comment_id": row[5],
+                "content": row[6],
+                "created_at": row[7].isoformat() if row[7] else None,
+                "updated_at": row[8].isoformat() if row[8] else None,
+                "actor_ids": row[9] or [],
+                "group_count": row[10]
+            }
+        } for row in written])
+        return [row[0] for row in written]
+
     @staticmethod
     def get_notifications(user_id: int, page: int = 1, size: int = 20) -> Dict[str, Any]:
-        """获取通知列表"""
+        """获取通知列表（合并后的通知按最近更新时间排序）"""
         conn = get_db_connection()
         offset = (page - 1) * size
         
@@ -64,55 +214,35 @@ class NotificationService:
                 cur.execute("SELECT COUNT(*) FROM notifications WHERE user_id = %s", (user_id,))
                 total = cur.fetchone()[0]
                 
-                # 获取列表 (LEFT JOIN users to get actor info)
-                cur.execute("""
-                    SELECT n.id, n.user_id, n.type, n.actor_id, n.post_id, n.comment_id, 
-                           n.content, n.is_read, n.created_at,
-                           u.id, u.username, u.nickname, u.avatar_url, u.bio,
-                           u.hometown, u.dialect, u.points, u.level
-                    FROM notifications n
-                    LEFT JOIN users u ON n.actor_id = u.id
-                    WHERE n.user_id = %s
-                    ORDER BY n.created_at DESC
-                    LIMIT %s OFFSET %s
-                """, (user_id, size, offset))
+                # 获取列表，水位以下的通知视为已读
+                with conn.cursor(row_factory=row_with(NotificationRow, "actor_ids")) as rows_cur:
+                    rows_cur.execute("""
+                        SELECT n.id, n.user_id, n.type, n.actor_id, n.post_id, n.comment_id, 
+                               n.content, (n.is_read OR n.id <= r.notifications_read_id) AS is_read,
+                               n.created_at, COALESCE(n.group_count, 1) AS group_count, n.updated_at,
+                               n.actor_ids
+                        FROM notifications n
+                        JOIN users r ON r.id = n.user_id
+                        WHERE n.user_id = %s
+                        ORDER BY n.updated_at DESC, n.id DESC
+                        LIMIT %s OFFSET %s
+                    """, (user_id, size, offset))
+                    rows = rows_cur.fetchall()
+                
+                # 本页所有触发者的信息经由用户资料缓存，最多一次 users 查询
+                actor_ids = {item.actor_id for item, _ in rows if item.actor_id}
+                for _, sample in rows:
+                    actor_ids.update(sample or [])
+                actors: Dict[int, UserPublicProfile] = {
+                    actor_id: ProfileCache.public_profile(profile)
+                    for actor_id, profile in ProfileCache.get_many(actor_ids, cur).items()
+                }
                 
                 items = []
-                for row in cur.fetchall():
-                    # Build Notification Model
-                    actor = None
-                    if row[9]: # actor_id exists
-                        level = row[17] or 1
-                        actor = UserPublicProfile(
-                            id=row[9],
-                            username=row[10],
-                            nickname=row[11],
-                            avatar_url=row[12],
-                            bio=row[13],
-                            hometown=row[14],
-                            dialect=row[15],
-                            points=row[16] or 0,
-                            level=level,
-                            level_name=get_level_name(level),
-                            # For notifications, we don't strictly need accurate counts, 0 is fine
-                            followers_count=0, 
-                            following_count=0,
-                            is_following=False 
-                        )
-                    
-                    notification = Notification(
-                        id=row[0],
-                        user_id=row[1],
-                        type=row[2],
-                        actor_id=row[3],
-                        post_id=row[4],
-                        comment_id=row[5],
-                        content=row[6],
-                        is_read=row[7],
-                        created_at=row[8],
-                        actor=actor
-                    )
-                    items.append(notification)
+                for item, sample in rows:
+                    item.actor = actors.get(item.actor_id)
+                    item.actors = [actors[a] for a in (sample or []) if a in actors]
+                    items.append(item)
                 
                 return {
                     "items": items,
@@ -125,46 +255,82 @@ class NotificationService:
 
     @staticmethod
     def get_unread_count(user_id: int) -> int:
-        """获取未读通知数量"""
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT COUNT(*) FROM notifications 
-                    WHERE user_id = %s AND is_read = FALSE
-                """, (user_id,))
-                return cur.fetchone()[0]
-        finally:
-            conn.close()
+        """获取未读通知数量（内存缓存 users.unread_notifications，由推送总线维护）"""
+        return NotificationBus.unread_count(user_id)
 
     @staticmethod
     def mark_as_read(notification_id: int, user_id: int) -> bool:
-        """标记单条通知为已读"""
+        """标记单条通知为已读（原本未读时同事务扣减未读数）"""
         conn = get_db_connection()
         try:
             with conn.cursor() as cur:
+                # 锁定用户行，与通知写入、全部已读串行
                 cur.execute("""
-                    UPDATE notifications 
-                    SET is_read = TRUE 
+                    SELECT notifications_read_id FROM users WHERE id = %s FOR UPDATE
+                """, (user_id,))
+                row = cur.fetchone()
+                if not row:
+                    conn.rollback()
+                    return False
+                
+                cur.execute("""
+                    SELECT is_read OR id <= %s FROM notifications
                     WHERE id = %s AND user_id = %s
-                """, (notification_id, user_id))
+                """, (row[0], notification_id, user_id))
+                target = cur.fetchone()
+                if not target:
+                    conn.rollback()
+                    return False
+                
+                if not target[0]:
+                    cur.execute("UPDATE notifications SET is_read = TRUE WHERE id = %s", (notification_id,))
+                    cur.execute("""
+                        UPDATE users
+                        SET unread_notifications = GREATEST(unread_notifications - 1, 0)
+                        WHERE id = %s
+                        RETURNING unread_notifications
+                    """, (user_id,))
+                    unread = cur.fetchone()[0]
+                    NotificationBus.publish(cur, [{"event": "read", "user_id": user_id, "unread": unread}])
                 conn.commit()
-                return cur.rowcount > 0
+                return True
         finally:
             conn.close()
 
     @staticmethod
     def mark_all_as_read(user_id: int) -> int:
-        """标记所有通知为已读"""
+        """
+        标记所有通知为已读
+        
+        只把已读水位移动到当前最大通知ID并清零未读数，不逐行更新通知
+        
+        Returns:
+            原未读数
+        """
         conn = get_db_connection()
         try:
             with conn.cursor() as cur:
+                # 先锁定用户行（等待进行中的通知写入提交），
+                # 下一条语句取最大ID时才能看到这些通知
                 cur.execute("""
-                    UPDATE notifications 
-                    SET is_read = TRUE 
-                    WHERE user_id = %s AND is_read = FALSE
+                    SELECT unread_notifications FROM users WHERE id = %s FOR UPDATE
                 """, (user_id,))
+                row = cur.fetchone()
+                if not row:
+                    conn.rollback()
+                    return 0
+                count = row[0]
+                
+                cur.execute("""
+                    UPDATE users
+                    SET unread_notifications = 0,
+                        notifications_read_id = GREATEST(notifications_read_id, (
+                            SELECT COALESCE(MAX(id), 0) FROM notifications WHERE user_id = %s
+                        ))
+                    WHERE id = %s
+                """, (user_id, user_id))
+                NotificationBus.publish(cur, [{"event": "read", "user_id": user_id, "unread": 0}])
                 conn.commit()
-                return cur.rowcount
+                return count
         finally:
             conn.close()
@@ -0,0 +1,331 @@
+"""
+事务发件箱服务模块
+通知、积分、邮件等副作用与主操作写在同一事务的 outbox_events 表中，
+由后台线程批量取出并落库 / 发送，支持重试、去重与退避。
+通知、积分在领取事件的同一事务内落库，进程内状态（排行榜、资料缓存）在该事务提交后再更新；
+邮件等外部副作用不可回滚，领取时只续租（available_at 推后 OUTBOX_SEND_LEASE 秒）并提交，释放行锁后逐条发送、
+每条发送后立即单独标记完成，失败不会连带重发已发出的邮件；进程崩溃时租约到期后重新发送
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from psycopg.types.json import Jsonb
+from ..config import Config
+from ..database.connection import get_db_connection
+from ..utils.periodic import PeriodicTask
+
+
+def _handle_notifications(cur, payloads: List[Dict[str, Any]]):
+    """批量插入通知"""
+    from .notification_service import NotificationService
+    NotificationService.insert_many(cur, payloads)
+
+
+def _handle_points(cur, payloads: List[Dict[str, Any]]):
+    """整批交给积分账本入账（上限、流水、总积分与等级各一条批量语句），返回入账结果"""
+    from .points_ledger import PointsLedger
+    return PointsLedger.apply(cur, [(item["user_id"], item["points"], item["reason"]) for item in payloads])
+
+
+def _publish_points(awards: List[Any]):
+    """积分入账提交后更新排行榜与资料缓存"""
+    from .points_ledger import PointsLedger
+    PointsLedger.publish(awards)
+
+
+def _send_email(payload: Dict[str, Any]):
+    """发送一封邮件（失败抛出异常以触发重试）"""
+    from .email_service import EmailService
+    if not EmailService.send_email(payload["to"], payload["subject"], payload["html"]):
+        raise RuntimeError(f"邮件发送失败: {payload['to']}")
+
+
+class OutboxService:
+    """事务发件箱"""
+
+    # 事件类型 -> 批量处理函数（在领取事件的事务内执行，可返回结果列表）
+    HANDLERS: Dict[str, Callable[[Any, List[Dict[str, Any]]], Optional[List[Any]]]] = {
+        "notification": _handle_notifications,
+        "points": _handle_points,
+    }
+
+    # 事件类型 -> 提交后执行的函数（参数为本批成功执行的处理函数结果），事务回滚时不执行
+    AFTER_COMMIT: Dict[str, Callable[[List[Any]], None]] = {
+        "points": _publish_points,
+    }
+
+    # 事件类型 -> 单条发送函数（事务提交后执行，不持有行锁）
+    SENDERS: Dict[str, Callable[[Dict[str, Any]], None]] = {
+        "email": _send_email,
+    }
+
+    _task = None
+    _cleanup_task = None
+
+    # ------------------------------------------------------------------
+    # 写入（在调用方事务内）
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def enqueue(cursor, event_type: str, payload: Dict[str, Any],
+                dedup_key: Optional[str] = None) -> bool:
+        """
+        在调用方事务内写入一条待处理事件
+
+        Args:
+            cursor: 调用方事务的游标
+            event_type: 事件类型 (notification / points / email)
+            payload: 事件内容
+            dedup_key: 去重键，相同键的事件只会被写入一次
+
+        Returns:
+            是否写入（去重命中时返回 False）
+        """
+        if event_type not in OutboxService.HANDLERS and event_type not in OutboxService.SENDERS:
+            raise ValueError(f"未知的发件箱事件类型: {event_type}")
+        cursor.execute("""
+            INSERT INTO outbox_events (event_type, payload, dedup_key)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (dedup_key) WHERE dedup_key IS NOT NULL DO NOTHING
+        """, (event_type, Jsonb(payload), dedup_key))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def notify(cursor, user_id: int, type: str, actor_id: Optional[int] = None,
+               post_id: Optional[int] = None, comment_id: Optional[int] = None,
+               content: Optional[str] = None, dedup_key: Optional[str] = None) -> bool:
+        """写入通知事件（不给自己发通知）"""
+        if actor_id and user_id == actor_id:
+            return False
+        return OutboxService.enqueue(cursor, "notification", {
+            "user_id": user_id,
+            "type": type,
+            "actor_id": actor_id,
+            "post_id": post_id,
+            "comment_id": comment_id,
+            "content": content
+        }, dedup_key)
+
+    @staticmethod
+    def add_points(cursor, user_id: int, points: int, reason: str,
+                   dedup_key: Optional[str] = None) -> bool:
+        """写入积分事件"""
+        return OutboxService.enqueue(cursor, "points", {
+            "user_id": user_id,
+            "points": points,
+            "reason": reason
+        }, dedup_key)
+
+    @staticmethod
+    def send_email(cursor, to_email: str, subject: str, html_content: str) -> bool:
+        """写入邮件事件"""
+        return OutboxService.enqueue(cursor, "email", {
+            "to": to_email,
+            "subject": subject,
+            "html": html_content
+        })
+
+    # ------------------------------------------------------------------
+    # 后台处理
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def drain(cls) -> int:
+        """
+        处理所有已到期的待处理事件
+
+        每批最多 OUTBOX_BATCH_SIZE 条、每轮最多 OUTBOX_MAX_BATCHES 批，
+        剩余的留到下一轮，避免积压时长时间占用连接。
+
+        Returns:
+            本轮处理（成功或失败）的事件数
+        """
+        total = 0
+        for _ in range(Config.OUTBOX_MAX_BATCHES):
+            count = cls._process_batch(Config.OUTBOX_BATCH_SIZE)
+            total += count
+            if count < Config.OUTBOX_BATCH_SIZE:
+                break
+        return total
+
+    @classmethod
+    def _process_batch(cls, limit: int) -> int:
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                # SKIP LOCKED：多个进程的工作线程互不阻塞地分摊事件
+                cur.execute("""
+                    SELECT id, event_type, payload, attempts
+                    FROM outbox_events
+                    WHERE status = 'pending' AND available_at <= NOW()
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                """, (limit,))
+                events = cur.fetchall()
+                if not events:
+                    conn.rollback()
+                    return 0
+
+                groups: Dict[str, List[Tuple[int, Dict[str, Any], int]]] = {}
+                sends: List[Tuple[int, str, Dict[str, Any], int]] = []
+                for event_id, event_type, payload, attempts in events:
+                    if event_type in cls.SENDERS:
+                        sends.append((event_id, event_type, payload, attempts + 1))
+                    else:
+                        groups.setdefault(event_type, []).append((event_id, payload, attempts))
+
+                done: List[int] = []
+                failed: List[Tuple[int, int, str]] = []
+                results: Dict[str, List[Any]] = {}
+                for event_type, items in groups.items():
+                    handler = cls.HANDLERS.get(event_type)
+                    if handler is None:
+                        failed.extend((i, Config.OUTBOX_MAX_ATTEMPTS, "未知事件类型") for i, _, _ in items)
+                        continue
+                    ok, bad, output = cls._run_handler(cur, handler, items)
+                    done.extend(ok)
+                    failed.extend(bad)
+                    if output:
+                        results[event_type] = output
+
+                if done:
+                    cur.execute("""
+                        UPDATE outbox_events
+                        SET status = 'done', processed_at = NOW()
+                        WHERE id = ANY(%s)
+                    """, (done,))
+
+                for event_id, attempts, error in failed:
+                    cls._retry_later(cur, event_id, attempts + 1, error)
+
+                if sends:
+                    # 续租：租约内其他进程不会领取；计入尝试次数，反复崩溃的事件最终转为 dead
+                    cur.execute("""
+                        UPDATE outbox_events
+                        SET attempts = attempts + 1,
+                            available_at = NOW() + make_interval(secs => %s)
+                        WHERE id = ANY(%s)
+                    """, (Config.OUTBOX_SEND_LEASE, [event_id for event_id, _, _, _ in sends]))
+
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"[发件箱] 处理失败: {e}")
+            return 0
+        finally:
+            conn.close()
+
+        for event_type, output in results.items():
+            after_commit = cls.AFTER_COMMIT.get(event_type)
+            if after_commit is None:
+                continue
+            try:
+                after_commit(output)
+            except Exception as e:
+                print(f"[发件箱] {event_type} 提交后处理失败: {e}")
+
+        for event_id, event_type, payload, attempts in sends:
+            cls._deliver(event_id, cls.SENDERS[event_type], payload, attempts)
+        return len(events)
+
+    @classmethod
+    def _deliver(cls, event_id: int, sender, payload: Dict[str, Any], attempts: int):
+        """发送一条已续租的外部事件，并立即在独立的短事务中记录结果"""
+        error = None
+        try:
+            sender(payload)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                if error is None:
+                    cur.execute("""
+                        UPDATE outbox_events
+                        SET status = 'done', processed_at = NOW()
+                        WHERE id = %s
+                    """, (event_id,))
+                else:
+                    cls._retry_later(cur, event_id, attempts, error)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"[发件箱] 记录事件 {event_id} 结果失败: {e}")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _retry_later(cur, event_id: int, attempts: int, error: str):
+        """指数退避重试，超过最大次数后转为 dead（attempts 为计入本次后的尝试次数）"""
+        cur.execute("""
+            UPDATE outbox_events
+            SET attempts = %s,
+                last_error = %s,
+                available_at = NOW() + make_interval(secs => %s),
+                status = CASE WHEN %s >= %s THEN 'dead' ELSE 'pending' END
+            WHERE id = %s
+        """, (attempts, error[:500], min(2 ** attempts, 3600),
+              attempts, Config.OUTBOX_MAX_ATTEMPTS, event_id))
+
+    @staticmethod
+    def _run_handler(cur, handler, items) -> Tuple[List[int], List[Tuple[int, int, str]], List[Any]]:
+        """
+        先整批执行；整批失败时逐条重试，把失败隔离到具体事件
+
+        Returns:
+            (成功的事件ID列表, [(失败的事件ID, 已尝试次数, 错误信息)], 成功执行的处理函数结果)
+        """
+        cur.execute("SAVEPOINT outbox_batch")
+        try:
+            output = handler(cur, [payload for _, payload, _ in items])
+            cur.execute("RELEASE SAVEPOINT outbox_batch")
+            return [event_id for event_id, _, _ in items], [], list(output or [])
+        except Exception:
+            cur.execute("ROLLBACK TO SAVEPOINT outbox_batch")
+
+        done, failed, results = [], [], []
+        for event_id, payload, attempts in items:
+            cur.execute("SAVEPOINT outbox_item")
+            try:
+                output = handler(cur, [payload])
+                cur.execute("RELEASE SAVEPOINT outbox_item")
+                done.append(event_id)
+                results.extend(output or [])
+            except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT outbox_item")
+                failed.append((event_id, attempts, str(e)))
+        return done, failed, results
+
+    @classmethod
+    def cleanup(cls) -> int:
+        """删除超过保留期的已完成事件"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    DELETE FROM outbox_events
+                    WHERE status = 'done'
+                      AND processed_at < NOW() - make_interval(days => %s)
+                """, (Config.OUTBOX_RETENTION_DAYS,))
+                deleted = cur.rowcount
+            conn.commit()
+            return deleted
+        finally:
+            conn.close()
+
+    @classmethod
+    def start(cls):
+        """启动后台处理线程与定期清理"""
+        if cls._task is None:
+            cls._task = PeriodicTask("outbox-worker", Config.OUTBOX_POLL_INTERVAL, cls.drain)
+            cls._cleanup_task = PeriodicTask("outbox-cleanup", 3600, cls.cleanup)
+        cls._task.start()
+        cls._cleanup_task.start()
+
+    @classmethod
+    def stop(cls):
+        """停止后台线程，并处理完已到期的事件"""
+        if cls._cleanup_task is not None:
+            cls._cleanup_task.stop(run_final=False)
+        if cls._task is not None:
+            cls._task.stop(run_final=True)
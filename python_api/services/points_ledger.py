@@ -0,0 +1,150 @@
+"""
+积分账本模块
+所有积分变动（发帖、评论、点赞、签到、后台调整）都经由这里：
+按 (用户, 原因) 归并后，每日上限、积分流水、用户总积分与等级各用一条批量语句写入
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from ..database.connection import get_db_connection
+from ..models.user import LEVEL_POINTS
+
+
+# 每日积分上限（按原因）
+DAILY_LIMITS = {
+    "发布帖子": 50,
+    "发表评论": 30
+}
+
+
+def level_case_sql(points_expr: str) -> str:
+    """生成按积分计算等级的 SQL CASE 表达式（与 calculate_level 一致）"""
+    branches = " ".join(
+        f"WHEN {points_expr} >= {threshold} THEN {level}"
+        for level, threshold in sorted(LEVEL_POINTS.items(), reverse=True)
+        if threshold > 0
+    )
+    return f"CASE {branches} ELSE 1 END"
+
+
+def daily_cap_sql(reason_expr: str) -> str:
+    """生成按原因取每日上限的 SQL CASE 表达式（无上限时为 NULL）"""
+    branches = " ".join(
+        "WHEN '{}' THEN {}".format(reason.replace("'", "''"), limit)
+        for reason, limit in DAILY_LIMITS.items()
+    )
+    return f"CASE {reason_expr} {branches} END"
+
+
+class Award(NamedTuple):
+    """一个用户在本批次中的入账结果"""
+    user_id: int
+    granted: int  # 实际发放（扣除上限后）
+    points: int  # 更新后的总积分
+    level: int  # 更新后的等级
+
+
+class PointsLedger:
+    """积分账本"""
+
+    @staticmethod
+    def apply(cursor, events: Iterable[Tuple[int, int, Optional[str]]]) -> List[Award]:
+        """
+        在调用方事务内批量入账
+
+        1. 按 (用户, 原因) 归并，一条 upsert 累计每日汇总并按上限截断
+        2. 一条多行 INSERT 写积分流水
+        3. 一条多行 UPDATE 更新总积分与等级（等级只升不降）
+
+        Args:
+            cursor: 调用方事务的游标
+            events: [(用户ID, 积分, 原因)]
+
+        Returns:
+            有实际入账的用户结果列表；调用方提交后应调用 publish 更新排行榜
+        """
+        merged: Dict[Tuple[int, str], int] = {}
+        for user_id, points, reason in events:
+            key = (user_id, reason or "")
+            merged[key] = merged.get(key, 0) + points
+        rows = sorted(item for item in merged.items() if item[1] != 0)
+        if not rows:
+            return []
+
+        # 每日汇总与上限：插入时在 Python 中截断，冲突时在 SQL 中按原值截断；
+        # 上限只约束加分，扣分（撤销、后台调整）总是全额入账；
+        # SET 中引用的 d.points 均为更新前的值，last_granted 即本次实际发放
+        params = []
+        for (user_id, reason), points in rows:
+            limit = DAILY_LIMITS.get(reason)
+            first = min(points, limit) if limit is not None and points > 0 else points
+            params.extend([user_id, reason, first, first])
+        cap = daily_cap_sql("d.reason")
+        new_total = f"""CASE WHEN EXCLUDED.points < 0 THEN d.points + EXCLUDED.points
+            ELSE LEAST(d.points + EXCLUDED.points, COALESCE({cap}, d.points + EXCLUDED.points)) END"""
+        cursor.execute(f"""
+            INSERT INTO points_daily AS d (user_id, day, reason, points, last_granted)
+            VALUES {", ".join(["(%s::int, CURRENT_DATE, %s::text, %s::int, %s::int)"] * len(rows))}
+            ON CONFLICT (user_id, day, reason) DO UPDATE
+            SET last_granted = {new_total} - d.points,
+                points = {new_total}
+            WHERE EXCLUDED.points < 0 OR {cap} IS NULL OR d.points < {cap}
+            RETURNING d.user_id, d.reason, d.last_granted
+        """, params)
+        granted = [(user_id, reason, points) for user_id, reason, points in cursor.fetchall() if points]
+        if not granted:
+            return []
+
+        # 积分流水
+        granted.sort()
+        cursor.execute(f"""
+            INSERT INTO points_history (user_id, points, reason)
+            VALUES {", ".join(["(%s, %s, %s)"] * len(granted))}
+        """, [value for user_id, reason, points in granted for value in (user_id, points, reason or None)])
+
+        # 总积分与等级
+        totals: Dict[int, int] = {}
+        for user_id, _, points in granted:
+            totals[user_id] = totals.get(user_id, 0) + points
+        items = sorted(totals.items())
+        new_points = "COALESCE(u.points, 0) + v.delta"
+        cursor.execute(f"""
+            UPDATE users u
+            SET points = {new_points},
+                level = GREATEST(COALESCE(u.level, 1), {level_case_sql(new_points)}),
+                updated_at = NOW()
+            FROM (VALUES {", ".join(["(%s::int, %s::int)"] * len(items))}) AS v(id, delta)
+            WHERE u.id = v.id
+            RETURNING u.id, u.points, u.level
+        """, [value for item in items for value in item])
+        return [Award(user_id, totals[user_id], points, level) for user_id, points, level in cursor.fetchall()]
+
+    @staticmethod
+    def publish(awards: List[Award]):
+        """入账提交后更新排行榜，并使积分 / 等级已变化的用户资料缓存失效"""
+        from .leaderboard_service import LeaderboardService
+        from .profile_cache import ProfileCache
+        LeaderboardService.record((a.user_id, a.granted, a.points) for a in awards)
+        ProfileCache.invalidate_many(a.user_id for a in awards)
+
+    @staticmethod
+    def award(events: Iterable[Tuple[int, int, Optional[str]]]) -> List[Award]:
+        """
+        独立事务批量入账（提交后更新排行榜）
+
+        Args:
+            events: [(用户ID, 积分, 原因)]
+
+        Returns:
+            有实际入账的用户结果列表
+        """
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                awards = PointsLedger.apply(cur, events)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        PointsLedger.publish(awards)
+        return awards
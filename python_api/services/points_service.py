@@ -5,22 +5,21 @@
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from ..database.connection import get_db_connection
-from ..models.user import get_level_name, calculate_level
+from ..models.user import get_level_name
+from .leaderboard_service import LeaderboardService
+from .points_ledger import PointsLedger, DAILY_LIMITS
 
 
 class PointsService:
     """积分服务类"""
     
     # 每日积分上限配置
-    DAILY_LIMITS = {
-        "发布帖子": 50,
-        "发表评论": 30
-    }
+    DAILY_LIMITS = DAILY_LIMITS
     
     @staticmethod
     def add_points(user_id: int, points: int, reason: str) -> bool:
         """
-        增加积分（带上限检查）
+        增加积分（带上限检查，经由积分账本入账）
         
         Args:
             user_id: 用户ID
@@ -30,66 +29,11 @@ class PointsService:
         Returns:
             是否成功增加积分
         """
-        conn = get_db_connection()
         try:
-            with conn.cursor() as cur:
-                # 检查每日上限
-                if reason in PointsService.DAILY_LIMITS:
-                    limit = PointsService.DAILY_LIMITS[reason]
-                    
-                    # 查询今日已获积分
-                    cur.execute("""
-                        SELECT SUM(points) FROM points_history
-                        WHERE user_id = %s AND reason = %s 
-                        AND created_at >= CURRENT_DATE
-                    """, (user_id, reason))
-                    
-                    today_points = cur.fetchone()[0] or 0
-                    
-                    if today_points >= limit:
-                        return False
-                        
-                    # 如果本次增加会导致超限，只增加剩余部分
-                    if today_points + points > limit:
-                        points = max(0, limit - today_points)
-                        if points == 0:
-                            return False
-                
-                # 1. 记录积分流水
-                cur.execute("""
-                    INSERT INTO points_history (user_id, points, reason)
-                    VALUES (%s, %s, %s)
-                """, (user_id, points, reason))
-                
-                # 2. 更新用户总积分和等级
-                cur.execute("""
-                    UPDATE users 
-                    SET points = COALESCE(points, 0) + %s,
-                        updated_at = NOW()
-                    WHERE id = %s
-                    RETURNING points
-                """, (points, user_id))
-                
-                result = cur.fetchone()
-                if result:
-                    new_points = result[0]
-                    new_level = calculate_level(new_points)
-                    
-                    # 更新等级
-                    cur.execute("""
-                        UPDATE users 
-                        SET level = %s
-                        WHERE id = %s AND (level IS NULL OR level < %s)
-                    """, (new_level, user_id, new_level))
-                
-                conn.commit()
-                return True
+            return bool(PointsLedger.award([(user_id, points, reason)]))
         except Exception as e:
-            conn.rollback()
             print(f"增加积分失败: {e}")
             return False
-        finally:
-            conn.close()
     
     @staticmethod
     def daily_checkin(user_id: int) -> Dict[str, Any]:
@@ -132,16 +76,15 @@ class PointsService:
                     
                 total_points = base_points + bonus
                 
-                # 记录签到
+                # 记录签到，并在同一事务内入账
                 cur.execute("""
                     INSERT INTO user_checkins (user_id, checkin_date, consecutive_days, points_earned)
                     VALUES (%s, CURRENT_DATE, %s, %s)
                 """, (user_id, streak, total_points))
+                awards = PointsLedger.apply(cur, [(user_id, total_points, "每日签到")])
                 
                 conn.commit()
-                
-                # 增加用户积分
-                PointsService.add_points(user_id, total_points, "每日签到")
+                PointsLedger.publish(awards)
                 
                 message = f"签到成功！积分 +{total_points}"
                 if bonus > 0:
@@ -217,65 +160,21 @@ class PointsService:
     @staticmethod
     def get_leaderboard(type: str = "total", limit: int = 50) -> List[Dict[str, Any]]:
         """
-        获取排行榜
+        获取排行榜（内存有序榜单，见 LeaderboardService）
         
         Args:
             type: 类型 (total=总榜, weekly=周榜, monthly=月榜)
             limit: 数量限制
         """
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cur:
-                if type == "total":
-                    # 总积分榜
-                    cur.execute("""
-                        SELECT id, username, nickname, avatar_url, level, points
-                        FROM users
-                        WHERE points > 0
-                        ORDER BY points DESC, created_at ASC
-                        LIMIT %s
-                    """, (limit,))
-                    
-                elif type == "weekly":
-                    # 周贡献榜 (最近7天)
-                    cur.execute("""
-                        SELECT u.id, u.username, u.nickname, u.avatar_url, u.level, 
-                               SUM(p.points) as week_points
-                        FROM points_history p
-                        JOIN users u ON p.user_id = u.id
-                        WHERE p.created_at >= CURRENT_DATE - INTERVAL '7 days'
-                        GROUP BY u.id
-                        ORDER BY week_points DESC
-                        LIMIT %s
-                    """, (limit,))
-                    
-                elif type == "monthly":
-                    # 月贡献榜 (最近30天)
-                    cur.execute("""
-                        SELECT u.id, u.username, u.nickname, u.avatar_url, u.level, 
-                               SUM(p.points) as month_points
-                        FROM points_history p
-                        JOIN users u ON p.user_id = u.id
-                        WHERE p.created_at >= CURRENT_DATE - INTERVAL '30 days'
-                        GROUP BY u.id
-                        ORDER BY month_points DESC
-                        LIMIT %s
-                    """, (limit,))
-                else:
-                    return []
-                
-                result = []
-                for row in cur.fetchall():
-                    level = row[4] or 1
-                    result.append({
-                        "id": row[0],
-                        "username": row[1],
-                        "nickname": row[2],
-                        "avatar_url": row[3],
-                        "level": level,
-                        "level_name": get_level_name(level),
-                        "points": row[5]
-                    })
-                return result
-        finally:
-            conn.close()
+        return LeaderboardService.top(type, limit)
+
+    @staticmethod
+    def get_rank(user_id: int, type: str = "total") -> Dict[str, Any]:
+        """
+        获取用户在排行榜中的名次
+        
+        Args:
+            user_id: 用户ID
+            type: 类型 (total=总榜, weekly=周榜, monthly=月榜)
+        """
+        return LeaderboardService.rank(user_id, type)
@@ -2,10 +2,25 @@
 帖子服务模块
 处理帖子相关的业务逻辑
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 from ..database.connection import get_db_connection
-from ..models.user import get_level_name
+from ..models.rows import AuthorRow, PostRow, row_with
+from ..utils.response_cache import ResponseCache
+from ..utils.text_search import POST_VECTOR_SQL, to_document
+from .view_counter import ViewCounter
+from .audio_pipeline import AudioPipeline
+from .counter_service import CounterService
+from .dialect_stats_service import DialectStatsService
+from .outbox_service import OutboxService
+from .profile_cache import ProfileCache
+
+# 帖子列表 / 详情查询的列（与 PostRow 字段同名，另加作者ID）
+POST_COLUMNS = """
+    p.id, p.content, p.audio_url, p.dialect_tag,
+    p.likes_count, p.comments_count, p.views_count,
+    p.created_at, p.updated_at, p.audio_status, p.audio_playback_url, p.user_id
+"""
 
 
 class PostService:
@@ -29,24 +44,30 @@ class PostService:
         conn = get_db_connection()
         try:
             with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO posts (user_id, content, dialect_tag, audio_url)
-                    VALUES (%s, %s, %s, %s)
+                # 同时写入分词后的全文检索向量
+                # 带音频的帖子排队转码
+                cur.execute(f"""
+                    INSERT INTO posts (user_id, content, dialect_tag, audio_url, audio_status, search_vector)
+                    VALUES (%s, %s, %s, %s, %s, {POST_VECTOR_SQL})
                     RETURNING id, content, audio_url, dialect_tag, likes_count, 
-                              comments_count, views_count, created_at, updated_at
-                """, (user_id, content, dialect_tag, audio_url))
+                              comments_count, views_count, created_at, updated_at, audio_status
+                """, (user_id, content, dialect_tag, audio_url, "pending" if audio_url else "none",
+                      to_document(content), to_document(dialect_tag or "")))
                 
                 result = cur.fetchone()
-                conn.commit()
                 
                 if result:
+                    # 增加用户积分（发帖 +10 积分），与帖子同事务写入发件箱
+                    OutboxService.add_points(cur, user_id, 10, "发布帖子")
+                    DialectStatsService.adjust(cur, dialect_tag, 1)
+                    conn.commit()
+                    ResponseCache.invalidate("posts")
+                    if audio_url:
+                        AudioPipeline.submit(result[0])
+                    
                     # 获取作者信息
                     author = PostService._get_author_info(cur, user_id)
                     
-                    # 增加用户积分（发帖 +10 积分）
-                    PostService._add_user_points(cur, user_id, 10, "发布帖子")
-                    conn.commit()
-                    
                     return {
                         "id": result[0],
                         "content": result[1],
@@ -57,6 +78,7 @@ class PostService:
                         "views_count": result[6],
                         "created_at": result[7],
                         "updated_at": result[8],
+                        "audio_status": result[9],
                         "is_liked": False,
                         "author": author
                     }
@@ -69,7 +91,7 @@ class PostService:
             conn.close()
     
     @staticmethod
-    def get_post_by_id(post_id: int, viewer_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    def get_post_by_id(post_id: int, viewer_id: Optional[int] = None) -> Optional[PostRow]:
         """
         获取帖子详情
         
@@ -82,55 +104,49 @@ class PostService:
         """
         conn = get_db_connection()
         try:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT p.id, p.content, p.audio_url, p.dialect_tag, 
-                           p.likes_count, p.comments_count, p.views_count,
-                           p.user_id, p.created_at, p.updated_at, p.is_deleted
+            with conn.cursor(row_factory=row_with(PostRow, "user_id")) as cur:
+                cur.execute(f"""
+                    SELECT {POST_COLUMNS}
                     FROM posts p
                     WHERE p.id = %s AND p.is_deleted = FALSE
                 """, (post_id,))
-                
-                result = cur.fetchone()
-                if not result:
-                    return None
-                
-                # 增加浏览量
-                cur.execute("""
-                    UPDATE posts SET views_count = views_count + 1 WHERE id = %s
-                """, (post_id,))
-                conn.commit()
-                
-                # 获取作者信息
-                author = PostService._get_author_info(cur, result[7])
-                
-                # 检查是否点赞
-                is_liked = False
-                if viewer_id:
-                    cur.execute("""
-                        SELECT 1 FROM likes WHERE user_id = %s AND post_id = %s
-                    """, (viewer_id, post_id))
-                    is_liked = cur.fetchone() is not None
-                
-                return {
-                    "id": result[0],
-                    "content": result[1],
-                    "audio_url": result[2],
-                    "dialect_tag": result[3],
-                    "likes_count": result[4],
-                    "comments_count": result[5],
-                    "views_count": result[6] + 1,  # 返回更新后的浏览量
-                    "created_at": result[8],
-                    "updated_at": result[9],
-                    "is_liked": is_liked,
-                    "author": author
-                }
+                rows = cur.fetchall()
+            if not rows:
+                return None
+            
+            # 增加浏览量（进程内缓冲，定期批量写回）
+            ViewCounter.record(post_id)
+            
+            with conn.cursor() as cur:
+                return PostService._build_posts(cur, rows, viewer_id)[0]
         except Exception as e:
             print(f"获取帖子失败: {e}")
             return None
         finally:
             conn.close()
     
+    @staticmethod
+    def get_post_audio(post_id: int) -> Optional[Tuple[Optional[str], str]]:
+        """
+        获取帖子音频地址与转码状态（不计浏览量）
+
+        Args:
+            post_id: 帖子ID
+
+        Returns:
+            (audio_url, audio_status)，帖子不存在时返回 None
+        """
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT audio_url, audio_status FROM posts
+                    WHERE id = %s AND is_deleted = FALSE
+                """, (post_id,))
+                return cur.fetchone()
+        finally:
+            conn.close()
+    
     @staticmethod
     def get_posts(page: int = 1, page_size: int = 20, dialect_tag: Optional[str] = None,
                   user_id: Optional[int] = None, viewer_id: Optional[int] = None,
@@ -179,43 +195,17 @@ class PostService:
                 total = cur.fetchone()[0]
                 
                 # 获取帖子列表
-                cur.execute(f"""
-                    SELECT p.id, p.content, p.audio_url, p.dialect_tag,
-                           p.likes_count, p.comments_count, p.views_count,
-                           p.user_id, p.created_at, p.updated_at
-                    FROM posts p
-                    WHERE {where_clause}
-                    ORDER BY p.created_at DESC
-                    LIMIT %s OFFSET %s
-                """, params + [page_size, offset])
+                with conn.cursor(row_factory=row_with(PostRow, "user_id")) as rows_cur:
+                    rows_cur.execute(f"""
+                        SELECT {POST_COLUMNS}
+                        FROM posts p
+                        WHERE {where_clause}
+                        ORDER BY p.created_at DESC
+                        LIMIT %s OFFSET %s
+                    """, params + [page_size, offset])
+                    rows = rows_cur.fetchall()
                 
-                rows = cur.fetchall()
-                posts = []
-                
-                for row in rows:
-                    author = PostService._get_author_info(cur, row[7])
-                    
-                    # 检查是否点赞
-                    is_liked = False
-                    if viewer_id:
-                        cur.execute("""
-                            SELECT 1 FROM likes WHERE user_id = %s AND post_id = %s
-                        """, (viewer_id, row[0]))
-                        is_liked = cur.fetchone() is not None
-                    
-                    posts.append({
-                        "id": row[0],
-                        "content": row[1],
-                        "audio_url": row[2],
-                        "dialect_tag": row[3],
-                        "likes_count": row[4],
-                        "comments_count": row[5],
-                        "views_count": row[6],
-                        "created_at": row[8],
-                        "updated_at": row[9],
-                        "is_liked": is_liked,
-                        "author": author
-                    })
+                posts = PostService._build_posts(cur, rows, viewer_id)
                 
                 return {
                     "posts": posts,
@@ -260,12 +250,18 @@ class PostService:
                 if not result or result[0] != user_id:
                     return False
                 
-                # 软删除
+                # 软删除（并发删除时只有一次生效）
                 cur.execute("""
                     UPDATE posts SET is_deleted = TRUE, updated_at = NOW()
-                    WHERE id = %s
+                    WHERE id = %s AND is_deleted = FALSE
+                    RETURNING dialect_tag
                 """, (post_id,))
+                deleted = cur.fetchone()
+                if not deleted:
+                    return False
+                DialectStatsService.adjust(cur, deleted[0], -1)
                 conn.commit()
+                ResponseCache.invalidate("posts")
                 return True
         except Exception as e:
             conn.rollback()
@@ -282,174 +278,203 @@ class PostService:
         Returns:
             方言标签和对应帖子数量
         """
-        conn = get_db_connection()
         try:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT dialect_tag, COUNT(*) as count
-                    FROM posts
-                    WHERE is_deleted = FALSE AND dialect_tag IS NOT NULL
-                    GROUP BY dialect_tag
-                    ORDER BY count DESC
-                    LIMIT 20
-                """)
-                
-                return [{"tag": row[0], "count": row[1]} for row in cur.fetchall()]
+            return DialectStatsService.top(20)
         except Exception as e:
             print(f"获取方言统计失败: {e}")
             return []
-        finally:
-            conn.close()
     
     @staticmethod
-    def _get_author_info(cursor, user_id: int) -> Dict[str, Any]:
-        """获取作者信息"""
-        cursor.execute("""
-            SELECT id, username, nickname, avatar_url, level
-            FROM users WHERE id = %s
-        """, (user_id,))
-        user = cursor.fetchone()
+    def _build_posts(cursor, rows: List[Tuple[PostRow, int]], viewer_id: Optional[int] = None) -> List[PostRow]:
+        """
+        补全帖子行：作者信息、点赞状态（一次批量查询）、尚未写回的计数增量
         
-        if user:
-            return {
-                "id": user[0],
-                "username": user[1],
-                "nickname": user[2],
-                "avatar_url": user[3],
-                "level": user[4] or 1,
-                "level_name": get_level_name(user[4] or 1)
-            }
-        return {
-            "id": user_id,
-            "username": "未知用户",
-            "nickname": None,
-            "avatar_url": None,
-            "level": 1,
-            "level_name": "方言新手"
-        }
+        Args:
+            cursor: 数据库游标（默认元组行）
+            rows: 以 row_with(PostRow, "user_id") 查询 POST_COLUMNS 得到的 (帖子, 作者ID) 行
+            viewer_id: 查看者ID（用于判断是否点赞）
+        """
+        profiles = ProfileCache.get_many((user_id for _, user_id in rows), cursor)
+        authors = {user_id: ProfileCache.author(profile, user_id) for user_id, profile in profiles.items()}
+        liked = set()
+        if viewer_id and rows:
+            cursor.execute("""
+                SELECT post_id FROM likes WHERE user_id = %s AND post_id = ANY(%s)
+            """, (viewer_id, [post.id for post, _ in rows]))
+            liked = {row[0] for row in cursor.fetchall()}
+        
+        posts = []
+        for post, user_id in rows:
+            post.likes_count = CounterService.current("posts", "likes_count", post.id, post.likes_count)
+            post.comments_count = CounterService.current("posts", "comments_count", post.id, post.comments_count)
+            post.views_count += ViewCounter.pending(post.id)  # 数据库值 + 未写回的浏览量
+            post.is_liked = post.id in liked
+            post.author = authors.get(user_id) or ProfileCache.author(None, user_id)
+            posts.append(post)
+        return posts
     
     @staticmethod
-    def _add_user_points(cursor, user_id: int, points: int, reason: str):
-        """增加用户积分"""
-        try:
-            cursor.execute("""
-                UPDATE users SET points = COALESCE(points, 0) + %s
-                WHERE id = %s
-            """, (points, user_id))
-            
-            # 更新用户等级
-            cursor.execute("""
-                UPDATE users SET level = 
-                    CASE 
-                        WHEN points >= 10000 THEN 6
-                        WHEN points >= 5000 THEN 5
-                        WHEN points >= 2000 THEN 4
-                        WHEN points >= 500 THEN 3
-                        WHEN points >= 100 THEN 2
-                        ELSE 1
-                    END
-                WHERE id = %s
-            """, (user_id,))
-        except Exception as e:
-            print(f"增加积分失败: {e}")
+    def _get_author_info(cursor, user_id: int) -> AuthorRow:
+        """获取作者信息（经由用户资料缓存）"""
+        return ProfileCache.author(ProfileCache.get(user_id, cursor), user_id)
     
+    # 新增点赞时同语句写入发件箱：作者积分 +2 与点赞通知（按帖子+点赞者去重，反复点赞不重复发放）
+    _LIKE_OUTBOX_CTE = """
+            ob AS (
+                INSERT INTO outbox_events (event_type, payload, dedup_key)
+                SELECT e.event_type, e.payload, e.dedup_key
+                FROM p
+                CROSS JOIN ins
+                CROSS JOIN LATERAL (VALUES
+                    ('points',
+                     jsonb_build_object('user_id', p.user_id, 'points', 2, 'reason', '获得点赞'),
+                     'points:like_post:' || p.id || ':' || %(user_id)s::int),
+                    ('notification',
+                     jsonb_build_object('user_id', p.user_id, 'type', 'like',
+                                        'actor_id', %(user_id)s::int, 'post_id', p.id,
+                                        'content', '点赞了你的帖子'),
+                     'notification:like_post:' || p.id || ':' || %(user_id)s::int)
+                ) AS e(event_type, payload, dedup_key)
+                WHERE p.user_id <> %(user_id)s::int
+                ON CONFLICT (dedup_key) WHERE dedup_key IS NOT NULL DO NOTHING
+            )
+    """
+
+    # 点赞写入语句：一条带数据修改 CTE 的语句完成校验帖子、写入/删除点赞、写入发件箱并返回结果
+    # 结果列: 帖子作者ID, 数据库中的点赞数, 本次是否新增点赞, 本次是否取消点赞
+    _LIKE_SQL = {
+        "like": """
+            WITH p AS (
+                SELECT id, user_id, likes_count FROM posts
+                WHERE id = %(post_id)s AND is_deleted = FALSE
+            ),
+            ins AS (
+                INSERT INTO likes (user_id, post_id)
+                SELECT %(user_id)s, id FROM p
+                ON CONFLICT (user_id, post_id) WHERE post_id IS NOT NULL DO NOTHING
+                RETURNING id
+            ),
+        """ + _LIKE_OUTBOX_CTE + """
+            SELECT p.user_id, p.likes_count, EXISTS (SELECT 1 FROM ins), FALSE
+            FROM p
+        """,
+        "unlike": """
+            WITH p AS (
+                SELECT id, user_id, likes_count FROM posts
+                WHERE id = %(post_id)s AND is_deleted = FALSE
+            ),
+            del AS (
+                DELETE FROM likes
+                WHERE user_id = %(user_id)s AND post_id IN (SELECT id FROM p)
+                RETURNING id
+            )
+            SELECT p.user_id, p.likes_count, FALSE, EXISTS (SELECT 1 FROM del)
+            FROM p
+        """,
+        "toggle": """
+            WITH p AS (
+                SELECT id, user_id, likes_count FROM posts
+                WHERE id = %(post_id)s AND is_deleted = FALSE
+            ),
+            del AS (
+                DELETE FROM likes
+                WHERE user_id = %(user_id)s AND post_id IN (SELECT id FROM p)
+                RETURNING id
+            ),
+            ins AS (
+                INSERT INTO likes (user_id, post_id)
+                SELECT %(user_id)s, id FROM p
+                WHERE NOT EXISTS (SELECT 1 FROM del)
+                ON CONFLICT (user_id, post_id) WHERE post_id IS NOT NULL DO NOTHING
+                RETURNING id
+            ),
+        """ + _LIKE_OUTBOX_CTE + """
+            SELECT p.user_id, p.likes_count, EXISTS (SELECT 1 FROM ins), EXISTS (SELECT 1 FROM del)
+            FROM p
+        """
+    }
+
     @staticmethod
-    def toggle_like(post_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+    def _apply_like(post_id: int, user_id: int, mode: str) -> Optional[Dict[str, Any]]:
         """
-        切换帖子点赞状态
+        执行点赞写入（单条语句、自动提交，一次往返）
+        
+        作者积分与点赞通知在同一语句中写入发件箱，由后台线程处理
         
         Args:
             post_id: 帖子ID
             user_id: 用户ID
+            mode: like / unlike / toggle
             
         Returns:
             点赞状态和点赞数，如果帖子不存在返回 None
         """
         conn = get_db_connection()
+        conn.autocommit = True
         try:
             with conn.cursor() as cur:
-                # 检查帖子是否存在
-                cur.execute("""
-                    SELECT id, user_id, likes_count FROM posts 
-                    WHERE id = %s AND is_deleted = FALSE
-                """, (post_id,))
-                post = cur.fetchone()
-                
-                if not post:
-                    return None
-                
-                post_author_id = post[1]
-                current_likes = post[2]
-                
-                # 检查是否已点赞
-                cur.execute("""
-                    SELECT id FROM likes 
-                    WHERE user_id = %s AND post_id = %s
-                """, (user_id, post_id))
-                existing_like = cur.fetchone()
-                
-                if existing_like:
-                    # 已点赞，取消点赞
-                    cur.execute("""
-                        DELETE FROM likes WHERE user_id = %s AND post_id = %s
-                    """, (user_id, post_id))
-                    
-                    # 减少帖子点赞数
-                    cur.execute("""
-                        UPDATE posts SET likes_count = GREATEST(likes_count - 1, 0)
-                        WHERE id = %s
-                        RETURNING likes_count
-                    """, (post_id,))
-                    new_likes = cur.fetchone()[0]
-                    
-                    conn.commit()
-                    return {
-                        "is_liked": False,
-                        "likes_count": new_likes
-                    }
-                else:
-                    # 未点赞，添加点赞
-                    cur.execute("""
-                        INSERT INTO likes (user_id, post_id)
-                        VALUES (%s, %s)
-                    """, (user_id, post_id))
-                    
-                    # 增加帖子点赞数
-                    cur.execute("""
-                        UPDATE posts SET likes_count = likes_count + 1
-                        WHERE id = %s
-                        RETURNING likes_count
-                    """, (post_id,))
-                    new_likes = cur.fetchone()[0]
-                    
-                    # 给帖子作者增加积分（获得点赞 +2 积分）
-                    if post_author_id != user_id:
-                        PostService._add_user_points(cur, post_author_id, 2, "获得点赞")
-                    
-                    conn.commit()
-
-                    # 发送通知
-                    if post_author_id != user_id:
-                        try:
-                            from .notification_service import NotificationService
-                            NotificationService.create_notification(
-                                user_id=post_author_id,
-                                type="like",
-                                actor_id=user_id,
-                                post_id=post_id,
-                                content="点赞了你的帖子"
-                            )
-                        except Exception as e:
-                            print(f"Notification error: {e}")
-
-                    return {
-                        "is_liked": True,
-                        "likes_count": new_likes
-                    }
+                cur.execute(PostService._LIKE_SQL[mode], {"post_id": post_id, "user_id": user_id})
+                row = cur.fetchone()
         except Exception as e:
-            conn.rollback()
-            print(f"切换点赞状态失败: {e}")
+            print(f"点赞操作失败: {e}")
             return None
         finally:
             conn.close()
+        
+        if not row:
+            return None
+        
+        post_author_id, stored_likes, inserted, deleted = row
+        
+        if inserted:
+            is_liked = True
+        elif deleted:
+            is_liked = False
+        else:
+            # 幂等请求（或并发的同一操作已先完成）：状态本就如此
+            is_liked = mode != "unlike"
+        
+        # 点赞数异步合并写回，不在请求内锁帖子行
+        if inserted or deleted:
+            CounterService.incr("posts", "likes_count", post_id, 1 if inserted else -1)
+        likes_count = CounterService.current("posts", "likes_count", post_id, stored_likes)
+        
+        return {
+            "is_liked": is_liked,
+            "likes_count": likes_count
+        }
+
+    @staticmethod
+    def like_post(post_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        点赞帖子（幂等，重复点赞不报错）
+        
+        Returns:
+            点赞状态和点赞数，如果帖子不存在返回 None
+        """
+        return PostService._apply_like(post_id, user_id, "like")
+
+    @staticmethod
+    def unlike_post(post_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        取消点赞帖子（幂等，未点赞时不报错）
+        
+        Returns:
+            点赞状态和点赞数，如果帖子不存在返回 None
+        """
+        return PostService._apply_like(post_id, user_id, "unlike")
+
+    @staticmethod
+    def toggle_like(post_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        切换帖子点赞状态
+        
+        Args:
+            post_id: 帖子ID
+            user_id: 用户ID
+            
+        Returns:
+            点赞状态和点赞数，如果帖子不存在返回 None
+        """
+        return PostService._apply_like(post_id, user_id, "toggle")
 
@@ -0,0 +1,146 @@
+"""
+用户资料缓存模块
+帖子作者、评论作者、关注列表、通知触发者、排行榜等处共用的用户资料
+进程内 LRU + TTL 缓存；批量读取时未命中的用户一次 = ANY 查询补齐。
+资料、头像、积分等级、冗余计数在本进程变更时主动失效，其他进程的变更最多 TTL 秒后可见
+"""
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+from ..config import Config
+from ..database.connection import get_db_connection
+from ..models.rows import AuthorRow
+from ..models.user import UserPublicProfile, get_level_name
+from ..utils.ttl_cache import TTLCache
+
+
+class Profile(NamedTuple):
+    """缓存的用户资料（users 表的公开列）"""
+    id: int
+    username: str
+    nickname: Optional[str]
+    avatar_url: Optional[str]
+    bio: Optional[str]
+    hometown: Optional[str]
+    dialect: Optional[str]
+    points: int
+    level: int
+    followers_count: int
+    following_count: int
+    created_at: Any
+    avatar_variants: Optional[Dict[str, str]]
+
+
+class ProfileCache:
+    """用户资料读穿缓存"""
+
+    _cache = TTLCache(maxsize=Config.PROFILE_CACHE_SIZE, ttl=Config.PROFILE_CACHE_TTL)
+
+    @classmethod
+    def get_many(cls, user_ids: Iterable[int], cursor=None) -> Dict[int, Profile]:
+        """
+        批量获取用户资料
+
+        Args:
+            user_ids: 用户ID列表（可重复）
+            cursor: 可选，复用调用方的游标查询未命中的用户
+
+        Returns:
+            {用户ID: Profile}，不存在的用户不在结果中
+        """
+        result: Dict[int, Profile] = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            if user_id is None:
+                continue
+            profile = cls._cache.get(user_id)
+            if profile is None:
+                missing.append(user_id)
+            else:
+                result[user_id] = profile
+        if not missing:
+            return result
+
+        sql = """
+            SELECT id, username, nickname, avatar_url, bio,
+                   hometown, dialect, points, level,
+                   followers_count, following_count, created_at, avatar_variants
+            FROM users
+            WHERE id = ANY(%s)
+        """
+        if cursor is not None:
+            cursor.execute(sql, (missing,))
+            rows = cursor.fetchall()
+        else:
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(sql, (missing,))
+                    rows = cur.fetchall()
+            finally:
+                conn.close()
+
+        for row in rows:
+            profile = Profile(
+                row[0], row[1], row[2], row[3], row[4], row[5], row[6],
+                row[7] or 0, row[8] or 1, row[9] or 0, row[10] or 0, row[11], row[12] or None
+            )
+            cls._cache.set(profile.id, profile)
+            result[profile.id] = profile
+        return result
+
+    @classmethod
+    def get(cls, user_id: int, cursor=None) -> Optional[Profile]:
+        """获取单个用户资料"""
+        return cls.get_many([user_id], cursor).get(user_id)
+
+    @classmethod
+    def invalidate(cls, user_id: int):
+        """使某个用户的资料失效"""
+        cls._cache.pop(user_id)
+
+    @classmethod
+    def invalidate_many(cls, user_ids: Iterable[int]):
+        """批量失效"""
+        for user_id in user_ids:
+            cls._cache.pop(user_id)
+
+    @classmethod
+    def clear(cls):
+        """清空缓存"""
+        cls._cache.clear()
+
+    @staticmethod
+    def author(profile: Optional[Profile], user_id: int) -> AuthorRow:
+        """帖子 / 评论中的作者信息（用户不存在时返回占位）"""
+        if profile is None:
+            return AuthorRow(id=user_id, username="未知用户")
+        return AuthorRow(
+            id=profile.id,
+            username=profile.username,
+            nickname=profile.nickname,
+            avatar_url=profile.avatar_url,
+            avatar_variants=profile.avatar_variants,
+            level=profile.level,
+            level_name=get_level_name(profile.level)
+        )
+
+    @staticmethod
+    def public_profile(profile: Profile, is_following: bool = False) -> UserPublicProfile:
+        """转换为公开资料模型（计数叠加尚未写回的增量）"""
+        from .counter_service import CounterService
+        return UserPublicProfile(
+            id=profile.id,
+            username=profile.username,
+            nickname=profile.nickname,
+            avatar_url=profile.avatar_url,
+            avatar_variants=profile.avatar_variants,
+            bio=profile.bio,
+            hometown=profile.hometown,
+            dialect=profile.dialect,
+            points=profile.points,
+            level=profile.level,
+            level_name=get_level_name(profile.level),
+            followers_count=CounterService.current("users", "followers_count", profile.id, profile.followers_count),
+            following_count=CounterService.current("users", "following_count", profile.id, profile.following_count),
+            is_following=is_following,
+            created_at=profile.created_at
+        )
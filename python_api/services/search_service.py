@@ -0,0 +1,183 @@
+"""
+搜索服务模块
+帖子：分词 tsvector + GIN 索引全文检索，按 ts_rank 排序；
+用户：用户名 / 昵称子串匹配走 pg_trgm GIN 索引，按三元组相似度排序；
+两者均为 (得分, id) 游标分页
+"""
+import base64
+import json
+from typing import Any, Dict, Optional, Tuple
+from ..database.connection import get_db_connection
+from ..models.rows import PostRow, row_with
+from ..models.user import UserPublicProfile, get_level_name
+from ..utils.text_search import to_query
+from .counter_service import CounterService
+from .post_service import POST_COLUMNS, PostService
+
+
+class InvalidCursorError(ValueError):
+    """分页游标无法解析"""
+
+
+def _encode_cursor(score: float, row_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([score, row_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    if not cursor:
+        return None
+    try:
+        score, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidCursorError("无效的游标")
+
+
+def _like_pattern(query: str) -> str:
+    """转义 LIKE 通配符后包成子串匹配"""
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SearchService:
+    """搜索服务类"""
+
+    # 数据库是否安装了 pg_trgm（首次搜索用户时检测）
+    _has_trgm: Optional[bool] = None
+
+    @staticmethod
+    def search_posts(query: str, limit: int = 20, cursor: Optional[str] = None,
+                     viewer_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        全文搜索帖子
+
+        Args:
+            query: 搜索关键词
+            limit: 每页数量
+            cursor: 上一页返回的 next_cursor
+            viewer_id: 查看者ID（用于判断是否点赞）
+
+        Returns:
+            {items, next_cursor}
+
+        Raises:
+            InvalidCursorError: 游标无法解析时
+        """
+        after = _decode_cursor(cursor)
+        terms = to_query(query)
+        if not terms:
+            return {"items": [], "next_cursor": None}
+
+        params: Dict[str, Any] = {"terms": terms, "limit": limit + 1}
+        cursor_clause = ""
+        if after:
+            cursor_clause = "AND (ts_rank(p.search_vector, q.query), p.id) < (%(score)s::real, %(after_id)s)"
+            params.update(score=after[0], after_id=after[1])
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor(row_factory=row_with(PostRow, "user_id", "score")) as cur:
+                cur.execute(f"""
+                    WITH q AS (SELECT plainto_tsquery('simple', %(terms)s) AS query)
+                    SELECT {POST_COLUMNS},
+                           ts_rank(p.search_vector, q.query) AS score
+                    FROM posts p, q
+                    WHERE p.search_vector @@ q.query
+                      AND p.is_deleted = FALSE
+                      {cursor_clause}
+                    ORDER BY score DESC, p.id DESC
+                    LIMIT %(limit)s
+                """, params)
+                rows = cur.fetchall()
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                post, _, score = rows[-1]
+                next_cursor = _encode_cursor(score, post.id)
+
+            with conn.cursor() as cur:
+                items = PostService._build_posts(cur, [(post, user_id) for post, user_id, _ in rows], viewer_id)
+            return {"items": items, "next_cursor": next_cursor}
+        finally:
+            conn.close()
+
+    @classmethod
+    def _score_sql(cls, cur) -> str:
+        """用户搜索的相关度表达式（无 pg_trgm 时只区分是否完全匹配）"""
+        if cls._has_trgm is None:
+            cur.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            cls._has_trgm = cur.fetchone()[0]
+        if cls._has_trgm:
+            return "GREATEST(similarity(username, %(query)s), similarity(COALESCE(nickname, ''), %(query)s))"
+        return ("(CASE WHEN lower(username) = lower(%(query)s) "
+                "OR lower(COALESCE(nickname, '')) = lower(%(query)s) THEN 1 ELSE 0 END)::real")
+
+    @classmethod
+    def search_users(cls, query: str, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        搜索用户（用户名或昵称包含关键词，按相似度排序）
+
+        Args:
+            query: 搜索关键词
+            limit: 每页数量
+            cursor: 上一页返回的 next_cursor
+
+        Returns:
+            {items, next_cursor}
+
+        Raises:
+            InvalidCursorError: 游标无法解析时
+        """
+        after = _decode_cursor(cursor)
+        params: Dict[str, Any] = {"query": query, "pattern": _like_pattern(query), "limit": limit + 1}
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                score = cls._score_sql(cur)
+                cursor_clause = ""
+                if after:
+                    cursor_clause = f"AND ({score}, id) < (%(score)s::real, %(after_id)s)"
+                    params.update(score=after[0], after_id=after[1])
+
+                cur.execute(f"""
+                    SELECT id, username, nickname, avatar_url, bio,
+                           hometown, dialect, points, level,
+                           followers_count, following_count, created_at, avatar_variants,
+                           {score} AS score
+                    FROM users
+                    WHERE (username ILIKE %(pattern)s OR nickname ILIKE %(pattern)s)
+                      {cursor_clause}
+                    ORDER BY score DESC, id DESC
+                    LIMIT %(limit)s
+                """, params)
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1][13], rows[-1][0])
+
+        items = []
+        for row in rows:
+            level = row[8] or 1
+            items.append(UserPublicProfile(
+                id=row[0],
+                username=row[1],
+                nickname=row[2],
+                avatar_url=row[3],
+                avatar_variants=row[12] or None,
+                bio=row[4],
+                hometown=row[5],
+                dialect=row[6],
+                points=row[7] or 0,
+                level=level,
+                level_name=get_level_name(level),
+                followers_count=CounterService.current("users", "followers_count", row[0], row[9] or 0),
+                following_count=CounterService.current("users", "following_count", row[0], row[10] or 0),
+                created_at=row[11]
+            ))
+        return {"items": items, "next_cursor": next_cursor}
@@ -8,9 +8,12 @@ from ..models.user import (
     UserProfile, 
     UserProfileUpdate, 
     UserPublicProfile,
-    get_level_name,
-    calculate_level
+    get_level_name
 )
+from .counter_service import CounterService
+from .points_ledger import PointsLedger
+from .avatar_variants import AvatarVariants
+from .profile_cache import ProfileCache
 
 
 class UserService:
@@ -53,8 +56,8 @@ class UserService:
                     dialect=row[7],
                     points=row[8] or 0,
                     level=row[9] or 1,
-                    followers_count=row[10] or 0,
-                    following_count=row[11] or 0,
+                    followers_count=CounterService.current("users", "followers_count", row[0], row[10]),
+                    following_count=CounterService.current("users", "following_count", row[0], row[11]),
                     created_at=row[12]
                 )
         finally:
@@ -72,50 +75,25 @@ class UserService:
         Returns:
             UserPublicProfile 或 None
         """
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT id, username, nickname, avatar_url, bio,
-                           hometown, dialect, points, level,
-                           followers_count, following_count, created_at
-                    FROM users
-                    WHERE id = %s
-                """, (user_id,))
-                
-                row = cur.fetchone()
-                if not row:
-                    return None
-                
-                # 检查是否关注
-                is_following = False
-                if viewer_id and viewer_id != user_id:
+        profile = ProfileCache.get(user_id)
+        if profile is None:
+            return None
+        
+        # 检查是否关注
+        is_following = False
+        if viewer_id and viewer_id != user_id:
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as cur:
                     cur.execute("""
                         SELECT 1 FROM follows 
                         WHERE follower_id = %s AND following_id = %s
                     """, (viewer_id, user_id))
                     is_following = cur.fetchone() is not None
-                
-                level = row[8] or 1
-                
-                return UserPublicProfile(
-                    id=row[0],
-                    username=row[1],
-                    nickname=row[2],
-                    avatar_url=row[3],
-                    bio=row[4],
-                    hometown=row[5],
-                    dialect=row[6],
-                    points=row[7] or 0,
-                    level=level,
-                    level_name=get_level_name(level),
-                    followers_count=row[9] or 0,
-                    following_count=row[10] or 0,
-                    is_following=is_following,
-                    created_at=row[11]
-                )
-        finally:
-            conn.close()
+            finally:
+                conn.close()
+        
+        return ProfileCache.public_profile(profile, is_following=is_following)
     
     @staticmethod
     def update_profile(user_id: int, update_data: UserProfileUpdate) -> Optional[UserProfile]:
@@ -155,6 +133,8 @@ class UserService:
                 if update_data.avatar_url is not None:
                     update_fields.append("avatar_url = %s")
                     values.append(update_data.avatar_url)
+                    # 头像变更后重新生成缩略图
+                    update_fields.append("avatar_variants = NULL")
                 
                 if not update_fields:
                     # 没有需要更新的字段
@@ -179,6 +159,9 @@ class UserService:
                     return None
                 
                 conn.commit()
+                ProfileCache.invalidate(user_id)
+                if update_data.avatar_url is not None:
+                    AvatarVariants.submit(user_id)
                 
                 return UserService.get_user_by_id(user_id)
         finally:
@@ -201,58 +184,36 @@ class UserService:
             with conn.cursor() as cur:
                 cur.execute("""
                     UPDATE users 
-                    SET avatar_url = %s, updated_at = NOW()
+                    SET avatar_url = %s, avatar_variants = NULL, updated_at = NOW()
                     WHERE id = %s
                 """, (avatar_url, user_id))
                 
                 conn.commit()
+                ProfileCache.invalidate(user_id)
+                # 后台生成缩略图，完成前客户端使用原图
+                AvatarVariants.submit(user_id)
                 return cur.rowcount > 0
         finally:
             conn.close()
     
     @staticmethod
-    def add_points(user_id: int, points: int) -> Optional[UserProfile]:
+    def add_points(user_id: int, points: int, reason: str = "系统奖励") -> Optional[UserProfile]:
         """
-        给用户增加积分（并自动更新等级）
+        给用户增加积分（经由积分账本入账，并自动更新等级）
         
         Args:
             user_id: 用户ID
             points: 要增加的积分数
+            reason: 原因
             
         Returns:
             更新后的 UserProfile
         """
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cur:
-                # 增加积分
-                cur.execute("""
-                    UPDATE users 
-                    SET points = COALESCE(points, 0) + %s,
-                        updated_at = NOW()
-                    WHERE id = %s
-                    RETURNING points
-                """, (points, user_id))
-                
-                result = cur.fetchone()
-                if not result:
-                    return None
-                
-                new_points = result[0]
-                new_level = calculate_level(new_points)
-                
-                # 更新等级
-                cur.execute("""
-                    UPDATE users 
-                    SET level = %s
-                    WHERE id = %s AND (level IS NULL OR level < %s)
-                """, (new_level, user_id, new_level))
-                
-                conn.commit()
-                
-                return UserService.get_user_by_id(user_id)
-        finally:
-            conn.close()
+        if UserService.get_user_by_id(user_id) is None:
+            return None
+        
+        PointsLedger.award([(user_id, points, reason)])
+        return UserService.get_user_by_id(user_id)
     
     @staticmethod
     def search_users(query: str, limit: int = 20, offset: int = 0) -> list[UserPublicProfile]:
@@ -274,7 +235,7 @@ class UserService:
                 cur.execute("""
                     SELECT id, username, nickname, avatar_url, bio,
                            hometown, dialect, points, level,
-                           followers_count, following_count, created_at
+                           followers_count, following_count, created_at, avatar_variants
                     FROM users
                     WHERE username ILIKE %s OR nickname ILIKE %s
                     ORDER BY followers_count DESC, created_at DESC
@@ -289,6 +250,7 @@ class UserService:
                         username=row[1],
                         nickname=row[2],
                         avatar_url=row[3],
+                        avatar_variants=row[12] or None,
                         bio=row[4],
                         hometown=row[5],
                         dialect=row[6],
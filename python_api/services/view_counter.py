@@ -0,0 +1,81 @@
+"""
+浏览量缓冲模块
+在进程内合并帖子浏览量增量，定期批量写回 posts.views_count
+"""
+from ..config import Config
+from ..database.connection import get_db_connection
+from ..utils.periodic import PeriodicTask
+from ..utils.sharded_counter import ShardedCounter
+
+
+class ViewCounter:
+    """帖子浏览量缓冲"""
+
+    _counter = ShardedCounter()
+    _task = None
+
+    @classmethod
+    def record(cls, post_id: int) -> int:
+        """
+        记录一次浏览
+
+        Returns:
+            该帖子尚未写回数据库的浏览量
+        """
+        return cls._counter.add(post_id, 1)
+
+    @classmethod
+    def pending(cls, post_id: int) -> int:
+        """获取该帖子尚未写回数据库的浏览量"""
+        return cls._counter.get(post_id)
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        将缓冲的浏览量一次性写回数据库
+
+        Returns:
+            本次写回的帖子数
+        """
+        if not len(cls._counter):
+            return 0
+
+        # 先取得连接再取出增量：连接失败时增量仍留在缓冲中
+        conn = get_db_connection()
+        items = list(cls._counter.drain().items())
+        try:
+            if not items:
+                return 0
+            placeholders = ", ".join(["(%s::int, %s::int)"] * len(items))
+            params = [value for item in items for value in item]
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    UPDATE posts p
+                    SET views_count = p.views_count + v.delta
+                    FROM (VALUES {placeholders}) AS v(id, delta)
+                    WHERE p.id = v.id
+                """, params)
+            conn.commit()
+            return len(items)
+        except Exception:
+            conn.rollback()
+            # 写回失败，放回缓冲等待下一次刷新
+            cls._counter.restore(items)
+            raise
+        finally:
+            conn.close()
+
+    @classmethod
+    def start(cls):
+        """启动后台定时刷新"""
+        if cls._task is None:
+            cls._task = PeriodicTask("view-counter", Config.VIEW_FLUSH_INTERVAL, cls.flush)
+        cls._task.start()
+
+    @classmethod
+    def stop(cls):
+        """停止后台刷新，并把剩余浏览量写回数据库"""
+        if cls._task is not None:
+            cls._task.stop(run_final=True)
+        else:
+            cls.flush()
@@ -0,0 +1,128 @@
+"""
+测试公共夹具
+在仓库根目录运行：python -m pytest python_api/tests
+需要数据库的用例使用独立的测试库（TEST_DB_NAME，默认 <DB_NAME>_test，每次会话重建），
+数据库不可用时自动跳过；其余用例不依赖数据库
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import psycopg  # noqa: E402
+from python_api.config import Config  # noqa: E402
+
+
+def _admin_conninfo() -> dict:
+    return dict(host=Config.DB_HOST, port=Config.DB_PORT, user=Config.DB_USER,
+                password=Config.DB_PASSWORD, dbname="postgres")
+
+
+@pytest.fixture(scope="session")
+def database():
+    """创建测试库并执行全部迁移"""
+    if not Config.DB_USER:
+        pytest.skip("未配置数据库（DB_USER）")
+    name = os.getenv("TEST_DB_NAME") or f"{Config.DB_NAME or 'dialect_master'}_test"
+    try:
+        with psycopg.connect(**_admin_conninfo(), autocommit=True, connect_timeout=3) as conn:
+            conn.execute(f'DROP DATABASE IF EXISTS "{name}"')
+            conn.execute(f'CREATE DATABASE "{name}"')
+    except psycopg.Error as e:
+        pytest.skip(f"数据库不可用: {e}")
+
+    Config.DB_NAME = name
+    from python_api.database.connection import get_db_connection, ensure_users_table, ensure_verification_codes_table
+    from python_api.database.migrations import run_migrations
+    conn = get_db_connection()
+    try:
+        ensure_users_table(conn)
+        ensure_verification_codes_table(conn)
+    finally:
+        conn.close()
+    run_migrations()
+    return name
+
+
+def _reset_process_state():
+    """清空进程内的缓冲与缓存，避免用例之间互相影响"""
+    from python_api.services.view_counter import ViewCounter
+    from python_api.services.counter_service import CounterService
+    from python_api.services.profile_cache import ProfileCache
+    from python_api.services.notification_bus import NotificationBus
+    from python_api.services.leaderboard_service import LeaderboardService
+    from python_api.utils.response_cache import ResponseCache
+    from python_api.utils import jwt_auth
+    ViewCounter._counter.drain()
+    CounterService._counter.drain()
+    ProfileCache.clear()
+    NotificationBus._unread.clear()
+    LeaderboardService._built = False
+    ResponseCache._cache.clear()
+    jwt_auth._user_state_cache.clear()
+    jwt_auth._token_cache.clear()
+
+
+@pytest.fixture
+def db(database):
+    """每个用例前清空所有表"""
+    from python_api.database.connection import get_db_connection
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public'")
+            tables = ", ".join(f'"{row[0]}"' for row in cur.fetchall())
+            cur.execute(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+        conn.commit()
+    finally:
+        conn.close()
+    _reset_process_state()
+    yield
+    _reset_process_state()
+
+
+@pytest.fixture
+def make_user(db):
+    """创建用户，返回用户ID"""
+    from python_api.database.connection import get_db_connection
+
+    def make(username: str, **columns) -> int:
+        names = ["username", "password_hash"] + list(columns)
+        values = [username, "x"] + list(columns.values())
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"INSERT INTO users ({', '.join(names)}) VALUES ({', '.join(['%s'] * len(names))}) RETURNING id",
+                    values,
+                )
+                user_id = cur.fetchone()[0]
+            conn.commit()
+            return user_id
+        finally:
+            conn.close()
+
+    return make
+
+
+@pytest.fixture
+def query(db):
+    """执行一条 SQL 并返回全部行"""
+    from python_api.database.connection import get_db_connection
+
+    def run(sql: str, params=None):
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall() if cur.description else None
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+    return run
@@ -0,0 +1,114 @@
+"""音频转码：媒体ID 解析、同一媒体并发转码、任务领取、缺少 ffmpeg 时的降级"""
+import os
+import stat
+import sys
+import threading
+
+import pytest
+
+from python_api.config import Config
+from python_api.services import audio_pipeline
+from python_api.services.audio_pipeline import AudioPipeline, media_id_from_url, pcm_path
+from python_api.services.post_service import PostService
+
+MEDIA_ID = "0123456789abcdef0123456789abcdef"
+OUTPUT_SIZE = 64 * 1024
+
+# 按 "-f <格式> <输出路径>" 找到两路输出，缓慢分块写入，放大并发写同一临时文件的窗口
+FAKE_FFMPEG = f"""#!{sys.executable}
+import sys, time
+args = sys.argv[1:]
+outputs = [args[i + 2] for i, arg in enumerate(args) if arg == "-f"]
+files = [open(path, "wb") for path in outputs]
+for _ in range(16):
+    for f in files:
+        f.write(b"x" * {OUTPUT_SIZE // 16})
+        f.flush()
+    time.sleep(0.01)
+for f in files:
+    f.close()
+"""
+
+
+@pytest.fixture
+def media_dirs(tmp_path, monkeypatch):
+    audio_dir = tmp_path / "audio"
+    audio_dir.mkdir()
+    (audio_dir / f"{MEDIA_ID}.mp3").write_bytes(b"source")
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text(FAKE_FFMPEG)
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(audio_pipeline, "UPLOAD_ROOT", str(tmp_path))
+    monkeypatch.setattr(audio_pipeline, "AUDIO_DIR", str(audio_dir))
+    monkeypatch.setattr(Config, "AUDIO_PCM_DIR", str(tmp_path / "pcm"))
+    monkeypatch.setattr(Config, "FFMPEG_PATH", str(ffmpeg))
+    return tmp_path
+
+
+def test_media_id_from_url():
+    assert media_id_from_url(f"/uploads/audio/{MEDIA_ID}.webm") == MEDIA_ID
+    assert media_id_from_url("https://example.com/uploads/audio/a.mp3") is None
+    assert media_id_from_url("/uploads/audio/../x.mp3") is None
+    assert media_id_from_url(None) is None
+    assert pcm_path("../etc") is None
+
+
+def test_concurrent_transcode_of_same_media(media_dirs):
+    results, errors = [], []
+    barrier = threading.Barrier(4)
+
+    def run():
+        barrier.wait()
+        try:
+            results.append(AudioPipeline.transcode(f"/uploads/audio/{MEDIA_ID}.mp3"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert results == [f"/uploads/audio/{MEDIA_ID}.opus"] * 4
+    opus = media_dirs / "audio" / f"{MEDIA_ID}.opus"
+    assert opus.stat().st_size == OUTPUT_SIZE
+    assert os.path.getsize(pcm_path(MEDIA_ID)) == OUTPUT_SIZE
+    assert stat.S_IMODE(opus.stat().st_mode) == 0o644
+    leftovers = [p.name for d in ("audio", "pcm") for p in (media_dirs / d).iterdir() if p.name.startswith(".")]
+    assert leftovers == []
+
+
+def test_transcode_rejects_external_url(media_dirs):
+    with pytest.raises(ValueError):
+        AudioPipeline.transcode("https://example.com/a.mp3")
+
+
+def test_claim_skips_other_posts_and_reclaims_stale(db, make_user, query):
+    user = make_user("u1")
+    ids = [PostService.create_post(user, f"p{i}", None, f"/uploads/audio/{MEDIA_ID}.mp3")["id"] for i in range(3)]
+    assert [post_id for post_id, _ in AudioPipeline._claim([ids[0]], 10)] == [ids[0]]
+    assert [post_id for post_id, _ in AudioPipeline._claim(None, 10)] == ids[1:]
+    assert AudioPipeline._claim(None, 10) == []
+
+    # 进程崩溃遗留的 processing 超时后重新领取
+    query("UPDATE posts SET audio_claimed_at = NOW() - INTERVAL '1 day' WHERE id = %s", (ids[0],))
+    assert [post_id for post_id, _ in AudioPipeline._claim(None, 10)] == [ids[0]]
+
+
+def test_missing_ffmpeg_fails_only_new_posts(db, make_user, query, monkeypatch):
+    monkeypatch.setattr(Config, "FFMPEG_PATH", "/nonexistent/ffmpeg")
+    monkeypatch.setattr(AudioPipeline, "_unavailable", False)
+    user = make_user("u1")
+    before = PostService.create_post(user, "旧帖", None, f"/uploads/audio/{MEDIA_ID}.mp3")
+    plain = PostService.create_post(user, "无音频")
+
+    AudioPipeline.start()
+    assert AudioPipeline._executor is None
+    after = PostService.create_post(user, "新帖", None, f"/uploads/audio/{MEDIA_ID}.mp3")
+    assert after["audio_status"] == "pending"
+
+    rows = dict(query("SELECT id, audio_status FROM posts"))
+    assert rows == {before["id"]: "pending", plain["id"]: "none", after["id"]: "failed"}
+    assert [post_id for post_id, _ in AudioPipeline._claim(None, 10)] == [before["id"]]
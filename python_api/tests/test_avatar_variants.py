@@ -0,0 +1,82 @@
+"""头像缩略图：外部地址、原图缺失 / 损坏、失败重试、轮转扫描与生成结果"""
+import pytest
+
+from python_api.config import Config
+from python_api.services import avatar_variants
+from python_api.services.avatar_variants import AvatarVariants
+
+STEM = "0123456789abcdef0123456789abcdef"
+
+
+@pytest.fixture
+def avatar_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(avatar_variants, "AVATAR_DIR", str(tmp_path))
+    monkeypatch.setattr(AvatarVariants, "_sweep_after", 0)
+    return tmp_path
+
+
+def _variants(query, user_id):
+    return query("SELECT avatar_variants FROM users WHERE id = %s", (user_id,))[0][0]
+
+
+def test_external_url_marked_empty(avatar_dir, make_user, query):
+    url = "https://example.com/a.png"
+    user = make_user("u1", avatar_url=url)
+    AvatarVariants._process(user, url)
+    assert _variants(query, user) == {}
+
+
+def test_missing_source_marked_empty(avatar_dir, make_user, query):
+    pytest.importorskip("PIL.Image")
+    url = f"/uploads/avatars/{STEM}.png"
+    user = make_user("u1", avatar_url=url)
+    AvatarVariants._process(user, url)
+    assert _variants(query, user) == {}
+
+
+def test_undecodable_source_marked_empty(avatar_dir, make_user, query):
+    pytest.importorskip("PIL.Image")
+    (avatar_dir / f"{STEM}.png").write_bytes(b"not an image")
+    url = f"/uploads/avatars/{STEM}.png"
+    user = make_user("u1", avatar_url=url)
+    AvatarVariants._process(user, url)
+    assert _variants(query, user) == {}
+
+
+def test_transient_failure_left_for_retry(avatar_dir, make_user, query, monkeypatch):
+    def generate(avatar_url):
+        raise PermissionError(avatar_url)
+
+    monkeypatch.setattr(AvatarVariants, "generate", staticmethod(generate))
+    url = f"/uploads/avatars/{STEM}.png"
+    user = make_user("u1", avatar_url=url)
+    AvatarVariants._process(user, url)
+    assert _variants(query, user) is None
+
+
+def test_sweep_rotates_past_failing_users(avatar_dir, make_user, monkeypatch):
+    monkeypatch.setattr(Config, "AVATAR_VARIANT_WORKERS", 1)
+    for i in range(10):
+        make_user(f"u{i}", avatar_url=f"/uploads/avatars/{STEM}.png")
+    assert AvatarVariants.sweep() == 8
+    assert AvatarVariants.sweep() == 2
+    assert AvatarVariants.sweep() == 8
+
+
+def test_generates_square_variants(avatar_dir, make_user, query, monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    monkeypatch.setattr(Config, "AVATAR_VARIANT_SIZES", "48,96")
+    monkeypatch.setattr(Config, "AVATAR_VARIANT_FORMAT", "jpeg")
+    Image.new("RGB", (300, 200), "red").save(avatar_dir / f"{STEM}.png")
+    url = f"/uploads/avatars/{STEM}.png"
+    user = make_user("u1", avatar_url=url)
+
+    AvatarVariants._process(user, url)
+    assert _variants(query, user) == {"48": f"/uploads/avatars/{STEM}_48.jpg", "96": f"/uploads/avatars/{STEM}_96.jpg"}
+    with Image.open(avatar_dir / f"{STEM}_96.jpg") as thumbnail:
+        assert thumbnail.size == (96, 96)
+
+    # 头像已更换时不覆盖新头像的状态
+    query("UPDATE users SET avatar_url = '/uploads/avatars/other.png', avatar_variants = NULL")
+    AvatarVariants._process(user, url)
+    assert _variants(query, user) is None
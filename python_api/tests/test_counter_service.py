@@ -0,0 +1,52 @@
+"""计数合并：批量写回、不小于 0、失败放回与按明细对账"""
+import pytest
+
+from python_api.services import counter_service
+from python_api.services.counter_service import CounterService
+from python_api.services.post_service import PostService
+
+
+@pytest.fixture
+def post(make_user):
+    return PostService.create_post(make_user("u1"), "p")["id"]
+
+
+def test_unknown_column_rejected():
+    with pytest.raises(ValueError):
+        CounterService.incr("posts", "views_count", 1)
+
+
+def test_flush_merges_and_clamps(post, make_user, query):
+    user = make_user("u2")
+    CounterService.incr("posts", "likes_count", post, 1)
+    CounterService.incr("posts", "likes_count", post, 1)
+    CounterService.incr("posts", "comments_count", post, -3)
+    CounterService.incr("users", "followers_count", user, 2)
+    assert CounterService.current("posts", "likes_count", post, 5) == 7
+    assert CounterService.current("posts", "comments_count", post, 1) == 0
+
+    assert CounterService.flush() == 3
+    assert query("SELECT likes_count, comments_count FROM posts WHERE id = %s", (post,)) == [(2, 0)]
+    assert query("SELECT followers_count FROM users WHERE id = %s", (user,)) == [(2,)]
+    assert CounterService.pending("posts", "likes_count", post) == 0
+
+
+def test_failed_flush_keeps_increments(post, monkeypatch):
+    CounterService.incr("posts", "likes_count", post, 1)
+
+    def unavailable():
+        raise OSError("database unavailable")
+
+    monkeypatch.setattr(counter_service, "get_db_connection", unavailable)
+    with pytest.raises(OSError):
+        CounterService.flush()
+    assert CounterService.pending("posts", "likes_count", post) == 1
+
+
+def test_reconcile_fixes_drift(post, make_user, query):
+    fan = make_user("fan")
+    query("INSERT INTO likes (user_id, post_id) VALUES (%s, %s)", (fan, post))
+    query("UPDATE posts SET likes_count = 9, comments_count = 4 WHERE id = %s", (post,))
+    assert CounterService.reconcile() == 2
+    assert query("SELECT likes_count, comments_count FROM posts WHERE id = %s", (post,)) == [(1, 0)]
+    assert CounterService.reconcile() == 0
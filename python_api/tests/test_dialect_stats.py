@@ -0,0 +1,23 @@
+"""方言标签统计：发帖 / 删帖同事务增减、排序与对账"""
+from python_api.services.dialect_stats_service import DialectStatsService
+from python_api.services.post_service import PostService
+
+
+def test_counts_follow_create_and_delete(make_user):
+    user = make_user("u1")
+    ids = [PostService.create_post(user, "p", tag)["id"] for tag in ["粤语", "粤语", "吴语", None]]
+    assert PostService.get_dialect_stats() == [{"tag": "粤语", "count": 2}, {"tag": "吴语", "count": 1}]
+
+    assert PostService.delete_post(ids[2], user)
+    assert PostService.delete_post(ids[2], user) is False
+    assert DialectStatsService.top() == [{"tag": "粤语", "count": 2}]
+
+
+def test_reconcile_fixes_drift(make_user, query):
+    user = make_user("u1")
+    PostService.create_post(user, "p", "粤语")
+    query("UPDATE dialect_tag_counts SET post_count = 5")
+    query("INSERT INTO dialect_tag_counts (tag, post_count) VALUES ('闽语', 3)")
+    assert DialectStatsService.reconcile() == 2
+    assert DialectStatsService.top() == [{"tag": "粤语", "count": 1}]
+    assert DialectStatsService.reconcile() == 0
@@ -0,0 +1,57 @@
+"""快速 JSON 序列化：与按 response_model 序列化的结果一致（orjson 与标准库两种实现）"""
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from python_api.models.post import PostListResponse
+from python_api.models.rows import AuthorRow, PostRow
+from python_api.models.user import UserPublicProfile
+from python_api.utils import fast_json
+from python_api.utils.fast_json import FastJSONResponse, dumps
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(fast_json, "orjson", None)
+    return request.param
+
+
+def _post(created_at):
+    return PostRow(
+        id=1, content="侬好", audio_url=None, dialect_tag="上海话", likes_count=2, comments_count=0,
+        views_count=5, created_at=created_at, updated_at=None, is_liked=True,
+        author=AuthorRow(id=7, username="u", avatar_variants={"48": "/a_48.webp"}),
+    )
+
+
+@pytest.mark.parametrize("created_at", [
+    datetime(2024, 5, 1, 8, 30, tzinfo=timezone.utc),
+    datetime(2024, 5, 1, 8, 30, 15, 120000, tzinfo=timezone(timedelta(hours=8))),
+    datetime(2024, 5, 1, 8, 30),
+])
+def test_matches_response_model(backend, created_at):
+    content = {"posts": [_post(created_at)], "total": 1, "page": 1, "page_size": 20, "has_more": False}
+    expected = PostListResponse.model_validate(content, from_attributes=True).model_dump_json()
+    assert json.loads(dumps(content)) == json.loads(expected)
+
+
+def test_other_types(backend):
+    profile = UserPublicProfile(id=1, username="u", level=2, level_name="x", created_at=None)
+    data = json.loads(dumps({"amount": Decimal("3"), "ratio": Decimal("0.5"), "tags": {"a"}, "user": profile, 1: "k"}))
+    assert data["amount"] == 3 and data["ratio"] == 0.5 and data["tags"] == ["a"]
+    assert data["user"]["username"] == "u"
+    assert data["1"] == "k"
+    assert "侬" in dumps("侬").decode("utf-8")
+    with pytest.raises(TypeError):
+        dumps(object())
+
+
+def test_response_headers(backend):
+    response = FastJSONResponse({"ok": True})
+    assert response.body == b'{"ok":true}'
+    assert response.headers["content-type"] == "application/json"
@@ -0,0 +1,77 @@
+"""JWT 认证：已验证 token 缓存、吊销检查（必选与可选认证一致）"""
+import asyncio
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from python_api.utils import jwt_auth
+from python_api.utils.jwt_auth import (
+    ALGORITHM, SECRET_KEY, create_access_token, get_current_user, get_current_user_optional,
+    revoke_user_tokens, token_cache_stats, verify_token,
+)
+
+
+def _credentials(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.fixture
+def token_cache():
+    jwt_auth._token_cache.clear()
+    yield
+    jwt_auth._token_cache.clear()
+
+
+def test_verified_token_cached(token_cache):
+    token = create_access_token(1, "u1")
+    before = token_cache_stats()
+    first = verify_token(token)
+    assert first["sub"] == "1"
+    assert verify_token(token) is first
+    after = token_cache_stats()
+    assert (after["size"], after["hits"] - before["hits"], after["misses"] - before["misses"]) == (1, 1, 1)
+
+    forged = jwt.encode({"sub": "1", "exp": time.time() + 60}, "other-secret", algorithm=ALGORITHM)
+    assert verify_token(forged) is None
+    assert token_cache_stats()["size"] == 1
+
+
+def test_cached_token_expires_with_exp(token_cache):
+    token = jwt.encode({"sub": "1", "exp": time.time() + 1}, SECRET_KEY, algorithm=ALGORITHM)
+    assert verify_token(token) is not None
+    time.sleep(1.1)
+    assert verify_token(token) is None
+
+
+def test_optional_auth_accepts_current_token(make_user):
+    user = make_user("u1")
+    token = create_access_token(user, "u1")
+    assert asyncio.run(get_current_user_optional(_credentials(token))) == {"id": user, "username": "u1"}
+    assert asyncio.run(get_current_user_optional(None)) is None
+    assert asyncio.run(get_current_user_optional(_credentials("not-a-token"))) is None
+
+
+def test_revoked_token_rejected_by_both_dependencies(make_user):
+    user = make_user("u1")
+    token = create_access_token(user, "u1")
+    assert asyncio.run(get_current_user(_credentials(token)))["id"] == user
+
+    revoke_user_tokens(user)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(get_current_user(_credentials(token)))
+    assert exc.value.status_code == 401
+    assert asyncio.run(get_current_user_optional(_credentials(token))) is None
+
+    fresh = create_access_token(user, "u1", token_version=1)
+    assert asyncio.run(get_current_user_optional(_credentials(fresh)))["id"] == user
+
+
+def test_deleted_user_treated_as_anonymous(make_user, query):
+    user = make_user("u1")
+    token = create_access_token(user, "u1")
+    query("DELETE FROM users WHERE id = %s", (user,))
+    jwt_auth.invalidate_user(user)
+    assert asyncio.run(get_current_user_optional(_credentials(token))) is None
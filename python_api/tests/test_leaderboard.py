@@ -0,0 +1,33 @@
+"""排行榜：有序结构的名次与同分排序、周榜 / 月榜的统计窗口"""
+from python_api.services.leaderboard_service import LeaderboardService
+from python_api.utils.leaderboard import SortedLeaderboard
+
+
+def test_sorted_leaderboard_ranks():
+    board = SortedLeaderboard()
+    board.replace([(1, 10), (2, 30), (3, 10), (4, 0)])
+    assert board.top(10) == [(2, 30), (1, 10), (3, 10)]
+    assert board.rank(3) == (3, 10)
+    assert board.rank(4) is None
+
+    assert board.add(3, 25) == 35
+    assert board.top(2) == [(3, 35), (2, 30)]
+    board.set(2, 0)
+    assert board.rank(2) is None
+    assert board.top(1, offset=1) == [(1, 10)]
+    assert len(board) == 2
+
+
+def test_weekly_window_covers_seven_days(make_user, query):
+    today, edge, outside = make_user("today"), make_user("edge"), make_user("outside")
+    query("""
+        INSERT INTO points_daily (user_id, day, reason, points) VALUES
+        (%s, CURRENT_DATE, 'r', 5),
+        (%s, CURRENT_DATE - 6, 'r', 4),
+        (%s, CURRENT_DATE - 7, 'r', 3)
+    """, (today, edge, outside))
+    LeaderboardService.rebuild()
+    assert [entry["id"] for entry in LeaderboardService.top("weekly")] == [today, edge]
+    assert [entry["id"] for entry in LeaderboardService.top("monthly")] == [today, edge, outside]
+    assert LeaderboardService.rank(outside, "weekly") == {"rank": None, "points": 0}
+    assert LeaderboardService.rank(edge, "weekly") == {"rank": 2, "points": 4}
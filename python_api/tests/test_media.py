@@ -0,0 +1,98 @@
+"""上传文件服务：缓存头、Range、304、X-Accel-Redirect 与 sendfile"""
+import asyncio
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from python_api.config import Config
+from python_api.utils.media import ZEROCOPY_EXTENSION, MediaFiles, MediaResponse, cache_control
+
+HASHED = "0123456789abcdef0123456789abcdef.opus"
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def media_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "MEDIA_ACCEL_REDIRECT", "")
+    (tmp_path / "audio").mkdir()
+    (tmp_path / "audio" / HASHED).write_bytes(CONTENT)
+    (tmp_path / "audio" / "legacy.opus").write_bytes(CONTENT)
+    return tmp_path
+
+
+@pytest.fixture
+def client(media_dir):
+    return TestClient(Starlette(routes=[Mount("/uploads", MediaFiles(directory=str(media_dir)))]))
+
+
+def test_cache_control_by_name():
+    assert "immutable" in cache_control(HASHED)
+    assert "immutable" in cache_control("0123456789abcdef0123456789abcdef_96.webp")
+    assert cache_control("legacy.opus") == "public, no-cache"
+
+
+def test_full_and_range_responses(client):
+    response = client.get(f"/uploads/audio/{HASHED}")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-type"] == "audio/ogg"
+    assert response.headers["cache-control"] == f"public, max-age={Config.MEDIA_CACHE_MAX_AGE}, immutable"
+
+    response = client.get(f"/uploads/audio/{HASHED}", headers={"range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+
+
+def test_etag_revalidation(client):
+    etag = client.get("/uploads/audio/legacy.opus").headers["etag"]
+    response = client.get("/uploads/audio/legacy.opus", headers={"if-none-match": etag})
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == "public, no-cache"
+
+
+def test_accel_redirect_returns_headers_only(client, monkeypatch):
+    monkeypatch.setattr(Config, "MEDIA_ACCEL_REDIRECT", "/_uploads/")
+    response = client.get(f"/uploads/audio/{HASHED}")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == f"/_uploads/audio/{HASHED}"
+    assert response.headers["content-type"] == "audio/ogg"
+
+
+def _call_with_zerocopy(path, headers=()):
+    scope = {"type": "http", "method": "GET", "headers": list(headers), "extensions": {ZEROCOPY_EXTENSION: {}}}
+    sent = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == ZEROCOPY_EXTENSION:
+            message = dict(message, file=message["file"].name)
+        sent.append(message)
+
+    asyncio.run(MediaResponse(str(path))(scope, receive, send))
+    return sent
+
+
+def test_zerocopy_send_for_full_and_single_range(media_dir, monkeypatch):
+    monkeypatch.setattr(Config, "MEDIA_SENDFILE", True)
+    path = media_dir / "audio" / HASHED
+
+    start, body = _call_with_zerocopy(path)
+    assert start["status"] == 200
+    assert body == {"type": ZEROCOPY_EXTENSION, "file": str(path), "offset": 0, "count": len(CONTENT),
+                    "more_body": False}
+
+    start, body = _call_with_zerocopy(path, [(b"range", b"bytes=100-")])
+    assert start["status"] == 206
+    assert dict(start["headers"])[b"content-range"] == f"bytes 100-{len(CONTENT) - 1}/{len(CONTENT)}".encode()
+    assert (body["offset"], body["count"]) == (100, len(CONTENT) - 100)
+
+    monkeypatch.setattr(Config, "MEDIA_SENDFILE", False)
+    messages = _call_with_zerocopy(path)
+    assert all(message["type"] != ZEROCOPY_EXTENSION for message in messages)
+    assert b"".join(message.get("body", b"") for message in messages[1:]) == CONTENT
@@ -0,0 +1,107 @@
+"""通知：同组合并、已读水位、未读数缓存与推送"""
+import psycopg
+import pytest
+
+from python_api.config import Config
+from python_api.database.connection import get_db_connection
+from python_api.services.notification_bus import NotificationBus
+from python_api.services.notification_service import NotificationService
+from python_api.services.post_service import PostService
+
+
+@pytest.fixture
+def listener(db):
+    """监听通知频道，返回取出已送达消息的函数"""
+    conn = psycopg.connect(host=Config.DB_HOST, port=Config.DB_PORT, dbname=Config.DB_NAME,
+                           user=Config.DB_USER, password=Config.DB_PASSWORD, autocommit=True)
+    conn.execute(f"LISTEN {NotificationBus.CHANNEL}")
+
+    def received():
+        return [notify.payload for notify in conn.notifies(timeout=0.2)]
+
+    yield received
+    conn.close()
+
+
+def _notify(*items):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            ids = NotificationService.insert_many(cur, list(items))
+        conn.commit()
+        return ids
+    finally:
+        conn.close()
+
+
+def _like(user_id, actor_id, post_id):
+    return {"user_id": user_id, "type": "like", "actor_id": actor_id, "post_id": post_id}
+
+
+@pytest.fixture
+def users(make_user):
+    """帖子作者（两条帖子）与点赞者"""
+    owner, a, b = make_user("owner"), make_user("a"), make_user("b")
+    posts = [PostService.create_post(owner, f"p{i}")["id"] for i in range(2)]
+    return owner, a, b, posts
+
+
+def test_likes_on_same_post_coalesce(users, query):
+    owner, a, b, (p1, p2) = users
+    first = _notify(_like(owner, a, p1))
+    second = _notify(_like(owner, b, p1), _like(owner, a, p1))
+    assert first == second
+    assert query("SELECT group_count, actor_ids FROM notifications") == [(3, [a, b])]
+    assert query("SELECT unread_notifications FROM users WHERE id = %s", (owner,)) == [(1,)]
+
+    # 自己给自己点赞不产生通知，其他帖子另起一组
+    _notify(_like(owner, owner, p1), _like(owner, a, p2))
+    assert query("SELECT unread_notifications FROM users WHERE id = %s", (owner,)) == [(2,)]
+
+
+def test_read_watermark_starts_new_group(users, query):
+    owner, a, _, (p1, _) = users
+    old = _notify(_like(owner, a, p1))
+    assert NotificationService.mark_all_as_read(owner) == 1
+    new = _notify(_like(owner, a, p1))
+    assert new != old
+    assert NotificationService.get_unread_count(owner) == 1
+
+    page = NotificationService.get_notifications(owner)
+    assert [(item.id, item.is_read) for item in page["items"]] == [(new[0], False), (old[0], True)]
+    assert NotificationService.mark_as_read(old[0], owner)
+    assert query("SELECT unread_notifications FROM users WHERE id = %s", (owner,)) == [(1,)]
+
+
+def test_cache_miss_then_notify_does_not_double_count(users, listener):
+    owner, a, _, (p1, p2) = users
+    _notify(_like(owner, a, p1))
+    # 推送尚未处理时缓存未命中，从数据库加载的未读数已包含这条通知
+    assert NotificationBus.unread_count(owner) == 1
+    for payload in listener():
+        NotificationBus._dispatch(payload)
+    assert NotificationBus.unread_count(owner) == 1
+
+    notification_id = _notify(_like(owner, a, p2))[0]
+    NotificationService.mark_as_read(notification_id, owner)
+    NotificationBus._unread.clear()
+    payloads = listener()
+    assert len(payloads) == 2
+    for payload in payloads:
+        NotificationBus._dispatch(payload)
+    assert NotificationBus.unread_count(owner) == 1
+
+
+def test_dispatch_delivers_committed_count(users, listener, monkeypatch):
+    owner, a, _, (p1, _) = users
+    NotificationBus._unread.set(owner, 5)  # 过时的缓存
+    _notify(_like(owner, a, p1))
+    NotificationService.mark_all_as_read(owner)
+
+    delivered = []
+    monkeypatch.setattr(NotificationBus, "_deliver_local",
+                        lambda user_id, message: delivered.append((message["event"], message["unread"])))
+    for payload in listener():
+        NotificationBus._dispatch(payload)
+    assert delivered == [("notification", 1), ("unread", 0)]
+    assert NotificationBus.unread_count(owner) == 0
@@ -0,0 +1,157 @@
+"""事务发件箱：去重、SKIP LOCKED、邮件租约与单条确认"""
+import psycopg
+import pytest
+
+from python_api.config import Config
+from python_api.database.connection import get_db_connection
+from python_api.services import outbox_service
+from python_api.services.email_service import EmailService
+from python_api.services.leaderboard_service import LeaderboardService
+from python_api.services.outbox_service import OutboxService
+
+
+def _enqueue(event_type, payload, dedup_key=None):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            written = OutboxService.enqueue(cur, event_type, payload, dedup_key)
+        conn.commit()
+        return written
+    finally:
+        conn.close()
+
+
+def _email(to):
+    return _enqueue("email", {"to": to, "subject": "s", "html": "h"})
+
+
+@pytest.fixture
+def outbox(query):
+    def events():
+        return query("""
+            SELECT payload->>'to', status, attempts, status = 'pending' AND available_at > NOW()
+            FROM outbox_events ORDER BY id
+        """)
+    return events
+
+
+def test_dedup_key_writes_once(db, make_user, query):
+    user = make_user("u1")
+    assert _enqueue("points", {"user_id": user, "points": 5, "reason": "r"}, "k1")
+    assert not _enqueue("points", {"user_id": user, "points": 5, "reason": "r"}, "k1")
+    assert OutboxService.drain() == 1
+    assert query("SELECT points FROM users WHERE id = %s", (user,)) == [(5,)]
+
+
+def test_unknown_event_type_rejected(db):
+    with pytest.raises(ValueError):
+        _enqueue("sms", {})
+
+
+def test_failed_email_does_not_resend_delivered(db, outbox, query, monkeypatch):
+    sent = []
+
+    def send(to, subject, html):
+        sent.append(to)
+        return to != "b@x"
+
+    monkeypatch.setattr(EmailService, "send_email", staticmethod(send))
+    for to in ("a@x", "b@x", "c@x"):
+        _email(to)
+
+    assert OutboxService.drain() == 3
+    assert sent == ["a@x", "b@x", "c@x"]
+    assert outbox() == [("a@x", "done", 1, False), ("b@x", "pending", 1, True), ("c@x", "done", 1, False)]
+
+    # 退避期内不会重发；到期后只重发失败的那一封
+    assert OutboxService.drain() == 0
+    query("UPDATE outbox_events SET available_at = NOW() WHERE status = 'pending'")
+    monkeypatch.setattr(EmailService, "send_email", staticmethod(lambda to, s, h: sent.append(to) or True))
+    assert OutboxService.drain() == 1
+    assert sent == ["a@x", "b@x", "c@x", "b@x"]
+    assert [row[1] for row in outbox()] == ["done", "done", "done"]
+
+
+def test_email_sent_after_commit_with_lease(db, outbox, monkeypatch):
+    seen = []
+
+    def send(to, subject, html):
+        # 发送时行锁已释放，其他进程可以读写该行，但租约期内不会再领取
+        with psycopg.connect(host=Config.DB_HOST, port=Config.DB_PORT, dbname=Config.DB_NAME,
+                             user=Config.DB_USER, password=Config.DB_PASSWORD) as other:
+            other.execute("SET lock_timeout = '1s'")
+            other.execute("SELECT id FROM outbox_events FOR UPDATE NOWAIT").fetchall()
+        seen.append(OutboxService._process_batch(10))
+        return True
+
+    monkeypatch.setattr(EmailService, "send_email", staticmethod(send))
+    _email("a@x")
+    assert OutboxService.drain() == 1
+    assert seen == [0]
+    assert outbox() == [("a@x", "done", 1, False)]
+
+
+def test_expired_lease_is_reclaimed(db, outbox, query, monkeypatch):
+    sent = []
+    monkeypatch.setattr(EmailService, "send_email", staticmethod(lambda to, s, h: sent.append(to) or True))
+    _email("a@x")
+    # 模拟进程在发送前崩溃：已续租但未确认
+    query("UPDATE outbox_events SET attempts = 1, available_at = NOW() - INTERVAL '1 second'")
+    assert OutboxService.drain() == 1
+    assert sent == ["a@x"]
+    assert outbox() == [("a@x", "done", 2, False)]
+
+
+def test_email_goes_dead_after_max_attempts(db, outbox, query, monkeypatch):
+    monkeypatch.setattr(Config, "OUTBOX_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(EmailService, "send_email", staticmethod(lambda to, s, h: False))
+    _email("a@x")
+    OutboxService.drain()
+    query("UPDATE outbox_events SET available_at = NOW()")
+    OutboxService.drain()
+    assert outbox()[0][1:3] == ("dead", 2)
+
+
+def test_skip_locked_leaves_locked_rows(db, make_user, query):
+    user = make_user("u1")
+    for i in range(3):
+        _enqueue("points", {"user_id": user, "points": 1, "reason": f"r{i}"})
+
+    locker = get_db_connection()
+    try:
+        locker.execute("SELECT id FROM outbox_events WHERE id = 2 FOR UPDATE")
+        assert OutboxService.drain() == 2
+    finally:
+        locker.rollback()
+        locker.close()
+    assert query("SELECT id, status FROM outbox_events ORDER BY id") == [(1, "done"), (2, "pending"), (3, "done")]
+    assert OutboxService.drain() == 1
+
+
+class _FailingCommit:
+    """代理连接，commit 时抛错"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self):
+        raise psycopg.OperationalError("commit failed")
+
+
+def test_points_published_only_after_commit(db, make_user, query, monkeypatch):
+    user = make_user("u1")
+    LeaderboardService.rebuild()
+    _enqueue("points", {"user_id": user, "points": 5, "reason": "r"})
+
+    monkeypatch.setattr(outbox_service, "get_db_connection", lambda: _FailingCommit(get_db_connection()))
+    assert OutboxService.drain() == 0
+    assert LeaderboardService.rank(user) == {"rank": None, "points": 0}
+    assert query("SELECT points FROM users WHERE id = %s", (user,)) == [(0,)]
+    assert query("SELECT status FROM outbox_events") == [("pending",)]
+
+    monkeypatch.setattr(outbox_service, "get_db_connection", get_db_connection)
+    assert OutboxService.drain() == 1
+    assert LeaderboardService.rank(user) == {"rank": 1, "points": 5}
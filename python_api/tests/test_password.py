@@ -0,0 +1,60 @@
+"""密码哈希：格式兼容、重新哈希判断、线程池满时拒绝，以及注册 / 重置不提前核销验证码"""
+import hashlib
+
+import pytest
+
+from python_api.config import Config
+from python_api.services import auth_service
+from python_api.services.auth_service import AuthService
+from python_api.utils import password
+from python_api.utils.password import HashingBusyError, hash_password, needs_rehash, verify_password
+
+
+def test_hash_roundtrip_and_legacy_format(monkeypatch):
+    monkeypatch.setattr(Config, "PASSWORD_HASH_ITERATIONS", 1000)
+    stored = hash_password("secret")
+    assert stored.startswith("pbkdf2_sha256$1000$")
+    assert verify_password("secret", stored)
+    assert not verify_password("wrong", stored)
+    assert not needs_rehash(stored)
+
+    legacy = "salt$" + hashlib.pbkdf2_hmac("sha256", b"secret", b"salt", password.LEGACY_ITERATIONS).hex()
+    assert verify_password("secret", legacy)
+    assert needs_rehash(legacy)
+    assert not verify_password("secret", "garbage")
+
+
+def test_full_pool_raises_busy(monkeypatch):
+    monkeypatch.setattr(password._slots, "acquire", lambda blocking=True: False)
+    with pytest.raises(HashingBusyError):
+        hash_password("secret")
+
+
+def _busy(_password):
+    raise HashingBusyError("busy")
+
+
+def _add_code(query, purpose):
+    query("""
+        INSERT INTO verification_codes (email, code, purpose, expires_at)
+        VALUES ('a@x', '123456', %s, NOW() + INTERVAL '10 minutes')
+    """, (purpose,))
+
+
+def test_register_keeps_code_when_hashing_busy(query, monkeypatch):
+    _add_code(query, "register")
+    monkeypatch.setattr(auth_service, "hash_password", _busy)
+    assert AuthService.register("u1", "secret", "a@x", "123456") == {"error": "服务繁忙，请稍后重试"}
+    assert query("SELECT used FROM verification_codes") == [(False,)]
+
+    monkeypatch.undo()
+    assert AuthService.register("u1", "secret", "a@x", "123456")["ok"]
+    assert query("SELECT used FROM verification_codes") == [(True,)]
+
+
+def test_reset_password_keeps_code_when_hashing_busy(make_user, query, monkeypatch):
+    make_user("u1", email="a@x")
+    _add_code(query, "reset_password")
+    monkeypatch.setattr(auth_service, "hash_password", _busy)
+    assert AuthService.reset_password("a@x", "123456", "new") == {"error": "服务繁忙，请稍后重试"}
+    assert query("SELECT used FROM verification_codes") == [(False,)]
@@ -0,0 +1,37 @@
+"""积分账本：每日上限只约束加分，扣分全额入账"""
+from python_api.services.points_ledger import DAILY_LIMITS, PointsLedger
+
+POST = "发布帖子"
+CAP = DAILY_LIMITS[POST]
+
+
+def _points(query, user_id):
+    return query("SELECT points FROM users WHERE id = %s", (user_id,))[0][0]
+
+
+def test_daily_cap_truncates_positive(make_user, query):
+    user = make_user("u1")
+    assert PointsLedger.award([(user, CAP - 10, POST)])[0].granted == CAP - 10
+    assert PointsLedger.award([(user, 30, POST)])[0].granted == 10
+    assert PointsLedger.award([(user, 5, POST)]) == []
+    assert _points(query, user) == CAP
+    # 无上限的原因不受影响；同批次同原因先归并
+    assert PointsLedger.award([(user, 100, "后台调整"), (user, 20, POST), (user, 1, "后台调整")])[0].granted == 101
+
+
+def test_negative_delta_not_clamped_at_cap(make_user, query):
+    user = make_user("u1")
+    PointsLedger.award([(user, CAP, POST)])
+    awards = PointsLedger.award([(user, -10, POST)])
+    assert [(a.granted, a.points) for a in awards] == [(-10, CAP - 10)]
+    assert query("SELECT points FROM points_daily WHERE user_id = %s", (user,)) == [(CAP - 10,)]
+    assert query("SELECT points FROM points_history WHERE user_id = %s ORDER BY id", (user,)) == [(CAP,), (-10,)]
+
+    # 扣分后当天可以再获得被扣掉的额度
+    assert PointsLedger.award([(user, 30, POST)])[0].granted == 10
+
+
+def test_negative_first_event_of_day(make_user, query):
+    user = make_user("u1", points=100)
+    assert PointsLedger.award([(user, -(CAP + 5), POST)])[0].granted == -(CAP + 5)
+    assert _points(query, user) == 100 - CAP - 5
@@ -0,0 +1,51 @@
+"""帖子点赞：单语句切换、幂等、发件箱去重"""
+import pytest
+
+from python_api.services.post_service import PostService
+
+
+@pytest.fixture
+def post(make_user):
+    author = make_user("author")
+    return author, PostService.create_post(author, "p")["id"]
+
+
+def test_toggle_like_and_unlike(post, make_user, query):
+    _, post_id = post
+    fan = make_user("fan")
+    assert PostService.toggle_like(post_id, fan) == {"is_liked": True, "likes_count": 1}
+    assert PostService.toggle_like(post_id, fan) == {"is_liked": False, "likes_count": 0}
+    assert PostService.toggle_like(post_id, fan) == {"is_liked": True, "likes_count": 1}
+    assert query("SELECT COUNT(*) FROM likes WHERE post_id = %s", (post_id,)) == [(1,)]
+
+
+def test_like_and_unlike_are_idempotent(post, make_user):
+    _, post_id = post
+    fan = make_user("fan")
+    assert PostService.like_post(post_id, fan) == {"is_liked": True, "likes_count": 1}
+    assert PostService.like_post(post_id, fan) == {"is_liked": True, "likes_count": 1}
+    assert PostService.unlike_post(post_id, fan) == {"is_liked": False, "likes_count": 0}
+    assert PostService.unlike_post(post_id, fan) == {"is_liked": False, "likes_count": 0}
+
+
+def test_relike_does_not_repeat_side_effects(post, make_user, query):
+    author, post_id = post
+    fan = make_user("fan")
+    for _ in range(3):
+        PostService.like_post(post_id, fan)
+        PostService.unlike_post(post_id, fan)
+    PostService.like_post(post_id, author)  # 给自己点赞不发放积分、不通知
+    assert query("""
+        SELECT event_type, payload->>'user_id' FROM outbox_events
+        WHERE dedup_key LIKE '%%:like_post:%%' ORDER BY event_type
+    """) == [
+        ("notification", str(author)), ("points", str(author)),
+    ]
+
+
+def test_missing_or_deleted_post(post, make_user, query):
+    _, post_id = post
+    fan = make_user("fan")
+    assert PostService.toggle_like(post_id + 100, fan) is None
+    query("UPDATE posts SET is_deleted = TRUE WHERE id = %s", (post_id,))
+    assert PostService.like_post(post_id, fan) is None
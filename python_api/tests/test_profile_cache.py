@@ -0,0 +1,59 @@
+"""用户资料缓存：批量读穿、命中不查库、本进程变更后失效"""
+from python_api.database.connection import get_db_connection
+from python_api.models.user import UserProfileUpdate
+from python_api.services.points_ledger import PointsLedger
+from python_api.services.profile_cache import ProfileCache
+from python_api.services.user_service import UserService
+
+
+class CountingCursor:
+    """记录执行次数的游标包装"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.executed = 0
+
+    def execute(self, *args):
+        self.executed += 1
+        return self.cursor.execute(*args)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+
+def test_get_many_fills_misses_in_one_query(make_user):
+    a, b, c = make_user("a"), make_user("b", nickname="B"), make_user("c")
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            counting = CountingCursor(cur)
+            ProfileCache.get(a, counting)
+            assert counting.executed == 1
+            profiles = ProfileCache.get_many([a, b, b, None, c, 999], counting)
+            assert counting.executed == 2
+            assert sorted(profiles) == [a, b, c]
+            assert profiles[b].nickname == "B"
+            ProfileCache.get_many([a, b, c], counting)
+            assert counting.executed == 2
+    finally:
+        conn.close()
+
+
+def test_local_changes_invalidate(make_user, query):
+    user = make_user("u1")
+    assert ProfileCache.get(user).nickname is None
+
+    # 其他进程直接改库：TTL 内仍读到缓存
+    query("UPDATE users SET nickname = 'stale' WHERE id = %s", (user,))
+    assert ProfileCache.get(user).nickname is None
+
+    UserService.update_profile(user, UserProfileUpdate(nickname="new"))
+    assert ProfileCache.get(user).nickname == "new"
+
+    PointsLedger.award([(user, 7, "后台调整")])
+    assert ProfileCache.get(user).points == 7
+
+
+def test_missing_user_placeholder(db):
+    assert ProfileCache.get(12345) is None
+    assert ProfileCache.author(None, 12345).username == "未知用户"
@@ -0,0 +1,84 @@
+"""匿名响应缓存：命中、304、登录请求绕过、分组失效与并发回源合并"""
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from python_api.utils.response_cache import ResponseCache, ResponseCacheMiddleware
+
+
+@pytest.fixture
+def calls():
+    ResponseCache.clear()
+    yield []
+    ResponseCache.clear()
+
+
+@pytest.fixture
+def app(calls):
+    async def feed(request):
+        calls.append(request.url.query)
+        if request.query_params.get("invalidate"):
+            ResponseCache.invalidate("posts")
+        if request.query_params.get("slow"):
+            await asyncio.sleep(0.05)
+        if request.query_params.get("page") == "0":
+            return JSONResponse({"detail": "bad page"}, status_code=400)
+        return JSONResponse({"items": [len(calls)]})
+
+    starlette = Starlette(routes=[Route("/api/posts", feed), Route("/api/posts/{post_id}", feed)])
+    return ResponseCacheMiddleware(starlette)
+
+
+def test_hit_and_not_modified(app, calls):
+    client = TestClient(app)
+    first = client.get("/api/posts?page=1&size=20")
+    assert first.json() == {"items": [1]}
+    etag = first.headers["etag"]
+
+    second = client.get("/api/posts?size=20&page=1")
+    assert second.json() == {"items": [1]}
+    assert second.headers["etag"] == etag
+    assert second.headers["cache-control"] == "public, no-cache"
+
+    not_modified = client.get("/api/posts?page=1&size=20", headers={"if-none-match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert len(calls) == 1
+
+
+def test_bypassed_requests(app, calls):
+    client = TestClient(app)
+    client.get("/api/posts", headers={"authorization": "Bearer x"})
+    client.get("/api/posts", headers={"authorization": "Bearer x"})
+    client.get("/api/posts/1")
+    client.get("/api/posts/1")
+    assert client.get("/api/posts?page=0").status_code == 400
+    assert client.get("/api/posts?page=0").status_code == 400
+    assert len(calls) == 6
+
+
+def test_invalidate_group(app, calls):
+    client = TestClient(app)
+    client.get("/api/posts")
+    ResponseCache.invalidate("posts")
+    assert client.get("/api/posts").json() == {"items": [2]}
+
+    # 回源期间发生失效的响应不写入缓存
+    client.get("/api/posts?invalidate=1")
+    client.get("/api/posts?invalidate=1")
+    assert len(calls) == 4
+
+
+def test_concurrent_misses_share_one_fetch(app, calls):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(*[client.get("/api/posts?slow=1") for _ in range(5)])
+
+    responses = asyncio.run(run())
+    assert [response.json() for response in responses] == [{"items": [1]}] * 5
+    assert len(calls) == 1
@@ -0,0 +1,38 @@
+"""行对象：row_with 按列名构造 slots dataclass 并分离额外列"""
+import pytest
+
+from python_api.database.connection import get_db_connection
+from python_api.models.rows import AuthorRow, CommentRow, row_with
+
+
+def test_row_with_builds_objects_and_extras(database):
+    conn = get_db_connection()
+    try:
+        with conn.cursor(row_factory=row_with(AuthorRow, "user_id", "score")) as cur:
+            cur.execute("""
+                SELECT 1 AS id, 'u' AS username, 3 AS level, 9 AS user_id, 0.5::real AS score
+                UNION ALL
+                SELECT 2, 'v', 1, 10, 0.25
+            """)
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    assert rows == [
+        (AuthorRow(id=1, username="u", level=3), 9, 0.5),
+        (AuthorRow(id=2, username="v", level=1), 10, 0.25),
+    ]
+    assert rows[0][0].level_name == "方言新手"
+
+
+def test_rows_are_slotted():
+    author = AuthorRow(id=1, username="u")
+    assert not hasattr(author, "__dict__")
+    with pytest.raises(AttributeError):
+        author.unknown = 1
+
+    # 可变默认值不在实例间共享
+    first = CommentRow(1, 1, 1, None, "c", None, 0, False, None)
+    second = CommentRow(2, 1, 1, None, "c", None, 0, False, None)
+    first.replies.append(second)
+    assert second.replies == []
@@ -0,0 +1,56 @@
+"""搜索：中文分词、帖子全文检索与用户子串匹配（游标分页）"""
+import pytest
+
+from python_api.services.post_service import PostService
+from python_api.services.search_service import InvalidCursorError, SearchService
+from python_api.utils.text_search import to_document, to_query, tokenize
+
+
+def test_tokenize_bigrams():
+    assert tokenize("粤语ABC 123") == ["粤", "语", "粤语", "abc", "123"]
+    assert tokenize("上海话", for_query=True) == ["上海", "海话"]
+    assert tokenize("啊", for_query=True) == ["啊"]
+    assert to_query("上海 上海") == "上海"
+    assert to_document("") == ""
+
+
+def test_search_posts_ranks_and_pages(make_user, query):
+    user = make_user("u1")
+    ids = [PostService.create_post(user, content, tag)["id"] for content, tag in [
+        ("今天学了一句上海话", None),
+        ("上海话和苏州话很像，上海话真好听", None),
+        ("粤语歌", "上海话"),
+        ("完全无关的内容", None),
+    ]]
+    deleted = PostService.create_post(user, "已删除的上海话")["id"]
+    query("UPDATE posts SET is_deleted = TRUE WHERE id = %s", (deleted,))
+
+    first = SearchService.search_posts("上海话", limit=2)
+    assert [post.id for post in first["items"]] == [ids[1], ids[0]]
+    assert first["items"][0].author.username == "u1"
+    second = SearchService.search_posts("上海话", limit=2, cursor=first["next_cursor"])
+    assert [post.id for post in second["items"]] == [ids[2]]
+    assert second["next_cursor"] is None
+
+    assert SearchService.search_posts("  ") == {"items": [], "next_cursor": None}
+    with pytest.raises(InvalidCursorError):
+        SearchService.search_posts("上海话", cursor="not-a-cursor")
+
+
+def test_search_users_matches_substring_literally(make_user):
+    exact = make_user("dialect")
+    make_user("dialect_fan")
+    make_user("my_dialects", nickname="Dialect 100%")
+    make_user("dialectXfan")
+    make_user("other")
+
+    page = SearchService.search_users("dialect", limit=3)
+    assert [user.username for user in page["items"]][0] == "dialect"
+    assert page["items"][0].id == exact
+    rest = SearchService.search_users("dialect", limit=3, cursor=page["next_cursor"])
+    names = [user.username for user in page["items"] + rest["items"]]
+    assert sorted(names) == ["dialect", "dialectXfan", "dialect_fan", "my_dialects"]
+
+    # _ 与 % 按字面匹配
+    assert [user.username for user in SearchService.search_users("t_f")["items"]] == ["dialect_fan"]
+    assert [user.username for user in SearchService.search_users("100%")["items"]] == ["my_dialects"]
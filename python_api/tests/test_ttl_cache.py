@@ -0,0 +1,34 @@
+"""进程内 LRU + TTL 缓存"""
+import time
+
+from python_api.utils.ttl_cache import TTLCache
+
+
+def test_lru_eviction_keeps_recently_read():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2
+
+
+def test_expired_entry_is_dropped_on_read():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("short", 1, ttl=0.01)
+    cache.set("long", 2)
+    time.sleep(0.02)
+    assert cache.get("short", "missing") == "missing"
+    assert cache.get("long") == 2
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_none_value_distinguished_from_miss():
+    cache = TTLCache(maxsize=10, ttl=60)
+    missing = object()
+    cache.set("user", None)
+    assert cache.get("user", missing) is None
+    cache.pop("user")
+    assert cache.get("user", missing) is missing
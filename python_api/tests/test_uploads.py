@@ -0,0 +1,80 @@
+"""上传：请求体大小限制（Content-Length 与分块传输）、按内容去重保存"""
+import os
+
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from python_api.utils.uploads import (
+    MULTIPART_OVERHEAD, UploadLimitMiddleware, UploadTooLargeError, save_upload, size_limit_message,
+)
+
+MAX_SIZE = 1024 * 1024
+BOUNDARY = "test-boundary"
+
+
+def _multipart(content: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="a.bin"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...), max_size: int = MAX_SIZE):
+        try:
+            saved = await save_upload(file, str(tmp_path), ".bin", max_size)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"filename": saved.filename, "existed": saved.existed}
+
+    app.add_middleware(UploadLimitMiddleware, limits={"/upload": MAX_SIZE})
+    return TestClient(app)
+
+
+def _post(client, body, chunked=False, path="/upload"):
+    headers = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+    if chunked:
+        # 生成器请求体以分块传输发送，没有 Content-Length
+        return client.post(path, content=iter([body[:1024], body[1024:]]), headers=headers)
+    return client.post(path, content=body, headers=headers)
+
+
+def test_content_length_over_limit_rejected(client):
+    response = _post(client, _multipart(b"x" * (MAX_SIZE + MULTIPART_OVERHEAD + 1)))
+    assert response.status_code == 400
+    assert response.json() == {"detail": size_limit_message(MAX_SIZE)}
+
+
+def test_chunked_body_over_limit_rejected(client, tmp_path):
+    response = _post(client, _multipart(b"x" * (MAX_SIZE + MULTIPART_OVERHEAD + 1)), chunked=True)
+    assert response.status_code == 400
+    assert response.json() == {"detail": size_limit_message(MAX_SIZE)}
+    assert os.listdir(tmp_path) == []
+
+
+def test_chunked_body_within_limit_saved(client):
+    response = _post(client, _multipart(b"x" * 4096), chunked=True)
+    assert response.status_code == 200
+    assert response.json()["existed"] is False
+
+
+def test_same_content_saved_once(client, tmp_path):
+    first = _post(client, _multipart(b"same")).json()
+    second = _post(client, _multipart(b"same")).json()
+    assert first["filename"] == second["filename"]
+    assert (first["existed"], second["existed"]) == (False, True)
+    assert os.listdir(tmp_path) == [first["filename"]]
+    assert (tmp_path / first["filename"]).stat().st_mode & 0o777 == 0o644
+
+
+def test_file_over_limit_discards_temp_file(client, tmp_path):
+    response = _post(client, _multipart(b"x" * 2048), path="/upload?max_size=1024")
+    assert response.status_code == 400
+    assert response.json() == {"detail": size_limit_message(1024)}
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,93 @@
+"""浏览量缓冲：分片计数器、周期任务、批量写回与失败放回"""
+import threading
+import time
+
+import pytest
+
+from python_api.services import view_counter
+from python_api.services.post_service import PostService
+from python_api.services.view_counter import ViewCounter
+from python_api.utils.periodic import PeriodicTask
+from python_api.utils.sharded_counter import ShardedCounter
+
+
+def test_sharded_counter_drain_and_restore():
+    counter = ShardedCounter(shards=4)
+    assert counter.add("a", 2) == 2
+    assert counter.add("b") == 1
+    assert counter.add("b", -1) == 0
+    assert len(counter) == 1
+
+    assert counter.drain() == {"a": 2}
+    assert counter.drain() == {}
+    counter.add("a", 1)
+    counter.restore([("a", 2), ("c", 5)])
+    assert (counter.get("a"), counter.get("c")) == (3, 5)
+
+
+def test_sharded_counter_concurrent_adds():
+    counter = ShardedCounter()
+
+    def run():
+        for i in range(1000):
+            counter.add(i % 10)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.drain() == {i: 800 for i in range(10)}
+
+
+def test_periodic_task_survives_errors_and_runs_final():
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+
+    task = PeriodicTask("test-task", 0.01, func)
+    task.start()
+    time.sleep(0.1)
+    task.stop(run_final=True)
+    count = len(calls)
+    assert count >= 3
+    time.sleep(0.03)
+    assert len(calls) == count
+
+
+@pytest.fixture
+def post(make_user):
+    return PostService.create_post(make_user("u1"), "p")["id"]
+
+
+def test_flush_writes_buffered_views(post, query):
+    for _ in range(3):
+        ViewCounter.record(post)
+    assert ViewCounter.pending(post) == 3
+    assert ViewCounter.flush() == 1
+    assert ViewCounter.pending(post) == 0
+    assert query("SELECT views_count FROM posts WHERE id = %s", (post,)) == [(3,)]
+    assert ViewCounter.flush() == 0
+
+
+def test_failed_flush_keeps_views(post, query, monkeypatch):
+    ViewCounter.record(post)
+
+    def unavailable():
+        raise OSError("database unavailable")
+
+    monkeypatch.setattr(view_counter, "get_db_connection", unavailable)
+    with pytest.raises(OSError):
+        ViewCounter.flush()
+    assert ViewCounter.pending(post) == 1
+
+    # 写入语句失败（增量超出 int 范围）时回滚并放回
+    monkeypatch.undo()
+    ViewCounter._counter.add(post, 2 ** 31)
+    with pytest.raises(Exception):
+        ViewCounter.flush()
+    assert ViewCounter.pending(post) == 2 ** 31 + 1
+    assert query("SELECT views_count FROM posts WHERE id = %s", (post,)) == [(0,)]
@@ -1,12 +1,21 @@
 """工具函数包"""
-from .password import hash_password, verify_password
-from .jwt_auth import create_access_token, verify_token, get_current_user, get_current_user_optional
+from .password import (
+    hash_password, verify_password, needs_rehash, HashingBusyError
+)
+from .jwt_auth import (
+    create_access_token, verify_token, get_current_user, get_current_user_optional,
+    revoke_user_tokens, invalidate_user
+)
 
 __all__ = [
     "hash_password", 
     "verify_password",
+    "needs_rehash",
+    "HashingBusyError",
     "create_access_token",
     "verify_token",
     "get_current_user",
-    "get_current_user_optional"
+    "get_current_user_optional",
+    "revoke_user_tokens",
+    "invalidate_user"
 ]
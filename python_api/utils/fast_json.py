@@ -0,0 +1,61 @@
+"""
+快速 JSON 序列化模块
+列表接口由服务层直接产出可信的 dict / 模型，路由返回 FastJSONResponse
+即可跳过 FastAPI 按 response_model 的二次校验与 jsonable_encoder 转换；
+安装了 orjson 时用其序列化（原生支持 datetime / dataclass），否则退化为标准库 json
+"""
+import dataclasses
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """orjson / json 无法直接处理的类型"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        # 与 jsonable_encoder 一致：整数值输出为 int
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if orjson is None:
+        if isinstance(obj, datetime) and obj.utcoffset() == timedelta(0):
+            return obj.replace(tzinfo=None).isoformat() + "Z"
+        if isinstance(obj, (datetime, date, time)):
+            return obj.isoformat()
+        if dataclasses.is_dataclass(obj):
+            return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    序列化为 UTF-8 JSON（紧凑格式，不转义中文；UTC 时间与 Pydantic 一致以 Z 结尾）
+
+    Args:
+        obj: dict / list / Pydantic 模型 / dataclass 及其嵌套
+
+    Returns:
+        JSON 字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """跳过 response_model 校验的 JSON 响应（内容须与路由声明的模型一致）"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
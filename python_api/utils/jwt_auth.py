@@ -2,13 +2,16 @@
 JWT 认证工具模块
 处理 JWT token 的生成和验证
 """
+import hashlib
+import time
 import jwt
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from ..config import Config
 from ..database.connection import get_db_connection
+from .ttl_cache import TTLCache
 
 # JWT 配置
 SECRET_KEY = Config.JWT_SECRET if hasattr(Config, 'JWT_SECRET') else "dialect-master-secret-key-change-in-production"
@@ -17,14 +20,23 @@ ACCESS_TOKEN_EXPIRE_HOURS = 24 * 7  # 7天
 
 security = HTTPBearer(auto_error=False)
 
+# 用户状态缓存：user_id -> token_version（用户不存在时为 None）
+# TTL 很短，其他进程吊销的 token 最多在 AUTH_CACHE_TTL 秒后失效
+_user_state_cache = TTLCache(maxsize=Config.AUTH_CACHE_SIZE, ttl=Config.AUTH_CACHE_TTL)
+_USER_MISSING = object()
 
-def create_access_token(user_id: int, username: str) -> str:
+# 已验证 token 缓存：sha256(token) -> payload，有效期到 token 的 exp 为止
+_token_cache = TTLCache(maxsize=Config.TOKEN_CACHE_SIZE, ttl=0)
+
+
+def create_access_token(user_id: int, username: str, token_version: int = 0) -> str:
     """
     创建 JWT access token
     
     Args:
         user_id: 用户ID
         username: 用户名
+        token_version: 用户当前的 token 版本（吊销时递增）
         
     Returns:
         JWT token 字符串
@@ -33,6 +45,7 @@ def create_access_token(user_id: int, username: str) -> str:
     payload = {
         "sub": str(user_id),
         "username": username,
+        "ver": token_version,
         "exp": expire,
         "iat": datetime.utcnow()
     }
@@ -49,38 +62,105 @@ def verify_token(token: str) -> Optional[dict]:
     Returns:
         解码后的 payload 或 None
     """
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _token_cache.get(key)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    # 缓存到 token 过期为止（没有 exp 的 token 不缓存）
+    exp = payload.get("exp")
+    if exp is not None:
+        ttl = exp - time.time()
+        if ttl > 0:
+            _token_cache.set(key, payload, ttl=ttl)
+    return payload
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> dict:
+def token_cache_stats() -> dict:
+    """已验证 token 缓存的命中统计"""
+    return _token_cache.stats()
+
+
+def get_token_version(user_id: int) -> Optional[int]:
     """
-    FastAPI 依赖项：获取当前登录用户
+    获取用户当前的 token 版本（优先读缓存）
     
     Args:
-        credentials: 从 Authorization header 获取的凭证
+        user_id: 用户ID
         
     Returns:
-        用户信息字典
-        
+        token 版本，用户不存在时返回 None
+    """
+    cached = _user_state_cache.get(user_id, _USER_MISSING)
+    if cached is not _USER_MISSING:
+        return cached
+    
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT token_version FROM users WHERE id = %s", (user_id,))
+            row = cur.fetchone()
+    finally:
+        conn.close()
+    
+    version = (row[0] or 0) if row else None
+    _user_state_cache.set(user_id, version)
+    return version
+
+
+def invalidate_user(user_id: int):
+    """清除本进程中该用户的认证缓存（删除、封禁用户后调用）"""
+    _user_state_cache.pop(user_id)
+
+
+def revoke_user_tokens(user_id: int, cursor=None) -> None:
+    """
+    吊销用户已签发的全部 token（递增 token_version）
+    
+    Args:
+        user_id: 用户ID
+        cursor: 可选，在调用方事务内执行（调用方提交后需调用 invalidate_user）；
+                否则自行提交并清除缓存
+    """
+    sql = "UPDATE users SET token_version = COALESCE(token_version, 0) + 1 WHERE id = %s"
+    if cursor is not None:
+        cursor.execute(sql, (user_id,))
+        return
+    
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, (user_id,))
+        conn.commit()
+    finally:
+        conn.close()
+    invalidate_user(user_id)
+
+
+def _authenticate(token: Optional[str]) -> dict:
+    """
+    校验 token 并确认用户仍然存在、token 未被吊销
+    
+    用户是否存在、token 是否被吊销通过进程内缓存判断，
+    常规请求不访问数据库
+    
     Raises:
         HTTPException: 认证失败时
     """
-    if not credentials:
+    if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="未提供认证凭证",
             headers={"WWW-Authenticate": "Bearer"}
         )
     
-    token = credentials.credentials
     payload = verify_token(token)
     
     if not payload:
@@ -93,20 +173,20 @@ async def get_current_user(
     user_id = int(payload.get("sub"))
     username = payload.get("username")
     
-    # 验证用户是否仍然存在
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("SELECT id, username FROM users WHERE id = %s", (user_id,))
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="用户不存在",
-                    headers={"WWW-Authenticate": "Bearer"}
-                )
-    finally:
-        conn.close()
+    # 验证用户是否仍然存在、token 是否已被吊销
+    token_version = get_token_version(user_id)
+    if token_version is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="用户不存在",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    if payload.get("ver", 0) != token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="token 已失效，请重新登录",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
     
     return {
         "id": user_id,
@@ -114,12 +194,48 @@ async def get_current_user(
     }
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
+    """
+    FastAPI 依赖项：获取当前登录用户
+    
+    Args:
+        credentials: 从 Authorization header 获取的凭证
+        
+    Returns:
+        用户信息字典
+        
+    Raises:
+        HTTPException: 认证失败时
+    """
+    return _authenticate(credentials.credentials if credentials else None)
+
+
+async def get_current_user_stream(
+    token: Optional[str] = Query(None, description="EventSource 无法设置请求头时通过查询参数传递 token"),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
+    """
+    FastAPI 依赖项：用于长连接推送的用户认证
+    优先使用 Authorization header，其次使用查询参数 token
+    
+    Args:
+        token: 查询参数中的 token
+        credentials: 从 Authorization header 获取的凭证
+        
+    Returns:
+        用户信息字典
+    """
+    return _authenticate(credentials.credentials if credentials else token)
+
+
 async def get_current_user_optional(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> Optional[dict]:
     """
     FastAPI 依赖项：可选的用户认证
-    如果提供了 token 则验证，否则返回 None
+    如果提供了 token 则按 get_current_user 的规则验证（含吊销检查），否则返回 None
     
     Args:
         credentials: 从 Authorization header 获取的凭证
@@ -130,13 +246,8 @@ async def get_current_user_optional(
     if not credentials:
         return None
     
-    token = credentials.credentials
-    payload = verify_token(token)
-    
-    if not payload:
+    try:
+        return _authenticate(credentials.credentials)
+    except HTTPException:
+        # 无效、过期或已吊销的 token 按未登录处理
         return None
-    
-    return {
-        "id": int(payload.get("sub")),
-        "username": payload.get("username")
-    }
@@ -0,0 +1,79 @@
+"""
+进程内有序排行榜模块
+有序数组 + 二分查找：取前 N 名 O(N)，查询名次 O(log n)；线程安全
+"""
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class SortedLeaderboard:
+    """
+    有序排行榜
+
+    按分数降序、同分时 ID 升序排列；分数不大于 0 的成员不上榜。
+    """
+
+    def __init__(self):
+        # 排序键 (-score, member_id)
+        self._keys: List[Tuple[int, int]] = []
+        self._scores: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, member_id: int):
+        score = self._scores.pop(member_id, None)
+        if score is None:
+            return
+        key = (-score, member_id)
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+
+    def _insert(self, member_id: int, score: int):
+        if score <= 0:
+            return
+        self._scores[member_id] = score
+        bisect.insort(self._keys, (-score, member_id))
+
+    def set(self, member_id: int, score: int):
+        """设置成员分数"""
+        with self._lock:
+            self._remove(member_id)
+            self._insert(member_id, score)
+
+    def add(self, member_id: int, delta: int) -> int:
+        """累加成员分数，返回新分数"""
+        with self._lock:
+            score = self._scores.get(member_id, 0) + delta
+            self._remove(member_id)
+            self._insert(member_id, score)
+            return score
+
+    def replace(self, items: Iterable[Tuple[int, int]]):
+        """用 (member_id, score) 全量替换（定期重建时使用）"""
+        scores = {member_id: score for member_id, score in items if score > 0}
+        keys = sorted((-score, member_id) for member_id, score in scores.items())
+        with self._lock:
+            self._scores = scores
+            self._keys = keys
+
+    def top(self, limit: int, offset: int = 0) -> List[Tuple[int, int]]:
+        """取排名 [offset, offset + limit) 的 (member_id, score)"""
+        with self._lock:
+            return [(member_id, -neg) for neg, member_id in self._keys[offset:offset + limit]]
+
+    def rank(self, member_id: int) -> Optional[Tuple[int, int]]:
+        """
+        查询成员名次
+
+        Returns:
+            (名次（从 1 开始）, 分数)，未上榜返回 None
+        """
+        with self._lock:
+            score = self._scores.get(member_id)
+            if score is None:
+                return None
+            return bisect.bisect_left(self._keys, (-score, member_id)) + 1, score
+
+    def __len__(self) -> int:
+        return len(self._keys)
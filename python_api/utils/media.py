@@ -0,0 +1,98 @@
+"""
+媒体文件服务模块
+/uploads 下的头像与音频均以内容哈希命名（同名即同内容），可按 immutable 长期缓存；
+Range 请求由 FileResponse 处理（播放器拖动进度），文件内容的发送方式：
+- 配置了 MEDIA_ACCEL_REDIRECT 时只返回 X-Accel-Redirect 头，由前置 nginx 发送文件
+- ASGI 服务器支持 zerocopysend 扩展时交给服务器 sendfile，不经 Python 读写
+- 否则按块读取发送
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.datastructures import Headers
+from ..config import Config
+
+# 上传接口生成的文件名：内容 SHA-256 前 32 位 + 扩展名（转码产物、头像缩略图沿用源文件名，缩略图另加 _边长）
+HASHED_NAME = re.compile(r"^[0-9a-f]{32}(_[0-9]+)?\.[0-9a-z]+$")
+
+# 标准库未登记的音频类型
+mimetypes.add_type("audio/ogg", ".opus")
+mimetypes.add_type("audio/mp4", ".m4a")
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+def cache_control(filename: str) -> str:
+    """内容哈希命名的文件永不变化，其余（旧版随机命名的上传）每次按 ETag 校验"""
+    if HASHED_NAME.match(filename):
+        return f"public, max-age={Config.MEDIA_CACHE_MAX_AGE}, immutable"
+    return "public, no-cache"
+
+
+class MediaResponse(FileResponse):
+    """
+    服务器支持 zerocopysend 扩展时整段 / 单段 Range 的内容交给服务器 sendfile
+
+    覆盖的 _handle_simple / _handle_single_range 是 Starlette 的内部方法，
+    requirements.txt 固定了 starlette 版本，升级时需同步核对
+    """
+
+    chunk_size = 256 * 1024
+
+    async def __call__(self, scope, receive, send):
+        self._zerocopy = Config.MEDIA_SENDFILE and ZEROCOPY_EXTENSION in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _handle_simple(self, send, send_header_only: bool):
+        if send_header_only or not self._zerocopy:
+            await super()._handle_simple(send, send_header_only)
+            return
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        # 未传入 stat_result 时 Starlette 只在局部变量中保存 stat，文件大小取自已设置的 content-length
+        await self._sendfile(send, 0, int(self.headers["content-length"]))
+
+    async def _handle_single_range(self, send, start: int, end: int, file_size: int, send_header_only: bool):
+        if send_header_only or not self._zerocopy:
+            await super()._handle_single_range(send, start, end, file_size, send_header_only)
+            return
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        await self._sendfile(send, start, end - start)
+
+    async def _sendfile(self, send, offset: int, count: int):
+        with open(self.path, "rb") as file:
+            await send({
+                "type": ZEROCOPY_EXTENSION,
+                "file": file,
+                "offset": offset,
+                "count": count,
+                "more_body": False,
+            })
+
+
+class MediaFiles(StaticFiles):
+    """
+    上传文件的静态服务
+
+    在 StaticFiles 基础上增加长期缓存头、X-Accel-Redirect 与 sendfile；
+    路径校验、304 协商与 Range 解析沿用 Starlette 的实现
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        headers = {"cache-control": cache_control(os.path.basename(full_path))}
+
+        if Config.MEDIA_ACCEL_REDIRECT:
+            # 只回传内部地址，文件内容、Range 与条件请求均由 nginx 处理
+            relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+            headers["x-accel-redirect"] = Config.MEDIA_ACCEL_REDIRECT.rstrip("/") + "/" + quote(relative)
+            headers["content-type"] = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+            return Response(status_code=status_code, headers=headers)
+
+        response = MediaResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
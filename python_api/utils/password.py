@@ -1,9 +1,82 @@
 """
 密码处理工具模块
 提供密码哈希和验证功能
+
+PBKDF2 计算在独立的有界线程池中执行（hashlib 计算期间释放 GIL），
+排队数超过上限时直接拒绝，避免登录高峰拖垮其他请求
 """
 import hashlib
+import hmac
 import secrets
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+from ..config import Config
+
+ALGORITHM = "pbkdf2_sha256"
+LEGACY_ITERATIONS = 120000  # 旧格式 "salt$hash" 使用的迭代次数
+
+
+class HashingBusyError(RuntimeError):
+    """密码哈希线程池已满"""
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=Config.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+# 正在执行 + 排队中的任务上限
+_slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_QUEUE_SIZE)
+
+
+def _submit(fn, *args) -> Future:
+    if not _slots.acquire(blocking=False):
+        raise HashingBusyError("密码哈希任务过多，请稍后重试")
+    try:
+        future = _executor.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations).hex()
+
+
+def _parse(stored: str) -> Optional[Tuple[int, str, str]]:
+    """
+    解析存储的哈希
+
+    支持 "pbkdf2_sha256$迭代次数$salt$hash" 与旧格式 "salt$hash"
+
+    Returns:
+        (迭代次数, salt, hash)，格式错误返回 None
+    """
+    parts = stored.split("$")
+    if len(parts) == 4 and parts[0] == ALGORITHM:
+        try:
+            return int(parts[1]), parts[2], parts[3]
+        except ValueError:
+            return None
+    if len(parts) == 2:
+        return LEGACY_ITERATIONS, parts[0], parts[1]
+    return None
+
+
+def _hash(password: str) -> str:
+    iterations = Config.PASSWORD_HASH_ITERATIONS
+    salt = secrets.token_hex(16)
+    return f"{ALGORITHM}${iterations}${salt}${_pbkdf2(password, salt, iterations)}"
+
+
+def _verify(password: str, stored: str) -> bool:
+    parsed = _parse(stored)
+    if not parsed:
+        return False
+    iterations, salt, hexhash = parsed
+    return hmac.compare_digest(_pbkdf2(password, salt, iterations), hexhash)
 
 
 def hash_password(password: str) -> str:
@@ -14,28 +87,37 @@ def hash_password(password: str) -> str:
         password: 明文密码
         
     Returns:
-        格式为 "salt$hash" 的加密字符串
+        格式为 "pbkdf2_sha256$迭代次数$salt$hash" 的加密字符串
+        
+    Raises:
+        HashingBusyError: 哈希线程池已满
     """
-    salt = secrets.token_hex(16)
-    dk = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 120000)
-    return f"{salt}${dk.hex()}"
+    return _submit(_hash, password).result()
 
 
 def verify_password(password: str, stored: str) -> bool:
     """
-    验证密码是否匹配
+    验证密码是否匹配（常量时间比较）
     
     Args:
         password: 待验证的明文密码
-        stored: 存储的哈希密码（格式: "salt$hash"）
+        stored: 存储的哈希密码（新格式或旧格式 "salt$hash"）
         
     Returns:
         密码是否匹配
+        
+    Raises:
+        HashingBusyError: 哈希线程池已满
     """
-    try:
-        salt, hexhash = stored.split("$", 1)
-    except ValueError:
+    return _submit(_verify, password, stored).result()
+
+
+def needs_rehash(stored: str) -> bool:
+    """
+    判断存储的哈希是否需要按当前参数重新计算
+    （旧格式或迭代次数与 PASSWORD_HASH_ITERATIONS 不一致）
+    """
+    parsed = _parse(stored)
+    if not parsed:
         return False
-    
-    dk = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 120000)
-    return dk.hex() == hexhash
+    return not stored.startswith(f"{ALGORITHM}$") or parsed[0] != Config.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,55 @@
+"""
+后台周期任务工具模块
+以守护线程按固定间隔执行同步任务（数据库连接均为同步 psycopg）
+"""
+import threading
+from typing import Callable, Optional
+
+
+class PeriodicTask:
+    """
+    周期任务
+
+    在独立守护线程中每隔 interval 秒调用一次 func；
+    stop() 会唤醒线程并在退出前可选地再执行一次（用于关闭时落盘）。
+    """
+
+    def __init__(self, name: str, interval: float, func: Callable[[], None]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动后台线程（重复调用无副作用）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, run_final: bool = True, timeout: Optional[float] = 10):
+        """
+        停止后台线程
+
+        Args:
+            run_final: 停止后是否再执行一次任务
+            timeout: 等待线程退出的最长秒数
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if run_final:
+            self._safe_call()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._safe_call()
+
+    def _safe_call(self):
+        try:
+            self.func()
+        except Exception as e:
+            print(f"[{self.name}] 周期任务执行失败: {e}")
@@ -0,0 +1,190 @@
+"""
+匿名响应缓存模块
+未登录访客看到的帖子流、方言帖子、方言统计、排行榜与查看者无关，
+整段 JSON 响应按 路径 + 查询参数 缓存在进程内，附带强 ETag，If-None-Match 命中时返回 304；
+帖子发布 / 删除时按分组失效，其他进程的变更最多 TTL 秒后可见
+"""
+import asyncio
+import hashlib
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+from ..config import Config
+from .ttl_cache import TTLCache
+
+
+class CacheRule(NamedTuple):
+    """可缓存的路由"""
+    pattern: "re.Pattern"
+    group: str  # 失效分组
+    ttl: float  # 有效期（秒），0 表示不缓存
+
+
+class CachedResponse(NamedTuple):
+    """缓存的响应"""
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: bytes
+
+
+RULES = [
+    CacheRule(re.compile(r"^/api/posts$"), "posts", Config.RESPONSE_CACHE_FEED_TTL),
+    CacheRule(re.compile(r"^/api/posts/dialect/[^/]+$"), "posts", Config.RESPONSE_CACHE_FEED_TTL),
+    CacheRule(re.compile(r"^/api/posts/dialects/stats$"), "posts", Config.RESPONSE_CACHE_FEED_TTL),
+    CacheRule(re.compile(r"^/api/points/leaderboard$"), "leaderboard", Config.RESPONSE_CACHE_LEADERBOARD_TTL),
+]
+
+# 命中缓存的响应不区分查看者，带登录凭证的请求不参与缓存
+_CACHE_HEADERS = [
+    (b"cache-control", b"public, no-cache"),
+    (b"vary", b"Authorization"),
+]
+_SKIP_HEADERS = {b"content-length", b"etag", b"cache-control", b"vary", b"set-cookie"}
+
+
+class ResponseCache:
+    """响应缓存（分组失效）"""
+
+    _cache = TTLCache(maxsize=Config.RESPONSE_CACHE_SIZE, ttl=Config.RESPONSE_CACHE_FEED_TTL)
+    # 每个分组的失效代数：请求开始后发生过失效的响应不写入缓存
+    _generations: Dict[str, int] = {}
+
+    @classmethod
+    def get(cls, group: str, key: str) -> Optional[CachedResponse]:
+        return cls._cache.get((group, cls._generations.get(group, 0), key))
+
+    @classmethod
+    def set(cls, group: str, generation: int, key: str, value: CachedResponse, ttl: float):
+        if cls._generations.get(group, 0) == generation:
+            cls._cache.set((group, generation, key), value, ttl=ttl)
+
+    @classmethod
+    def generation(cls, group: str) -> int:
+        return cls._generations.get(group, 0)
+
+    @classmethod
+    def invalidate(cls, group: str):
+        """
+        使一个分组的缓存全部失效（旧代数的条目不再可读，随 LRU / TTL 淘汰）
+
+        Args:
+            group: 分组名（posts / leaderboard）
+        """
+        cls._generations[group] = cls._generations.get(group, 0) + 1
+
+    @classmethod
+    def clear(cls):
+        """清空缓存"""
+        cls._cache.clear()
+
+
+def _match(path: str) -> Optional[CacheRule]:
+    for rule in RULES:
+        if rule.ttl > 0 and rule.pattern.match(path):
+            return rule
+    return None
+
+
+def _is_anonymous(scope, query: List[Tuple[str, str]]) -> bool:
+    if any(name == b"authorization" for name, _ in scope["headers"]):
+        return False
+    return not any(name == "token" for name, _ in query)
+
+
+def _etag_matches(scope, etag: bytes) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"if-none-match":
+            candidates = [item.strip() for item in value.split(b",")]
+            return etag in candidates or b"*" in candidates
+    return False
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI 中间件：缓存匿名 GET 请求的可缓存路由
+
+    需注册在 CORS 中间件内层，命中缓存的响应仍由 CORS 中间件补充跨域头
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        rule = _match(scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+        query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        if not _is_anonymous(scope, query):
+            await self.app(scope, receive, send)
+            return
+
+        key = scope["path"] + "?" + urlencode(sorted(query))
+        cached = ResponseCache.get(rule.group, key)
+        if cached is None:
+            # 同一个键同时只有一个请求回源，其余请求等待其结果
+            flight = (rule.group, key)
+            waiting = self._inflight.get(flight)
+            if waiting is not None:
+                cached = await asyncio.shield(waiting)
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[flight] = future
+                cached = None
+                try:
+                    cached = await self._fetch(scope, receive, send, rule, key)
+                finally:
+                    del self._inflight[flight]
+                    future.set_result(cached)
+                return
+            if cached is None:
+                await self.app(scope, receive, send)
+                return
+
+        await self._send(scope, send, cached)
+
+    async def _fetch(self, scope, receive, send, rule: CacheRule, key: str) -> Optional[CachedResponse]:
+        """回源；200 响应写入缓存并附带 ETag，其他响应原样透传"""
+        generation = ResponseCache.generation(rule.group)
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def capture(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                start = message
+                if message["status"] != 200:
+                    passthrough = True
+                    await send(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        if passthrough or start is None:
+            return None
+
+        body = b"".join(chunks)
+        etag = b'"' + hashlib.sha256(body).hexdigest()[:32].encode() + b'"'
+        headers = [(name, value) for name, value in start.get("headers", []) if name.lower() not in _SKIP_HEADERS]
+        cached = CachedResponse(headers, body, etag)
+        ResponseCache.set(rule.group, generation, key, cached, rule.ttl)
+        await self._send(scope, send, cached)
+        return cached
+
+    @staticmethod
+    async def _send(scope, send, cached: CachedResponse):
+        headers = [(b"etag", cached.etag)] + _CACHE_HEADERS
+        if _etag_matches(scope, cached.etag):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = cached.headers + headers + [(b"content-length", str(len(cached.body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": cached.body})
@@ -0,0 +1,58 @@
+"""
+分片计数器模块
+在进程内合并高频的计数增量，供后台批量写回数据库
+"""
+import threading
+from typing import Dict, Hashable, Iterable, Tuple
+
+
+class ShardedCounter:
+    """
+    分片计数器
+
+    按 key 的哈希分到多个分片，每个分片一把锁，
+    写入只会竞争同一分片的锁；drain() 逐片取出快照，不阻塞其他分片的写入。
+    """
+
+    def __init__(self, shards: int = 16):
+        self._shards = [({}, threading.Lock()) for _ in range(max(1, shards))]
+
+    def _shard(self, key: Hashable):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def add(self, key: Hashable, delta: int = 1) -> int:
+        """累加增量，返回该 key 当前待写回的合计值"""
+        data, lock = self._shard(key)
+        with lock:
+            value = data.get(key, 0) + delta
+            if value:
+                data[key] = value
+            else:
+                data.pop(key, None)
+            return value
+
+    def get(self, key: Hashable) -> int:
+        """获取该 key 当前待写回的增量"""
+        data, lock = self._shard(key)
+        with lock:
+            return data.get(key, 0)
+
+    def drain(self) -> Dict[Hashable, int]:
+        """取出并清空所有待写回的增量"""
+        merged: Dict[Hashable, int] = {}
+        for data, lock in self._shards:
+            with lock:
+                if not data:
+                    continue
+                snapshot = dict(data)
+                data.clear()
+            merged.update(snapshot)
+        return merged
+
+    def restore(self, items: Iterable[Tuple[Hashable, int]]):
+        """写回失败时把增量放回，等待下一次刷新"""
+        for key, delta in items:
+            self.add(key, delta)
+
+    def __len__(self) -> int:
+        return sum(len(data) for data, _ in self._shards)
@@ -0,0 +1,54 @@
+"""
+中文全文检索分词模块
+帖子内容在 Python 中分词后以空格拼接，交给 Postgres 的 'simple' 配置建 tsvector；
+汉字按单字 + 二元切分，不依赖词典，各进程、各环境结果一致
+（修改切分规则后已有的 search_vector 不再匹配，需置 NULL 由迁移重新回填）
+"""
+import re
+from typing import List
+
+_CJK = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]+")
+_TOKEN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]+|[A-Za-z0-9]+")
+
+
+def _cut_cjk(chunk: str, for_query: bool) -> List[str]:
+    if len(chunk) == 1:
+        return [chunk]
+    bigrams = [chunk[i:i + 2] for i in range(len(chunk) - 1)]
+    # 文档同时收录单字，单字查询也能命中；查询只用二元组，减少误匹配
+    return bigrams if for_query else list(chunk) + bigrams
+
+
+def tokenize(text: str, for_query: bool = False) -> List[str]:
+    """
+    分词
+
+    Args:
+        text: 原文
+        for_query: 是否为查询词（查询只取二元组）
+
+    Returns:
+        词列表（英文数字转小写）
+    """
+    tokens: List[str] = []
+    for match in _TOKEN.finditer(text or ""):
+        chunk = match.group()
+        if _CJK.fullmatch(chunk):
+            tokens.extend(_cut_cjk(chunk, for_query))
+        else:
+            tokens.append(chunk.lower())
+    return tokens
+
+
+# posts.search_vector 的计算表达式：内容权重 A，方言标签权重 B（参数为分词后的文本）
+POST_VECTOR_SQL = "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')"
+
+
+def to_document(text: str) -> str:
+    """生成用于 to_tsvector('simple', ...) 的分词文本"""
+    return " ".join(tokenize(text))
+
+
+def to_query(text: str) -> str:
+    """生成用于 plainto_tsquery('simple', ...) 的分词文本（各词之间为 AND）"""
+    return " ".join(dict.fromkeys(tokenize(text, for_query=True)))
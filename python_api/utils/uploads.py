@@ -0,0 +1,176 @@
+"""
+文件上传工具模块
+上传内容分块写入同目录的临时文件（磁盘写入与哈希在线程池中进行），超过大小限制立即中止；
+写完后按 SHA-256 命名并原子重命名，内容相同的文件只保存一份
+"""
+import hashlib
+import os
+import tempfile
+from typing import Dict, NamedTuple, Optional
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+# 每次读取 / 写入的块大小
+CHUNK_SIZE = 256 * 1024
+
+# multipart 边界与表单头的余量（请求体大小限制 = 文件大小限制 + 余量）
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """上传内容超过大小限制"""
+
+    def __init__(self, max_size: int):
+        super().__init__(size_limit_message(max_size))
+        self.max_size = max_size
+
+
+class SavedUpload(NamedTuple):
+    """已保存的上传文件"""
+    filename: str
+    path: str
+    size: int
+    sha256: str
+    existed: bool  # 相同内容的文件已存在（本次未新增文件）
+
+
+def size_limit_message(max_size: int) -> str:
+    return f"文件大小超过限制 ({max_size // 1024 // 1024}MB)"
+
+
+def _write_chunk(out, digest, chunk: bytes):
+    digest.update(chunk)
+    out.write(chunk)
+
+
+def _commit(tmp_path: str, path: str) -> bool:
+    """临时文件改名为正式文件；已存在相同内容的文件时丢弃临时文件"""
+    if os.path.exists(path):
+        os.remove(tmp_path)
+        return True
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+    return False
+
+
+def _discard(tmp_path: str):
+    try:
+        os.remove(tmp_path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_upload(file: UploadFile, directory: str, ext: str, max_size: int) -> SavedUpload:
+    """
+    分块保存上传文件（按内容去重）
+
+    Args:
+        file: 上传的文件
+        directory: 保存目录
+        ext: 文件扩展名（含点，已校验）
+        max_size: 最大字节数
+
+    Returns:
+        SavedUpload，文件名为内容 SHA-256 的前 32 位 + 扩展名
+
+    Raises:
+        UploadTooLargeError: 超过大小限制时（临时文件已删除）
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=ext)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(max_size)
+                await run_in_threadpool(_write_chunk, out, digest, chunk)
+
+        sha256 = digest.hexdigest()
+        filename = f"{sha256[:32]}{ext}"
+        path = os.path.join(directory, filename)
+        existed = await run_in_threadpool(_commit, tmp_path, path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+    return SavedUpload(filename, path, size, sha256, existed)
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI 中间件：限制上传接口的请求体大小
+
+    Content-Length 超限时直接拒绝；分块传输时边接收边计数，超限即中止，
+    不必等 multipart 整体解析完成。文件本身的精确限制由 save_upload 检查
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        """
+        Args:
+            app: ASGI 应用
+            limits: {请求路径: 文件最大字节数}
+        """
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        max_size: Optional[int] = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            max_size = self.limits.get(scope["path"])
+        if max_size is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_size + MULTIPART_OVERHEAD
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                await self._reject(send, max_size)
+                return
+
+        received = 0
+        started = False
+        rejected = False
+
+        async def limited_receive():
+            # 超限时由中间件直接返回 400 并告知应用客户端已断开：
+            # 不能抛异常，FastAPI 解析请求体时会把异常改写为 "There was an error parsing the body"
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected = True
+                    if not started:
+                        await self._reject(send, max_size)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            if rejected:
+                # 已经返回了 400，丢弃应用随后的错误响应
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, tracked_send)
+
+    @staticmethod
+    async def _reject(send, max_size: int):
+        # 与路由中的大小校验保持同样的状态码与提示
+        body = ('{"detail":"%s"}' % size_limit_message(max_size)).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 400,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})